@@ -3,8 +3,8 @@ from django.contrib import admin
 from django.contrib.auth.models import User, Group
 from django.http.request import HttpRequest
 
-from app.models import Config, SwapEvent
-from app.tasks import process_swap_events
+from app.models import BackfillPartition, Config, EthUsdPrice, SwapCandle, SwapEvent
+from app.tasks import backfill_swap_events, process_swap_events
 
 admin.site.site_header = 'ETH Swap Indexer'
 admin.site.unregister(User)
@@ -13,7 +13,9 @@ admin.site.unregister(Group)
 
 @admin.register(Config)
 class ConfigAdmin(admin.ModelAdmin):
-    list_display = ("contract_address", "created_at")
+    list_display = ("contract_address", "is_active", "last_indexed_block", "created_at")
+    readonly_fields = ("last_indexed_block_hash",)
+    actions = ("backfill_in_parallel", "backfill_in_parallel_with_copy")
 
     def save_model(self, request: Any, obj: Any, form: Any, change: Any) -> None:
         super().save_model(request, obj, form, change)
@@ -22,15 +24,73 @@ class ConfigAdmin(admin.ModelAdmin):
         if not change:
             process_swap_events.apply_async(kwargs={"config_id": str(obj.id)})
 
+    @admin.action(description="Backfill swap events in parallel")
+    def backfill_in_parallel(self, request: HttpRequest, queryset: Any) -> None:
+        # Split the pending block range of each selected config across the celery workers
+        for config in queryset:
+            backfill_swap_events.apply_async(kwargs={"config_id": str(config.id)})
+
+    @admin.action(description="Backfill swap events in parallel with COPY")
+    def backfill_in_parallel_with_copy(self, request: HttpRequest, queryset: Any) -> None:
+        # Same as backfill_in_parallel, The swap events are loaded with COPY for a higher insert throughput
+        for config in queryset:
+            backfill_swap_events.apply_async(kwargs={"config_id": str(config.id), "use_copy": True})
+
+
+@admin.register(BackfillPartition)
+class BackfillPartitionAdmin(admin.ModelAdmin):
+    list_display = (
+        "config",
+        "from_block",
+        "to_block",
+        "last_indexed_block",
+        "status",
+        "attempts"
+    )
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def has_change_permission(self, request: HttpRequest, obj: Any | None = ...) -> bool:
+        return False
+
+
+@admin.register(EthUsdPrice)
+class EthUsdPriceAdmin(admin.ModelAdmin):
+    # Prices are bulk loaded with the load_eth_prices management command
+    list_display = ("timestamp", "price")
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def has_change_permission(self, request: HttpRequest, obj: Any | None = ...) -> bool:
+        return False
+
+
+@admin.register(SwapCandle)
+class SwapCandleAdmin(admin.ModelAdmin):
+    list_display = ("config", "interval", "bucket", "open", "close", "trade_count")
+    list_filter = ("interval",)
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def has_change_permission(self, request: HttpRequest, obj: Any | None = ...) -> bool:
+        return False
+
 
 @admin.register(SwapEvent)
 class SwapEventAdmin(admin.ModelAdmin):
     list_display = (
-        "tx_hash",
+        "tx_hash_hex",
         "config",
         "block_number"
     )
 
+    @admin.display(description="Transaction Hash")
+    def tx_hash_hex(self, obj: SwapEvent) -> str:
+        return "0x" + obj.tx_hash.hex()
+
     def has_add_permission(self, request: HttpRequest) -> bool:
         return False
     
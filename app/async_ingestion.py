@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import traceback
+from typing import Callable
+
+import aiohttp
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from app.blocks import get_block_timestamps
+from app.cache import tiered_cache
+from app.decoders import get_decoder
+from app.metrics import record_cache_requests, track_stage
+from app.models import Config
+from app.providers import ProviderPool, get_provider_pool
+from app.receipts import async_get_receipts
+from app.rpc import async_batch_request, make_async_web3
+from app.scanner import async_scan_swap_events
+from app.tasks import (
+    CACHE_TIMEOUT,
+    RECEIPT_DETAILS_KEYS,
+    TX_BATCH_SIZE,
+    ConversionRateSnapshot,
+    add_transaction_details,
+    add_transaction_gas_price,
+    check_swap_events_details,
+    create_swap_event,
+    get_receipt_details,
+    get_required_details_keys,
+    is_details_complete,
+)
+from app.writer import SwapEventWriter
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of JSON-RPC batch requests in flight per provider
+MAX_IN_FLIGHT = settings.ASYNC_MAX_IN_FLIGHT
+
+
+def create_swap_events(_config_obj: Config, _swap_events: list, _transactions_details: dict, _block_timestamps: dict, _spot_rate: ConversionRateSnapshot, _writer: SwapEventWriter) -> None:
+    check_swap_events_details(_swap_events, _transactions_details, _block_timestamps)
+    for swap_event in _swap_events:
+        tx_data = _transactions_details.get(swap_event.transactionHash.hex(), {})
+        create_swap_event(_config_obj, swap_event, tx_data, _block_timestamps.get(swap_event.blockNumber), _spot_rate, _writer)
+
+
+async def fetch_transactions(_session: aiohttp.ClientSession, _semaphore: asyncio.Semaphore, _pool: ProviderPool, _tx_hashes: list[str]) -> list:
+    async with _semaphore:
+        return await async_batch_request(
+            _session,
+            _pool,
+            [("eth_getTransactionByHash", [tx_hash]) for tx_hash in _tx_hashes]
+        )
+
+
+async def fetch_receipts_details(_session: aiohttp.ClientSession, _semaphore: asyncio.Semaphore, _pool: ProviderPool, _tx_blocks: dict[str, str], _fetch_gas_prices: bool = True) -> dict[str, dict]:
+    """
+    Async version of tasks.get_transactions_details without the transactions, The receipt batches are fetched concurrently.
+    The receipts without an effective gas price take the gas price of their transaction, Unless the caller fetches the transactions anyway.
+    """
+
+    tx_hashes = list(_tx_blocks)
+    receipts_details = {
+        tx_hash: tx_details for tx_hash, tx_details in (await sync_to_async(tiered_cache.get_many)(tx_hashes)).items()
+        if RECEIPT_DETAILS_KEYS <= tx_details.keys()
+    }
+    missing_tx_hashes = [tx_hash for tx_hash in tx_hashes if tx_hash not in receipts_details]
+    record_cache_requests("transactions", len(receipts_details), len(missing_tx_hashes))
+    if not missing_tx_hashes:
+        return receipts_details
+
+    receipts = await async_get_receipts(_session, _semaphore, _pool, {tx_hash: _tx_blocks[tx_hash] for tx_hash in missing_tx_hashes})
+    fetched_details = {
+        tx_hash: get_receipt_details(receipts[tx_hash])
+        for tx_hash in missing_tx_hashes if tx_hash in receipts
+    }
+
+    gas_price_tx_hashes = [tx_hash for tx_hash, tx_details in fetched_details.items() if "gas_price" not in tx_details] if _fetch_gas_prices else []
+    batches = await asyncio.gather(*(
+        fetch_transactions(_session, _semaphore, _pool, gas_price_tx_hashes[idx:idx+TX_BATCH_SIZE])
+        for idx in range(0, len(gas_price_tx_hashes), TX_BATCH_SIZE)
+    ))
+    for tx_hash, tx_data in zip(gas_price_tx_hashes, (tx_data for transactions in batches for tx_data in transactions)):
+        if tx_data:
+            add_transaction_gas_price(fetched_details[tx_hash], tx_data)
+
+    # Partial details are cached as well, Like in tasks.get_transactions_details
+    await sync_to_async(tiered_cache.set_many)(fetched_details, CACHE_TIMEOUT)
+    receipts_details.update(fetched_details)
+
+    if not _fetch_gas_prices:
+        return receipts_details
+    return {tx_hash: tx_details for tx_hash, tx_details in receipts_details.items() if RECEIPT_DETAILS_KEYS <= tx_details.keys()}
+
+
+async def fetch_transactions_details(_session: aiohttp.ClientSession, _semaphore: asyncio.Semaphore, _pool: ProviderPool, _tx_hashes: list[str], _receipts_details: asyncio.Future) -> dict[str, dict]:
+    with track_stage("fetch_transactions"):
+        transactions = await fetch_transactions(_session, _semaphore, _pool, _tx_hashes)
+
+    # Receipts are fetched concurrently with the transactions
+    receipts_details = await _receipts_details
+
+    transactions_details = {}
+    for tx_hash, tx_data in zip(_tx_hashes, transactions):
+        if tx_data and tx_hash in receipts_details:
+            transactions_details[tx_hash] = {**receipts_details[tx_hash]}
+            add_transaction_details(transactions_details[tx_hash], tx_data)
+            add_transaction_gas_price(transactions_details[tx_hash], tx_data)
+
+    await sync_to_async(tiered_cache.set_many)(transactions_details, CACHE_TIMEOUT)
+    return transactions_details
+
+
+async def async_index_swap_events(_session: aiohttp.ClientSession, _semaphore: asyncio.Semaphore, _config_obj: Config, _swap_events: list, _spot_rate: ConversionRateSnapshot, _writer: SwapEventWriter) -> None:
+    swap_events_by_tx_hash = {}
+    tx_blocks = {}
+    for swap_event in _swap_events:
+        swap_events_by_tx_hash.setdefault(swap_event.transactionHash.hex(), []).append(swap_event)
+        tx_blocks[swap_event.transactionHash.hex()] = swap_event.blockHash.hex()
+
+    pool = get_provider_pool(_config_obj)
+
+    # Block timestamps are used to look up the historical ETH to USD rate
+    # The headers are stored in DB, So they are fetched in the sync thread along with the other DB queries
+    with track_stage("fetch_blocks"):
+        block_timestamps = await sync_to_async(get_block_timestamps)(
+            pool, {swap_event.blockNumber: swap_event.blockHash.hex() for swap_event in _swap_events}
+        )
+
+    # Only the receipts are needed when the price can be decoded from the log
+    if get_decoder(_config_obj) is not None:
+        with track_stage("fetch_transactions"):
+            transactions_details = await fetch_receipts_details(_session, _semaphore, pool, tx_blocks)
+        await sync_to_async(create_swap_events)(_config_obj, _swap_events, transactions_details, block_timestamps, _spot_rate, _writer)
+        return
+
+    # Create the swap events of the cached transactions right away
+    tx_hashes = list(swap_events_by_tx_hash)
+    required_keys = get_required_details_keys(True)
+    cached_details = {
+        tx_hash: tx_details for tx_hash, tx_details in (await sync_to_async(tiered_cache.get_many)(tx_hashes)).items()
+        if is_details_complete(tx_details, required_keys)
+    }
+    await sync_to_async(create_swap_events)(
+        _config_obj,
+        [swap_event for tx_hash in cached_details for swap_event in swap_events_by_tx_hash[tx_hash]],
+        cached_details,
+        block_timestamps,
+        _spot_rate,
+        _writer
+    )
+
+    missing_tx_hashes = [tx_hash for tx_hash in tx_hashes if tx_hash not in cached_details]
+    record_cache_requests("transactions", len(cached_details), len(missing_tx_hashes))
+    if not missing_tx_hashes:
+        return
+
+    # Fetch the receipts alongside the transaction batches, The semaphore bounds the number of batches in flight
+    # The gas prices missing from the receipts are taken from the fetched transactions
+    receipts_details = asyncio.ensure_future(fetch_receipts_details(
+        _session, _semaphore, pool, {tx_hash: tx_blocks[tx_hash] for tx_hash in missing_tx_hashes}, False
+    ))
+    batches = {
+        asyncio.ensure_future(
+            fetch_transactions_details(_session, _semaphore, pool, missing_tx_hashes[idx:idx+TX_BATCH_SIZE], receipts_details)
+        ): missing_tx_hashes[idx:idx+TX_BATCH_SIZE]
+        for idx in range(0, len(missing_tx_hashes), TX_BATCH_SIZE)
+    }
+
+    # Stream the swap events of every batch into the DB writer as soon as the batch completes
+    pending = set(batches)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+        for batch in done:
+            batch_tx_hashes = batches[batch]
+
+            try:
+                transactions_details = batch.result()
+            except Exception as e:
+                logger.error({
+                    "msg": "Error caught while fetching transaction details",
+                    "error": e,
+                    "traceback": traceback.format_exc(),
+                    "tx_hashes": batch_tx_hashes,
+                })
+                # The window is retried by the next run, So the cursor isn't moved past the swap events of the batch
+                raise
+
+            await sync_to_async(create_swap_events)(
+                _config_obj,
+                [swap_event for tx_hash in batch_tx_hashes for swap_event in swap_events_by_tx_hash[tx_hash]],
+                transactions_details,
+                block_timestamps,
+                _spot_rate,
+                _writer
+            )
+
+
+async def async_index_block_range(_config_obj: Config, _from_block: int, _to_block: int, _on_window: Callable[[int], None], _writer_class: type[SwapEventWriter] = SwapEventWriter) -> None:
+    """
+    Async version of tasks.index_block_range built on AsyncWeb3 and aiohttp.
+    Keeps up to ASYNC_MAX_IN_FLIGHT transaction batches in flight instead of fetching them one by one.
+    """
+
+    semaphore = asyncio.Semaphore(MAX_IN_FLIGHT)
+
+    # All the windows of the run share the same spot rate and writer
+    spot_rate = ConversionRateSnapshot()
+    writer = _writer_class(_config_obj)
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=MAX_IN_FLIGHT)) as session:
+        w3 = make_async_web3(get_provider_pool(_config_obj), session)
+        contract = w3.eth.contract(address=_config_obj.contract_address, abi=_config_obj.abi.get("ABI"))
+
+        async for window_from_block, window_to_block, swap_events in async_scan_swap_events(contract, _from_block, _to_block):
+            logger.info({
+                "msg": f"Found {len(swap_events)} Swap Events",
+                "config_id": _config_obj.id,
+                "from_block_number": window_from_block,
+                "to_block_number": window_to_block
+            })
+
+            await async_index_swap_events(session, semaphore, _config_obj, swap_events, spot_rate, writer)
+
+            # Save the remaining buffered events before persisting the cursor
+            await sync_to_async(writer.flush)()
+            await sync_to_async(_on_window)(window_to_block)
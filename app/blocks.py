@@ -0,0 +1,101 @@
+import logging
+import math
+import traceback
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from app.cache import LocalCache
+from app.metrics import record_cache_requests
+from app.models import Block
+from app.providers import ProviderPool
+from app.rpc import batch_request
+
+logger = logging.getLogger(__name__)
+
+BLOCK_BATCH_SIZE = settings.BLOCK_BATCH_SIZE
+
+# Headers of the recently indexed blocks keyed by block hash, Shared by all the configs indexed by the worker
+# A block hash always maps to the same header, So the entries never expire and are only evicted by the LRU
+block_cache = LocalCache(settings.BLOCK_CACHE_MAX_ENTRIES, math.inf)
+
+
+def parse_block(_block: dict) -> Block:
+    base_fee_per_gas = _block.get("baseFeePerGas")
+    return Block(
+        number=int(_block["number"], 16),
+        hash=bytes.fromhex(_block["hash"].removeprefix("0x")),
+        timestamp=datetime.fromtimestamp(int(_block["timestamp"], 16), tz=timezone.utc),
+        # Blocks before London have no base fee
+        base_fee_per_gas=int(base_fee_per_gas, 16) if base_fee_per_gas is not None else None
+    )
+
+
+def get_block_hash(_block: Block) -> str:
+    return "0x" + _block.hash.hex()
+
+
+def fetch_blocks(_pool: ProviderPool, _block_numbers: list[int]) -> list[Block]:
+    # Fetch the block headers (without the transactions) in batches
+    blocks = []
+
+    for idx in range(0, len(_block_numbers), BLOCK_BATCH_SIZE):
+        block_numbers = _block_numbers[idx:idx+BLOCK_BATCH_SIZE]
+
+        try:
+            batch_blocks = batch_request(
+                _pool,
+                [("eth_getBlockByNumber", [hex(block_number), False]) for block_number in block_numbers]
+            )
+        except Exception as e:
+            logger.error({
+                "msg": "Error caught while fetching block headers",
+                "error": e,
+                "traceback": traceback.format_exc(),
+                "block_numbers": block_numbers,
+            })
+            continue
+
+        blocks.extend(parse_block(block) for block in batch_blocks if block)
+
+    return blocks
+
+
+def get_blocks(_pool: ProviderPool, _block_hashes: dict[int, str]) -> dict[int, Block]:
+    """
+    Headers of the given blocks, Mapped as block number -> block hash (of the logs).
+    Looked up in the worker cache, Then in the blocks table and only the remaining ones are fetched from the provider.
+    Stored headers of another block hash (i.e. reorged) are refetched and overwritten.
+    """
+
+    blocks = {block.number: block for block in block_cache.get_many(list(_block_hashes.values())).values()}
+    missing_block_numbers = [block_number for block_number in _block_hashes if block_number not in blocks]
+    record_cache_requests("blocks", len(blocks), len(missing_block_numbers))
+    if not missing_block_numbers:
+        return blocks
+
+    stored_blocks = {
+        block.number: block for block in Block.objects.filter(number__in=missing_block_numbers)
+        if get_block_hash(block) == _block_hashes[block.number]
+    }
+
+    fetched_blocks = fetch_blocks(_pool, sorted(set(missing_block_numbers) - stored_blocks.keys()))
+    if fetched_blocks:
+        Block.objects.bulk_create(
+            fetched_blocks,
+            update_conflicts=True,
+            unique_fields=["number"],
+            update_fields=["hash", "timestamp", "base_fee_per_gas"]
+        )
+
+    new_blocks = [*stored_blocks.values(), *fetched_blocks]
+    block_cache.set_many({get_block_hash(block): block for block in new_blocks})
+    for block in new_blocks:
+        blocks[block.number] = block
+
+    return blocks
+
+
+def get_block_timestamps(_pool: ProviderPool, _block_hashes: dict[int, str]) -> dict[int, int]:
+    # Map block number -> unix timestamp
+    return {block_number: int(block.timestamp.timestamp()) for block_number, block in get_blocks(_pool, _block_hashes).items()}
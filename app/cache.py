@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+
+from app.metrics import record_cache_requests
+
+# Maximum number of entries and lifetime in seconds of the in-process cache tier
+LOCAL_CACHE_MAX_ENTRIES = settings.LOCAL_CACHE_MAX_ENTRIES
+LOCAL_CACHE_TIMEOUT = settings.LOCAL_CACHE_TIMEOUT
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache whose entries expire after a timeout.
+    Values are shared with the callers as is, So they must not be mutated once cached.
+    """
+
+    def __init__(self, max_entries: int, timeout: float) -> None:
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get_many(self, _keys: list[str]) -> dict[str, Any]:
+        now = monotonic()
+        values = {}
+        with self.lock:
+            for key in _keys:
+                entry = self.entries.get(key)
+                if entry is None:
+                    continue
+
+                expires_at, value = entry
+                if expires_at <= now:
+                    del self.entries[key]
+                    continue
+
+                self.entries.move_to_end(key)
+                values[key] = value
+
+        return values
+
+    def set_many(self, _items: dict[str, Any], _timeout: float | None = None) -> None:
+        if self.max_entries <= 0:
+            return
+
+        # Entries never outlive the shared cache tier
+        expires_at = monotonic() + min(self.timeout, _timeout if _timeout is not None else self.timeout)
+        with self.lock:
+            for key, value in _items.items():
+                self.entries[key] = (expires_at, value)
+                self.entries.move_to_end(key)
+
+            # Evict the least recently used entries
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+class TieredCache:
+    """
+    Two tier cache, The in-process LRU cache in front of the Django (Redis) cache shared by the workers.
+    Only the keys missing from the local tier are read from the shared tier, In a single round-trip per lookup.
+    """
+
+    def __init__(self, _local: LocalCache) -> None:
+        self.local = _local
+
+    def get_many(self, _keys: list[str]) -> dict[str, Any]:
+        values = self.local.get_many(_keys)
+        missing_keys = [key for key in _keys if key not in values]
+        record_cache_requests("local", len(values), len(missing_keys))
+        if not missing_keys:
+            return values
+
+        shared_values = cache.get_many(missing_keys)
+        self.local.set_many(shared_values)
+        values.update(shared_values)
+        return values
+
+    def get(self, _key: str, _default: Any = None) -> Any:
+        return self.get_many([_key]).get(_key, _default)
+
+    def set_many(self, _items: dict[str, Any], _timeout: float) -> None:
+        if not _items:
+            return
+
+        cache.set_many(_items, _timeout)
+        self.local.set_many(_items, _timeout)
+
+    def set(self, _key: str, _value: Any, _timeout: float) -> None:
+        self.set_many({_key: _value}, _timeout)
+
+    def get_or_set(self, _key: str, _default: Any, _timeout: float) -> Any:
+        values = self.local.get_many([_key])
+        if _key in values:
+            return values[_key]
+
+        value = cache.get_or_set(_key, _default, _timeout)
+        self.local.set_many({_key: value}, _timeout)
+        return value
+
+
+tiered_cache = TieredCache(LocalCache(LOCAL_CACHE_MAX_ENTRIES, LOCAL_CACHE_TIMEOUT))
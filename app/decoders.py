@@ -0,0 +1,110 @@
+from decimal import Decimal
+from typing import Callable
+
+from app.models import Config
+
+# Swap event decoders keyed by the event signature, Each decoder returns the typed swap args stored on the SwapEvent:
+# The signed pool token amounts of a swap along with the pool state after the swap (sqrtPriceX96, liquidity, tick) if the event has it.
+# Decoders receive the event args in the ABI order, So that they don't depend on the argument names of the ABI.
+# web3 returns the indexed args first, So the args are reordered by the ABI inputs before decoding (See get_ordered_args).
+DECODERS: dict[str, Callable[[list], dict]] = {}
+
+Q96 = Decimal(2 ** 96)
+
+
+def register_decoder(_event_signature: str) -> Callable:
+    def register(decoder: Callable[[list], dict]) -> Callable[[list], dict]:
+        DECODERS[_event_signature] = decoder
+        return decoder
+
+    return register
+
+
+@register_decoder("Swap(address,address,int256,int256,uint160,uint128,int24)")
+def decode_uniswap_v3_swap(_args: list) -> dict:
+    sender, recipient, amount0, amount1, sqrt_price_x96, liquidity, tick = _args
+    return {
+        "sender": sender,
+        "recipient": recipient,
+        "amount0": amount0,
+        "amount1": amount1,
+        "sqrt_price_x96": sqrt_price_x96,
+        "liquidity": liquidity,
+        "tick": tick
+    }
+
+
+@register_decoder("Swap(address,uint256,uint256,uint256,uint256,address)")
+def decode_uniswap_v2_swap(_args: list) -> dict:
+    sender, amount0_in, amount1_in, amount0_out, amount1_out, to = _args
+
+    # Use the same sign convention as V3, Positive amounts are paid into the pool
+    return {
+        "sender": sender,
+        "recipient": to,
+        "amount0": amount0_in - amount0_out,
+        "amount1": amount1_in - amount1_out,
+        "sqrt_price_x96": None,
+        "liquidity": None,
+        "tick": None
+    }
+
+
+def get_event_abi(_abi: list) -> dict | None:
+    for item in _abi or []:
+        if item.get("type") == "event" and item.get("name") == "Swap":
+            return item
+    return None
+
+
+def get_event_signature(_abi: list) -> str | None:
+    event_abi = get_event_abi(_abi)
+    if event_abi is None:
+        return None
+    return f"Swap({','.join(_input['type'] for _input in event_abi.get('inputs', []))})"
+
+
+def get_ordered_args(_config_obj: Config, _swap_event) -> list:
+    # Event args in the order of the ABI inputs, Instead of the indexed args first order of web3
+    return [_swap_event.args[_input["name"]] for _input in get_event_abi(_config_obj.abi.get("ABI"))["inputs"]]
+
+
+def get_decoder(_config_obj: Config) -> Callable[[list], dict] | None:
+    return DECODERS.get(get_event_signature(_config_obj.abi.get("ABI")))
+
+
+def decode_swap_event(_config_obj: Config, _swap_event) -> dict | None:
+    """
+    Decode the swap args of the log and derive the execution price and the swapped ETH amount (in wei) from them,
+    So that the transaction doesn't have to be fetched. Returns None if there is no decoder for the config ABI.
+    """
+
+    decoder = get_decoder(_config_obj)
+    if decoder is None:
+        return None
+
+    swap = decoder(get_ordered_args(_config_obj, _swap_event))
+    eth_decimals = Decimal(10) ** 18
+    token_decimals = Decimal(10) ** _config_obj.token_decimals
+
+    eth_wei = abs(swap[f"amount{_config_obj.eth_token_index}"])
+    eth_amount = Decimal(eth_wei) / eth_decimals
+    token_amount = Decimal(abs(swap[f"amount{1 - _config_obj.eth_token_index}"])) / token_decimals
+
+    if token_amount:
+        # Execution price is the ETH paid or received per token
+        execution_price = eth_amount / token_amount
+    elif swap["sqrt_price_x96"]:
+        # Fallback to the pool price after the swap, sqrtPriceX96 is the square root of token1 per token0 in raw units
+        price = (Decimal(swap["sqrt_price_x96"]) / Q96) ** 2
+        if _config_obj.eth_token_index == 0:
+            price = 1 / price
+        execution_price = price * token_decimals / eth_decimals
+    else:
+        execution_price = Decimal(0)
+
+    return {
+        **swap,
+        "execution_price_eth": execution_price,
+        "swapped_eth_wei": eth_wei
+    }
@@ -0,0 +1,196 @@
+import csv
+import gzip
+import io
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+from app.models import Config, SwapEvent
+
+# Parquet exports are optional, They require pyarrow
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Number of swap events read from the DB cursor at a time, Each chunk is written as a Parquet row group
+EXPORT_CHUNK_SIZE = settings.EXPORT_CHUNK_SIZE
+REORG_MAX_DEPTH = settings.REORG_MAX_DEPTH
+
+FORMATS = ("csv", "parquet")
+CONTENT_TYPES = {"csv": "application/gzip", "parquet": "application/vnd.apache.parquet"}
+FILE_EXTENSIONS = {"csv": ".csv.gz", "parquet": ".parquet"}
+
+# Exported columns, The raw event JSON is left out
+COLUMNS = (
+    "block_number", "block_hash", "block_timestamp", "log_index", "tx_hash", "tx_index", "sender", "recipient",
+    "amount0", "amount1", "sqrt_price_x96", "liquidity", "tick", "gas_used", "gas_price",
+    "usd_exchange_rate", "execution_price_eth", "swapped_eth_wei",
+)
+HEX_COLUMNS = {"tx_hash", "sender", "recipient"}
+
+# Wei amounts and the execution price don't fit in the Parquet decimals (38 digits), So they are exported as strings like in the API
+STRING_COLUMNS = {"amount0", "amount1", "sqrt_price_x96", "liquidity", "execution_price_eth", "swapped_eth_wei"}
+
+
+def get_parquet_schema():
+    return pyarrow.schema([
+        ("block_number", pyarrow.int64()),
+        ("block_hash", pyarrow.string()),
+        ("block_timestamp", pyarrow.timestamp("s", tz="UTC")),
+        ("log_index", pyarrow.int64()),
+        ("tx_hash", pyarrow.string()),
+        ("tx_index", pyarrow.int64()),
+        ("sender", pyarrow.string()),
+        ("recipient", pyarrow.string()),
+        ("amount0", pyarrow.string()),
+        ("amount1", pyarrow.string()),
+        ("sqrt_price_x96", pyarrow.string()),
+        ("liquidity", pyarrow.string()),
+        ("tick", pyarrow.int32()),
+        ("gas_used", pyarrow.int64()),
+        ("gas_price", pyarrow.int64()),
+        ("usd_exchange_rate", pyarrow.decimal128(12, 2)),
+        ("execution_price_eth", pyarrow.string()),
+        ("swapped_eth_wei", pyarrow.string()),
+    ])
+
+
+class ExportBuffer(io.RawIOBase):
+    # Write only file object holding the written bytes until they are drained, So that the export is streamed chunk by chunk
+    def __init__(self) -> None:
+        super().__init__()
+        self.chunks: list[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, _data) -> int:
+        self.chunks.append(bytes(_data))
+        self.position += len(_data)
+        return len(_data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def get_final_block_number(_config_obj: Config) -> int | None:
+    # Only the blocks at least REORG_MAX_DEPTH blocks behind the config cursor are exported, So that an export never contains reorged swap events
+    if _config_obj.last_indexed_block is None or _config_obj.last_indexed_block < REORG_MAX_DEPTH:
+        return None
+    return _config_obj.last_indexed_block - REORG_MAX_DEPTH
+
+
+def get_export_queryset(
+    _config_obj: Config,
+    _from_block: int | None = None,
+    _to_block: int | None = None,
+    _from_time: datetime | None = None,
+    _to_time: datetime | None = None,
+) -> tuple[QuerySet, int | None]:
+    """
+    Swap events of the config in the given range ordered by (block_number, log_index), Along with the last block of the export.
+    The last block is capped to the final block of the config, None if there is nothing to export yet.
+    """
+
+    final_block_number = get_final_block_number(_config_obj)
+    to_block = final_block_number if _to_block is None or final_block_number is None else min(_to_block, final_block_number)
+    if to_block is None:
+        return SwapEvent.objects.none(), None
+
+    queryset = SwapEvent.objects.filter(config=_config_obj, block_number__lte=to_block)
+    if _from_block is not None:
+        queryset = queryset.filter(block_number__gte=_from_block)
+    if _from_time:
+        queryset = queryset.filter(block_timestamp__gte=_from_time)
+    if _to_time:
+        queryset = queryset.filter(block_timestamp__lte=_to_time)
+
+    return queryset.order_by("block_number", "log_index"), to_block
+
+
+def iter_chunks(_queryset: QuerySet) -> Iterator[list[tuple]]:
+    # Rows are streamed from a server side cursor on PostgreSQL, So only a chunk of rows is held in memory at a time
+    rows = _queryset.values_list(*COLUMNS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    while chunk := list(islice(rows, EXPORT_CHUNK_SIZE)):
+        yield chunk
+
+
+def to_export_value(_column: str, _value):
+    if _value is None:
+        return None
+    if _column in HEX_COLUMNS:
+        return "0x" + _value.hex()
+    if _column in STRING_COLUMNS:
+        return format(_value, "f") if isinstance(_value, Decimal) else str(_value)
+    return _value
+
+
+def iter_csv(_chunks: Iterable[list[tuple]]) -> Iterator[bytes]:
+    buffer = ExportBuffer()
+    text = io.StringIO()
+    writer = csv.writer(text)
+
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as gzip_file:
+        # Header row, Written even if there are no swap events to export
+        writer.writerow(COLUMNS)
+        gzip_file.write(text.getvalue().encode())
+        text.seek(0)
+        text.truncate()
+
+        for rows in _chunks:
+            writer.writerows(
+                [
+                    value.isoformat() if isinstance(value, datetime) else value
+                    for value in (to_export_value(column, value) for column, value in zip(COLUMNS, row))
+                ]
+                for row in rows
+            )
+            gzip_file.write(text.getvalue().encode())
+            text.seek(0)
+            text.truncate()
+
+            yield buffer.drain()
+
+    # Trailer of the gzip stream
+    yield buffer.drain()
+
+
+def iter_parquet(_chunks: Iterable[list[tuple]]) -> Iterator[bytes]:
+    if pyarrow is None:
+        raise RuntimeError("Parquet exports require pyarrow, Install it with pip install pyarrow")
+
+    buffer = ExportBuffer()
+    schema = get_parquet_schema()
+
+    with pyarrow.parquet.ParquetWriter(buffer, schema, compression="zstd") as writer:
+        for rows in _chunks:
+            columns = [
+                pyarrow.array([to_export_value(field.name, value) for value in values], type=field.type)
+                for field, values in zip(schema, zip(*rows))
+            ]
+
+            # A row group per chunk
+            writer.write_table(pyarrow.Table.from_arrays(columns, schema=schema), row_group_size=len(rows))
+            yield buffer.drain()
+
+    # Footer of the Parquet file
+    yield buffer.drain()
+
+
+def export_swap_events(_queryset: QuerySet, _format: str) -> Iterator[bytes]:
+    # Stream the swap events of the queryset as gzipped CSV or Parquet, In chunks of EXPORT_CHUNK_SIZE rows
+    if _format == "parquet":
+        return iter_parquet(iter_chunks(_queryset))
+    return iter_csv(iter_chunks(_queryset))
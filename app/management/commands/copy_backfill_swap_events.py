@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.models import Config
+from app.tasks import backfill_swap_events, process_swap_events
+
+
+class Command(BaseCommand):
+    help = "Backfill the pending block range of a config, Loading the swap events into PostgreSQL with COPY"
+
+    def add_arguments(self, parser):
+        parser.add_argument("config_id")
+        parser.add_argument(
+            "--partitions", type=int,
+            help="Split the block range into partitions indexed in parallel by the celery workers, Instead of indexing it in this process"
+        )
+
+    def handle(self, *args, **options):
+        config_id = options["config_id"]
+        if not Config.objects.filter(id=config_id).exists():
+            raise CommandError("Config not found")
+
+        if options["partitions"]:
+            backfill_swap_events.apply_async(kwargs={"config_id": config_id, "partitions": options["partitions"], "use_copy": True})
+            self.stdout.write(self.style.SUCCESS("Backfill dispatched to the celery workers"))
+            return
+
+        if not process_swap_events(config_id, use_copy=True):
+            raise CommandError("Backfill failed or the config is already being indexed, See the logs")
+        self.stdout.write(self.style.SUCCESS("Backfill completed"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.partitions import drop_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = "Drop the swap event partitions entirely below a block number, The swap candles of the dropped events are kept"
+
+    def add_arguments(self, parser):
+        parser.add_argument("before_block", type=int, help="Drop the partitions whose blocks are all before this block number")
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            raise CommandError("Swap events are only partitioned on PostgreSQL")
+
+        dropped_partitions = drop_partitions(options["before_block"])
+        self.stdout.write(self.style.SUCCESS(f"Dropped {len(dropped_partitions)} swap event partitions: {', '.join(dropped_partitions)}"))
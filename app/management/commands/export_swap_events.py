@@ -0,0 +1,89 @@
+import os
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.exports import FILE_EXTENSIONS, FORMATS, export_swap_events, get_export_queryset, pyarrow
+from app.models import Config, ExportWatermark
+
+
+def parse_datetime(_value: str) -> datetime:
+    value = datetime.fromisoformat(_value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def get_format(_path: str, _format: str | None) -> str:
+    # Guessed from the file extension unless given
+    if _format:
+        return _format
+    return "parquet" if _path.endswith(FILE_EXTENSIONS["parquet"]) else "csv"
+
+
+class Command(BaseCommand):
+    help = "Export the final swap events of a config to a gzipped CSV or Parquet file, Streamed in chunks of EXPORT_CHUNK_SIZE rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("config_id")
+        parser.add_argument("path", help="Output file, The format is guessed from the extension (.parquet or .csv.gz)")
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--from-block", type=int)
+        parser.add_argument("--to-block", type=int)
+        parser.add_argument("--from-time", type=parse_datetime, help="ISO 8601 datetime")
+        parser.add_argument("--to-time", type=parse_datetime, help="ISO 8601 datetime")
+        parser.add_argument(
+            "--watermark",
+            help="Name of an incremental export job, Exports the swap events after the last block exported by the job and advances it. "
+                 "It can't be used along with --from-block, --from-time and --to-time"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            config = Config.objects.get(id=options["config_id"])
+        except (Config.DoesNotExist, ValueError):
+            raise CommandError("Config not found")
+
+        export_format = get_format(options["path"], options["format"])
+        if export_format == "parquet" and pyarrow is None:
+            raise CommandError("Parquet exports require pyarrow, Install it with pip install pyarrow")
+
+        from_block = options["from_block"]
+        watermark = None
+        if options["watermark"]:
+            if from_block is not None:
+                raise CommandError("--from-block can't be used along with --watermark")
+
+            # The watermark is moved to the last block of the export, So a time filter would skip the swap events outside of it for good
+            if options["from_time"] or options["to_time"]:
+                raise CommandError("--from-time and --to-time can't be used along with --watermark")
+
+            watermark = ExportWatermark.objects.filter(name=options["watermark"], config=config).first()
+            if watermark is not None:
+                from_block = watermark.last_exported_block + 1
+
+        queryset, to_block = get_export_queryset(config, from_block, options["to_block"], options["from_time"], options["to_time"])
+
+        # Written to a temporary file first, So that a failed export never leaves a truncated file behind
+        tmp_path = f"{options['path']}.tmp"
+        try:
+            with open(tmp_path, "wb") as export_file:
+                for chunk in export_swap_events(queryset, export_format):
+                    export_file.write(chunk)
+            os.replace(tmp_path, options["path"])
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # The watermark only moves forward once the file is complete
+        if options["watermark"] and to_block is not None and (from_block is None or to_block >= from_block):
+            ExportWatermark.objects.update_or_create(
+                name=options["watermark"],
+                config=config,
+                defaults={"last_exported_block": to_block}
+            )
+
+        if to_block is None or (from_block is not None and to_block < from_block):
+            self.stdout.write(self.style.WARNING(f"No new final swap events of {config} to export, Wrote an empty export to {options['path']}"))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"Exported the swap events of {config} from block {from_block or 0} to {to_block} to {options['path']}"))
@@ -0,0 +1,107 @@
+import csv
+import json
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Iterator
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.models import EthUsdPrice
+
+BATCH_SIZE = 5000
+
+TIMESTAMP_COLUMNS = ("timestamp", "time")
+PRICE_COLUMNS = ("price", "close")
+
+
+def parse_timestamp(_value: str | int | float) -> datetime:
+    # Unix timestamps are accepted in seconds or milliseconds, Anything else is parsed as an ISO 8601 datetime
+    try:
+        timestamp = float(_value)
+    except ValueError:
+        value = datetime.fromisoformat(str(_value))
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+    if timestamp > 1e12:
+        timestamp /= 1000
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
+
+
+def get_column(_row: dict, _columns: tuple[str, ...]) -> str | int | float:
+    for column in _columns:
+        if column in _row:
+            return _row[column]
+    raise ValueError(f"Missing one of the {_columns} columns")
+
+
+def parse_row(_row: list | dict) -> tuple[datetime, Decimal]:
+    # Coinbase candles are [time, low, high, open, close, volume], Otherwise a (timestamp, price) pair
+    if isinstance(_row, dict):
+        return parse_timestamp(get_column(_row, TIMESTAMP_COLUMNS)), Decimal(str(get_column(_row, PRICE_COLUMNS)))
+
+    if not isinstance(_row, list) or len(_row) < 2:
+        raise ValueError("Expected a Coinbase candle or a (timestamp, price) pair")
+    if len(_row) >= 6:
+        return parse_timestamp(_row[0]), Decimal(str(_row[4]))
+    return parse_timestamp(_row[0]), Decimal(str(_row[1]))
+
+
+def read_prices(_path: str) -> Iterator[tuple[datetime, Decimal]]:
+    with open(_path, newline="") as file:
+        if _path.endswith(".json"):
+            rows = json.load(file)
+        else:
+            rows = csv.DictReader(file)
+
+        for row_number, row in enumerate(rows, start=1):
+            # Decimal raises InvalidOperation on a malformed price and float a TypeError on a null timestamp, Reported along with the row number
+            try:
+                price_row = parse_row(row)
+            except InvalidOperation:
+                raise ValueError(f"Invalid price in row {row_number}: {row}")
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Invalid row {row_number}: {row}, {e}")
+
+            yield price_row
+
+
+class Command(BaseCommand):
+    help = "Bulk load the historical ETH to USD prices from a CSV or JSON file (Coinbase candles or timestamp, price rows)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file with a header row or JSON file")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        total = 0
+
+        # Keyed by timestamp, So that a timestamp repeated within a batch isn't upserted twice by the same statement
+        prices = {}
+
+        def save_prices() -> None:
+            # Existing candles are overwritten, So that a file can be reloaded after a correction
+            EthUsdPrice.objects.bulk_create(
+                list(prices.values()),
+                update_conflicts=True,
+                unique_fields=["timestamp"],
+                update_fields=["price", "modified_at"]
+            )
+
+        try:
+            for timestamp, price in read_prices(options["path"]):
+                # The last row of a repeated timestamp wins, Like in a reload
+                prices[timestamp] = EthUsdPrice(timestamp=timestamp, price=price)
+
+                if len(prices) >= batch_size:
+                    save_prices()
+                    total += len(prices)
+                    prices = {}
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Unable to read the prices: {e}")
+
+        if prices:
+            save_prices()
+            total += len(prices)
+
+        self.stdout.write(self.style.SUCCESS(f"Loaded {total} ETH to USD prices"))
@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.models import Config
+from app.rollups import rebuild_rollups
+
+
+def parse_datetime(_value: str) -> datetime:
+    value = datetime.fromisoformat(_value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class Command(BaseCommand):
+    help = "Recompute the OHLCV swap candles from the stored swap events, e.g. After a backfill"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--config", action="append", dest="config_ids", help="Config ID, Defaults to all the configs")
+        parser.add_argument("--from-time", type=parse_datetime, help="Only rebuild the candles from this ISO 8601 datetime")
+
+    def handle(self, *args, **options):
+        configs = Config.objects.all()
+        if options["config_ids"]:
+            configs = configs.filter(id__in=options["config_ids"])
+            if len(configs) != len(options["config_ids"]):
+                raise CommandError("Config not found")
+
+        for config in configs:
+            rebuild_rollups(config, options["from_time"])
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt the swap candles of {config}"))
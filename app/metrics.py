@@ -0,0 +1,109 @@
+import os
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+
+# Prometheus metrics of the ingestion pipeline.
+# With PROMETHEUS_MULTIPROC_DIR set, Every gunicorn and celery worker process writes its samples to that directory
+# and the /metrics endpoint aggregates them, So the directory has to be shared by the app and the celery workers.
+# The directory is created if missing, Otherwise every sample would raise and take down the RPC calls and the tasks.
+# It must be emptied between runs (docker-compose mounts a tmpfs volume), So that the samples of dead processes don't linger.
+if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_DURATION = Histogram(
+    "swap_indexer_stage_duration_seconds",
+    "Duration of the ingestion stages: fetch_logs, fetch_transactions, fetch_blocks, rate_lookup, validation, db_write and rollups",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+SWAP_EVENTS_WRITTEN = Counter(
+    "swap_indexer_swap_events_written_total",
+    "Swap events written to the DB, Duplicates skipped by the DB included",
+    ["config_id"]
+)
+VALIDATION_FAILURES = Counter(
+    "swap_indexer_validation_failures_total",
+    "Swap events rejected by the schema validation",
+    ["config_id"]
+)
+TRANSACTION_PARSE_FAILURES = Counter(
+    "swap_indexer_transaction_parse_failures_total",
+    "Swap events skipped because the input of their transaction couldn't be parsed",
+    ["config_id"]
+)
+DB_WRITE_FAILURES = Counter(
+    "swap_indexer_db_write_failures_total",
+    "Swap events which couldn't be written to the DB",
+    ["config_id"]
+)
+RPC_CALLS = Counter(
+    "swap_indexer_rpc_calls_total",
+    "JSON-RPC calls sent to the providers, Calls of a batch are counted one by one",
+    ["method"]
+)
+RPC_REQUEST_DURATION = Histogram(
+    "swap_indexer_rpc_request_duration_seconds",
+    "Duration of the successful HTTP requests per endpoint, The endpoint is the digest of its URL",
+    ["endpoint"],
+    buckets=STAGE_BUCKETS
+)
+RPC_ERRORS = Counter(
+    "swap_indexer_rpc_errors_total",
+    "Requests failed by an endpoint and retried on another one (or the same one once rate limited)",
+    ["endpoint", "reason"]
+)
+RETRIES = Counter(
+    "swap_indexer_retries_total",
+    "Retries of the pipeline: rate_limit and failover of the RPC requests, log_window shrinks and row_by_row DB writes",
+    ["reason"]
+)
+CACHE_REQUESTS = Counter(
+    "swap_indexer_cache_requests_total",
+    "Cache lookups by cache (local, transactions, block_receipts, blocks, rpc) and result (hit or miss)",
+    ["cache", "result"]
+)
+BLOCKS_BEHIND_HEAD = Gauge(
+    "swap_indexer_blocks_behind_head",
+    "Blocks between the chain head and the last indexed block of the config",
+    ["config_id"],
+    multiprocess_mode="mostrecent"
+)
+
+
+def track_stage(_stage: str):
+    # Context manager observing the duration of the stage
+    return STAGE_DURATION.labels(stage=_stage).time()
+
+
+def record_cache_requests(_cache: str, _hits: int, _misses: int) -> None:
+    if _hits:
+        CACHE_REQUESTS.labels(cache=_cache, result="hit").inc(_hits)
+    if _misses:
+        CACHE_REQUESTS.labels(cache=_cache, result="miss").inc(_misses)
+
+
+def record_rpc_calls(_calls: list[tuple[str, list]]) -> None:
+    methods = {}
+    for method, _ in _calls:
+        methods[method] = methods.get(method, 0) + 1
+
+    for method, count in methods.items():
+        RPC_CALLS.labels(method=method).inc(count)
+
+
+def get_registry() -> CollectorRegistry:
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+
+    # A new registry per scrape, So that the files of the new worker processes are picked up
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def mark_process_dead(_pid: int) -> None:
+    # Drop the live gauges of an exited worker process
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(_pid)
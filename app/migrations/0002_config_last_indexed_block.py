@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='config',
+            name='last_indexed_block',
+            field=models.PositiveBigIntegerField(blank=True, help_text='<b>Last block number whose swap events are indexed.<br>Indexing resumes from the next block, Clear it to re-index from the start</b>', null=True),
+        ),
+    ]
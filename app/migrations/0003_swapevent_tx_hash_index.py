@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_config_last_indexed_block'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='swapevent',
+            name='tx_hash',
+            field=models.CharField(db_index=True, max_length=255, verbose_name='Transaction Hash'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:32
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_swapevent_tx_hash_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackfillPartition',
+            fields=[
+                ('id', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('from_block', models.PositiveBigIntegerField()),
+                ('to_block', models.PositiveBigIntegerField()),
+                ('last_indexed_block', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='config_backfill_partitions', to='app.config')),
+            ],
+            options={
+                'ordering': ('from_block',),
+            },
+        ),
+    ]
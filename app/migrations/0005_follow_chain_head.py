@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_backfillpartition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='config',
+            name='is_active',
+            field=models.BooleanField(default=True, help_text='<b>Keep indexing the new blocks of this contract</b>'),
+        ),
+        migrations.AddField(
+            model_name='config',
+            name='last_indexed_block_hash',
+            field=models.CharField(blank=True, default='', max_length=66),
+        ),
+        migrations.AddField(
+            model_name='swapevent',
+            name='block_hash',
+            field=models.CharField(blank=True, default='', max_length=66),
+        ),
+    ]
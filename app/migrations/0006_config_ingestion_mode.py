@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_follow_chain_head'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='config',
+            name='ingestion_mode',
+            field=models.CharField(blank=True, choices=[('sync', 'Sync'), ('async', 'Async')], default='', help_text='<b>Leave it empty to use the default ingestion mode</b>', max_length=10),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_config_ingestion_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='config',
+            name='eth_token_index',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Token 0'), (1, 'Token 1')], default=1, help_text='<b>Pool token which is ETH/WETH, Used to derive the execution price from the swap event</b>', verbose_name='ETH token index'),
+        ),
+        migrations.AddField(
+            model_name='config',
+            name='token_decimals',
+            field=models.PositiveSmallIntegerField(default=18, help_text='<b>Decimals of the other pool token</b>'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:42
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_config_swap_decoding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EthUsdPrice',
+            fields=[
+                ('id', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('timestamp', models.DateTimeField(unique=True)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=7)),
+            ],
+            options={
+                'verbose_name': 'ETH/USD price',
+                'ordering': ('timestamp',),
+            },
+        ),
+        migrations.AddField(
+            model_name='swapevent',
+            name='block_timestamp',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:44
+
+import django.db.models.fields.json
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_eth_usd_price_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='swapevent',
+            index=models.Index(fields=['block_number', 'log_index'], name='swap_event_block_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='swapevent',
+            index=models.Index(fields=['config', 'block_number', 'log_index'], name='swap_event_config_block_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='swapevent',
+            index=models.Index(fields=['block_timestamp'], name='swap_event_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='swapevent',
+            index=models.Index(django.db.models.functions.comparison.Cast(django.db.models.fields.json.KeyTextTransform('sender', 'event'), models.TextField()), models.F('block_number'), models.F('log_index'), name='swap_event_sender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='swapevent',
+            index=models.Index(django.db.models.functions.comparison.Cast(django.db.models.functions.comparison.Coalesce(django.db.models.fields.json.KeyTextTransform('recipient', 'event'), django.db.models.fields.json.KeyTextTransform('to', 'event')), models.TextField()), models.F('block_number'), models.F('log_index'), name='swap_event_recipient_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:46
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_swap_event_api_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SwapCandle',
+            fields=[
+                ('id', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('interval', models.CharField(choices=[('1m', '1 Minute'), ('1h', '1 Hour'), ('1d', '1 Day')], max_length=2)),
+                ('bucket', models.DateTimeField(help_text='<b>Start time of the interval</b>')),
+                ('open', models.DecimalField(decimal_places=50, max_digits=200)),
+                ('high', models.DecimalField(decimal_places=50, max_digits=200)),
+                ('low', models.DecimalField(decimal_places=50, max_digits=200)),
+                ('close', models.DecimalField(decimal_places=50, max_digits=200)),
+                ('open_position', models.BigIntegerField()),
+                ('close_position', models.BigIntegerField()),
+                ('volume_usd', models.DecimalField(decimal_places=50, max_digits=200)),
+                ('tx_usd_cost', models.DecimalField(decimal_places=50, max_digits=200, verbose_name='Transaction USD Cost')),
+                ('trade_count', models.PositiveBigIntegerField()),
+                ('config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='config_swap_candles', to='app.config')),
+            ],
+            options={
+                'ordering': ('bucket',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='swapcandle',
+            constraint=models.UniqueConstraint(fields=('config', 'interval', 'bucket'), name='unique_swap_candle'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+import app.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_swap_candle'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='swapevent',
+            name='unique_tx_event',
+        ),
+        migrations.RemoveIndex(
+            model_name='swapevent',
+            name='swap_event_sender_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='swapevent',
+            name='swap_event_recipient_idx',
+        ),
+        migrations.AddField(
+            model_name='swapevent',
+            name='sender',
+            field=app.models.BytesField(max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='swapevent',
+            name='recipient',
+            field=app.models.BytesField(max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='swapevent',
+            name='amount0',
+            field=app.models.WeiField(decimal_places=0, max_digits=78, null=True),
+        ),
+        migrations.AddField(
+            model_name='swapevent',
+            name='amount1',
+            field=app.models.WeiField(decimal_places=0, max_digits=78, null=True),
+        ),
+        migrations.AddField(
+            model_name='swapevent',
+            name='sqrt_price_x96',
+            field=app.models.WeiField(decimal_places=0, max_digits=78, null=True),
+        ),
+        migrations.AddField(
+            model_name='swapevent',
+            name='liquidity',
+            field=app.models.WeiField(decimal_places=0, max_digits=78, null=True),
+        ),
+        migrations.AddField(
+            model_name='swapevent',
+            name='tick',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='swapevent',
+            name='swapped_eth_wei',
+            field=app.models.WeiField(decimal_places=0, max_digits=78, null=True),
+        ),
+        migrations.AddField(
+            model_name='swapevent',
+            name='tx_hash_bytes',
+            field=app.models.BytesField(max_length=32, null=True),
+        ),
+        migrations.AlterField(
+            model_name='swapevent',
+            name='event',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,73 @@
+from decimal import Decimal, localcontext
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+WEI = Decimal(10) ** 18
+
+# The next migration narrows execution_price_eth from Decimal(200, 50) to Decimal(78, 36), So only 42 integer digits are left
+MAX_EXECUTION_PRICE_ETH = Decimal(f"{'9' * 42}.{'9' * 36}")
+
+UPDATE_FIELDS = (
+    "tx_hash_bytes", "sender", "recipient", "amount0", "amount1",
+    "sqrt_price_x96", "liquidity", "tick", "event", "swapped_eth_wei", "execution_price_eth"
+)
+
+
+def to_bytes(_value: str) -> bytes:
+    return bytes.fromhex(_value.removeprefix("0x"))
+
+
+def decode_event(_swap_event) -> None:
+    # Move the args of the known swap events into the typed columns, Other events keep their raw JSON
+    event = _swap_event.event or {}
+
+    if {"sender", "recipient", "amount0", "amount1", "sqrtPriceX96", "liquidity", "tick"} <= event.keys():
+        _swap_event.recipient = to_bytes(event["recipient"])
+        _swap_event.amount0 = int(event["amount0"])
+        _swap_event.amount1 = int(event["amount1"])
+        _swap_event.sqrt_price_x96 = int(event["sqrtPriceX96"])
+        _swap_event.liquidity = int(event["liquidity"])
+        _swap_event.tick = int(event["tick"])
+    elif {"sender", "amount0In", "amount1In", "amount0Out", "amount1Out", "to"} <= event.keys():
+        _swap_event.recipient = to_bytes(event["to"])
+        _swap_event.amount0 = int(event["amount0In"]) - int(event["amount0Out"])
+        _swap_event.amount1 = int(event["amount1In"]) - int(event["amount1Out"])
+    else:
+        return
+
+    _swap_event.sender = to_bytes(event["sender"])
+    _swap_event.event = None
+
+
+def compact_swap_events(apps, schema_editor):
+    SwapEvent = apps.get_model("app", "SwapEvent")
+
+    swap_events = []
+    for swap_event in SwapEvent.objects.order_by().iterator(chunk_size=BATCH_SIZE):
+        swap_event.tx_hash_bytes = to_bytes(swap_event.tx_hash)
+        decode_event(swap_event)
+
+        with localcontext(prec=100):
+            swap_event.swapped_eth_wei = int((swap_event.swapped_eth_cost * WEI).to_integral_value())
+
+            # Clamp the out of range prices (i.e. parsed from garbage calldata), Otherwise altering the column would fail on overflow
+            swap_event.execution_price_eth = max(min(swap_event.execution_price_eth, MAX_EXECUTION_PRICE_ETH), -MAX_EXECUTION_PRICE_ETH)
+
+        swap_events.append(swap_event)
+        if len(swap_events) >= BATCH_SIZE:
+            SwapEvent.objects.bulk_update(swap_events, UPDATE_FIELDS)
+            swap_events = []
+
+    SwapEvent.objects.bulk_update(swap_events, UPDATE_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_swap_event_compact_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(compact_swap_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+import app.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_swap_event_compact_data'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='swapevent',
+            name='tx_hash',
+        ),
+        migrations.RemoveField(
+            model_name='swapevent',
+            name='execution_price_usd',
+        ),
+        migrations.RemoveField(
+            model_name='swapevent',
+            name='tx_eth_cost',
+        ),
+        migrations.RemoveField(
+            model_name='swapevent',
+            name='tx_usd_cost',
+        ),
+        migrations.RemoveField(
+            model_name='swapevent',
+            name='swapped_eth_cost',
+        ),
+        migrations.RemoveField(
+            model_name='swapevent',
+            name='swapped_usd_cost',
+        ),
+        migrations.RenameField(
+            model_name='swapevent',
+            old_name='tx_hash_bytes',
+            new_name='tx_hash',
+        ),
+        migrations.AlterField(
+            model_name='swapevent',
+            name='tx_hash',
+            field=app.models.BytesField(db_index=True, max_length=32, verbose_name='Transaction Hash'),
+        ),
+        migrations.AlterField(
+            model_name='swapevent',
+            name='swapped_eth_wei',
+            field=app.models.WeiField(decimal_places=0, max_digits=78),
+        ),
+        migrations.AlterField(
+            model_name='swapevent',
+            name='execution_price_eth',
+            field=models.DecimalField(decimal_places=36, max_digits=78),
+        ),
+        migrations.AddConstraint(
+            model_name='swapevent',
+            constraint=models.UniqueConstraint(fields=('tx_hash', 'log_index'), name='unique_tx_event'),
+        ),
+        migrations.AddIndex(
+            model_name='swapevent',
+            index=models.Index(fields=['sender', 'block_number', 'log_index'], name='swap_event_sender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='swapevent',
+            index=models.Index(fields=['recipient', 'block_number', 'log_index'], name='swap_event_recipient_idx'),
+        ),
+    ]
@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.db import migrations, models
+
+TABLE = "app_swapevent"
+PARTITIONED_TABLE = "app_swapevent_partitioned"
+PLAIN_TABLE = "app_swapevent_plain"
+PARTITION_SIZE = settings.SWAP_EVENT_PARTITION_SIZE
+
+
+def partition_swap_events(apps, schema_editor):
+    """
+    Convert the swap event table into a table partitioned by block number ranges, PostgreSQL only.
+    The existing indexes and constraints (unique, foreign key and check) are recreated on the partitioned table, The primary key includes the
+    partition key as required by PostgreSQL, So it becomes (id, block_number).
+    """
+
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT indexdef FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = %s
+            AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)
+            """,
+            [TABLE, TABLE]
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype IN ('u', 'f', 'c')",
+            [TABLE]
+        )
+        constraints = cursor.fetchall()
+
+        cursor.execute(f'SELECT MIN("block_number"), MAX("block_number") FROM "{TABLE}"')
+        min_block_number, max_block_number = cursor.fetchone()
+
+        cursor.execute(f'CREATE TABLE "{PARTITIONED_TABLE}" (LIKE "{TABLE}" INCLUDING DEFAULTS) PARTITION BY RANGE ("block_number")')
+
+        # Partitions of the existing swap events, The later ones are created by app.partitions as the chain advances
+        if min_block_number is not None:
+            for start_block in range(min_block_number - min_block_number % PARTITION_SIZE, max_block_number + 1, PARTITION_SIZE):
+                cursor.execute(
+                    f'CREATE TABLE "{TABLE}_p{start_block}" PARTITION OF "{PARTITIONED_TABLE}" '
+                    f'FOR VALUES FROM ({start_block}) TO ({start_block + PARTITION_SIZE})'
+                )
+
+        cursor.execute(f'INSERT INTO "{PARTITIONED_TABLE}" SELECT * FROM "{TABLE}"')
+        cursor.execute(f'DROP TABLE "{TABLE}"')
+        cursor.execute(f'ALTER TABLE "{PARTITIONED_TABLE}" RENAME TO "{TABLE}"')
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY ("id", "block_number")')
+        for name, definition in constraints:
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+        for index_def in index_defs:
+            cursor.execute(index_def)
+
+        # Block numbers are inserted in (roughly) increasing order, So a BRIN index covers the range scans at a fraction of the B-tree size
+        cursor.execute(f'CREATE INDEX "swap_event_block_brin_idx" ON "{TABLE}" USING brin ("block_number")')
+
+
+def unpartition_swap_events(apps, schema_editor):
+    """
+    Convert the partitioned swap event table back into a plain table, PostgreSQL only.
+    The rows of every partition are copied back, The indexes and constraints are recreated except the BRIN index, And the primary key is (id) again.
+    """
+
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        # The indexes of a partitioned table are defined ON ONLY the parent table
+        cursor.execute(
+            """
+            SELECT replace(indexdef, ' ON ONLY ', ' ON ') FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = %s AND indexname != 'swap_event_block_brin_idx'
+            AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)
+            """,
+            [TABLE, TABLE]
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype IN ('u', 'f', 'c')",
+            [TABLE]
+        )
+        constraints = cursor.fetchall()
+
+        cursor.execute(f'CREATE TABLE "{PLAIN_TABLE}" (LIKE "{TABLE}" INCLUDING DEFAULTS)')
+        cursor.execute(f'INSERT INTO "{PLAIN_TABLE}" SELECT * FROM "{TABLE}"')
+
+        # The partitions are dropped along with the partitioned table
+        cursor.execute(f'DROP TABLE "{TABLE}"')
+        cursor.execute(f'ALTER TABLE "{PLAIN_TABLE}" RENAME TO "{TABLE}"')
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY ("id")')
+        for name, definition in constraints:
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+        for index_def in index_defs:
+            cursor.execute(index_def)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_swap_event_drop_derived_columns'),
+    ]
+
+    operations = [
+        # Unique constraints of a partitioned table must include the partition key
+        migrations.RemoveConstraint(
+            model_name='swapevent',
+            name='unique_tx_event',
+        ),
+        migrations.AddConstraint(
+            model_name='swapevent',
+            constraint=models.UniqueConstraint(fields=('tx_hash', 'log_index', 'block_number'), name='unique_tx_event'),
+        ),
+        migrations.RunPython(partition_swap_events, unpartition_swap_events),
+    ]
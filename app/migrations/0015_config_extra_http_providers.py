@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_swap_event_partitioning'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='config',
+            name='extra_http_providers',
+            field=models.JSONField(blank=True, default=list, help_text='<b>List of fallback HTTP provider URLs, For e.g: ["https://..."]<br>Requests are spread across all the providers by their latency and error rate and retried on another provider if one fails</b>', verbose_name='Extra HTTP providers'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:14
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_config_extra_http_providers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportWatermark',
+            fields=[
+                ('id', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=255)),
+                ('last_exported_block', models.PositiveBigIntegerField()),
+                ('config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='config_export_watermarks', to='app.config')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='exportwatermark',
+            constraint=models.UniqueConstraint(fields=('name', 'config'), name='unique_export_watermark'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:19
+
+import app.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_export_watermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Block',
+            fields=[
+                ('number', models.PositiveBigIntegerField(primary_key=True, serialize=False)),
+                ('hash', app.models.BytesField(max_length=32)),
+                ('timestamp', models.DateTimeField()),
+                ('base_fee_per_gas', models.PositiveBigIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ('number',),
+            },
+        ),
+        # The relation is joined on the existing block_number column, So it only changes the migration state
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='swapevent',
+                    name='block',
+                    field=models.ForeignObject(from_fields=['block_number'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='block_swap_events', to='app.block', to_fields=['number']),
+                ),
+            ],
+        ),
+    ]
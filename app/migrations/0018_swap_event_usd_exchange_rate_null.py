@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0017_block'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='swapevent',
+            name='usd_exchange_rate',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True),
+        ),
+    ]
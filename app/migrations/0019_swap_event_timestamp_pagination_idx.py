@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0018_swap_event_usd_exchange_rate_null'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='swapevent',
+            name='swap_event_timestamp_idx',
+        ),
+        migrations.AddIndex(
+            model_name='swapevent',
+            index=models.Index(fields=['block_timestamp', 'block_number', 'log_index'], name='swap_event_timestamp_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0019_swap_event_timestamp_pagination_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ethusdprice',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='swapevent',
+            name='usd_exchange_rate',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0020_usd_price_max_digits'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='swapcandle',
+            name='close',
+            field=models.DecimalField(decimal_places=36, max_digits=78),
+        ),
+        migrations.AlterField(
+            model_name='swapcandle',
+            name='high',
+            field=models.DecimalField(decimal_places=36, max_digits=78),
+        ),
+        migrations.AlterField(
+            model_name='swapcandle',
+            name='low',
+            field=models.DecimalField(decimal_places=36, max_digits=78),
+        ),
+        migrations.AlterField(
+            model_name='swapcandle',
+            name='open',
+            field=models.DecimalField(decimal_places=36, max_digits=78),
+        ),
+        migrations.AlterField(
+            model_name='swapcandle',
+            name='tx_usd_cost',
+            field=models.DecimalField(decimal_places=36, max_digits=78, verbose_name='Transaction USD Cost'),
+        ),
+        migrations.AlterField(
+            model_name='swapcandle',
+            name='volume_usd',
+            field=models.DecimalField(decimal_places=36, max_digits=78),
+        ),
+    ]
@@ -1,5 +1,10 @@
 from ast import mod
 import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
 from django.db import models
 
 
@@ -13,10 +18,21 @@ class BaseModel(models.Model):
 
 
 class Config(BaseModel):
+    class IngestionMode(models.TextChoices):
+        SYNC = "sync", "Sync"
+        ASYNC = "async", "Async"
+
     contract_address = models.CharField(max_length=255, unique=True)
     abi = models.JSONField(default=dict, verbose_name="ABI", help_text="<b>Add ABI JSON</b>")
     http_provider = models.URLField()
+    extra_http_providers = models.JSONField(default=list, blank=True, verbose_name="Extra HTTP providers", help_text="<b>List of fallback HTTP provider URLs, For e.g: [\"https://...\"]<br>Requests are spread across all the providers by their latency and error rate and retried on another provider if one fails</b>")
     block_number = models.PositiveBigIntegerField(default=0, help_text="<b>Block number from where you want to fetch back the swap events.<br>For e.g: If you enter 2000 then swap events will be fetched from -> current block number - 2000</b>")
+    last_indexed_block = models.PositiveBigIntegerField(null=True, blank=True, help_text="<b>Last block number whose swap events are indexed.<br>Indexing resumes from the next block, Clear it to re-index from the start</b>")
+    last_indexed_block_hash = models.CharField(max_length=66, blank=True, default="")
+    is_active = models.BooleanField(default=True, help_text="<b>Keep indexing the new blocks of this contract</b>")
+    eth_token_index = models.PositiveSmallIntegerField(choices=((0, "Token 0"), (1, "Token 1")), default=1, verbose_name="ETH token index", help_text="<b>Pool token which is ETH/WETH, Used to derive the execution price from the swap event</b>")
+    token_decimals = models.PositiveSmallIntegerField(default=18, help_text="<b>Decimals of the other pool token</b>")
+    ingestion_mode = models.CharField(max_length=10, choices=IngestionMode.choices, blank=True, default="", help_text="<b>Leave it empty to use the default ingestion mode</b>")
 
     class Meta:
         ordering = ("-created_at",)
@@ -25,39 +41,238 @@ class Config(BaseModel):
     def __str__(self):
         return self.contract_address
 
+    def get_ingestion_mode(self) -> str:
+        return self.ingestion_mode or settings.INGESTION_MODE
+
+    def clean(self) -> None:
+        super().clean()
+
+        if not isinstance(self.extra_http_providers, list):
+            raise ValidationError({"extra_http_providers": "Enter a list of URLs."})
+
+        validate_url = URLValidator()
+        for provider_url in self.extra_http_providers:
+            try:
+                validate_url(provider_url)
+            except ValidationError:
+                raise ValidationError({"extra_http_providers": f"Enter valid URLs, {provider_url!r} is not a valid URL."})
+
+    def get_provider_urls(self) -> list[str]:
+        # Primary provider first, Duplicates are dropped
+        return list(dict.fromkeys([self.http_provider, *(self.extra_http_providers or [])]))
+
+
+class BackfillPartition(BaseModel):
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
+    config = models.ForeignKey(Config, on_delete=models.CASCADE, related_name="config_backfill_partitions")
+    from_block = models.PositiveBigIntegerField()
+    to_block = models.PositiveBigIntegerField()
+
+    # Cursor of the partition, So that a re-dispatched partition resumes from where it failed
+    last_indexed_block = models.PositiveBigIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ("from_block",)
+
+    def __str__(self):
+        return f"{self.from_block} - {self.to_block}"
+
+
+class ExportWatermark(BaseModel):
+    # Last block exported by an incremental export job, So that its next run only exports the newer swap events
+    name = models.CharField(max_length=255)
+    config = models.ForeignKey(Config, on_delete=models.CASCADE, related_name="config_export_watermarks")
+    last_exported_block = models.PositiveBigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(name="unique_export_watermark", fields=("name", "config"))
+        ]
+
+    def __str__(self):
+        return f"{self.name}: {self.last_exported_block}"
+
+
+class EthUsdPrice(BaseModel):
+    # Historical ETH to USD prices (candle close), Used to convert the swap events at the time of their block
+    timestamp = models.DateTimeField(unique=True)
+    price = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        ordering = ("timestamp",)
+        verbose_name = "ETH/USD price"
+
+    def __str__(self):
+        return f"{self.timestamp}: {self.price}"
+
+
+WEI = Decimal(10) ** 18
+
+
+def from_wei(_value: int) -> Decimal:
+    return Decimal(_value) / WEI
+
+
+class WeiField(models.DecimalField):
+    # Raw wei integers (uint256 and int256 fit in 78 digits), Stored as NUMERIC(78, 0) and read back as int
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("max_digits", 78)
+        kwargs.setdefault("decimal_places", 0)
+        super().__init__(*args, **kwargs)
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else int(value)
+
+
+class BytesField(models.BinaryField):
+    # Hashes and addresses stored as bytea, Read back as bytes instead of the memoryview returned by some drivers
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else bytes(value)
+
+
+class Block(models.Model):
+    # Headers of the blocks with swap events, Shared by all the configs
+    # Keyed by number, A reorged block is overwritten once its new header is fetched
+    number = models.PositiveBigIntegerField(primary_key=True)
+    hash = BytesField(max_length=32)
+    timestamp = models.DateTimeField()
+    base_fee_per_gas = models.PositiveBigIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("number",)
+
+    def __str__(self):
+        return str(self.number)
+
 
 class SwapEvent(BaseModel):
     config = models.ForeignKey(Config, on_delete=models.CASCADE, related_name="config_swap_events")
     block_number = models.PositiveBigIntegerField()
-    event = models.JSONField(default=dict)
+
+    # Joined on the block number without a column of its own, So that the partitioned table and the COPY loads are unchanged
+    block = models.ForeignObject(
+        Block,
+        on_delete=models.DO_NOTHING,
+        from_fields=["block_number"],
+        to_fields=["number"],
+        null=True,
+        related_name="block_swap_events"
+    )
+    block_hash = models.CharField(max_length=66, blank=True, default="")
+    block_timestamp = models.DateTimeField(null=True, blank=True)
     log_index = models.PositiveBigIntegerField()
 
+    # Decoded swap event args, The raw event is only stored when there is no decoder for the config ABI
+    sender = BytesField(max_length=20, null=True)
+    recipient = BytesField(max_length=20, null=True)
+    amount0 = WeiField(null=True)
+    amount1 = WeiField(null=True)
+    sqrt_price_x96 = WeiField(null=True)
+    liquidity = WeiField(null=True)
+    tick = models.IntegerField(null=True)
+    event = models.JSONField(null=True, blank=True)
+
     # Transaction Details
-    tx_hash = models.CharField(max_length=255, unique=True, verbose_name="Transaction Hash")
+    tx_hash = BytesField(max_length=32, db_index=True, verbose_name="Transaction Hash")
     tx_index = models.PositiveBigIntegerField(verbose_name="Transaction Index")
     gas_used = models.PositiveBigIntegerField()
     gas_price = models.PositiveBigIntegerField()
 
     # Store ETH to USD exchange rate at the time of creating a swap event.
     # This will be used to convert all ETH cost to USD
-    usd_exchange_rate = models.DecimalField(max_digits=7, decimal_places=2)
-
-    execution_price_eth = models.DecimalField(max_digits=200, decimal_places=50)
-    execution_price_usd = models.DecimalField(max_digits=200, decimal_places=50)
-
-    tx_eth_cost = models.DecimalField(max_digits=200, decimal_places=50, verbose_name="Transaction ETH Cost")  # Transaction ETH cost is: (gas_used * gas_price) / 1e18
-    tx_usd_cost = models.DecimalField(max_digits=200, decimal_places=50, verbose_name="Transaction USD Cost")
+    # Empty when no price is known for the block, Then the USD values are empty as well
+    usd_exchange_rate = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
 
-    swapped_eth_cost = models.DecimalField(max_digits=200, decimal_places=50)
-    swapped_usd_cost = models.DecimalField(max_digits=200, decimal_places=50)
+    execution_price_eth = models.DecimalField(max_digits=78, decimal_places=36)
+    swapped_eth_wei = WeiField()
 
     class Meta:
         ordering = ('block_number',)
 
         # This will ensure that we don't save duplicate transactions
+        # On PostgreSQL the table is partitioned by block number ranges (See app.partitions), So the constraint includes the partition key
         constraints = [
-            models.UniqueConstraint(name="unique_tx_event", fields=("tx_hash", "log_index"))
+            models.UniqueConstraint(name="unique_tx_event", fields=("tx_hash", "log_index", "block_number"))
+        ]
+
+        # Indexes matching the API filters, All of them end with the (block_number, log_index) pagination key
+        # So that every page is a single index range scan, However deep the cursor is
+        indexes = [
+            models.Index(name="swap_event_block_idx", fields=("block_number", "log_index")),
+            models.Index(name="swap_event_config_block_idx", fields=("config", "block_number", "log_index")),
+            models.Index(name="swap_event_timestamp_idx", fields=("block_timestamp", "block_number", "log_index")),
+            models.Index(name="swap_event_sender_idx", fields=("sender", "block_number", "log_index")),
+            models.Index(name="swap_event_recipient_idx", fields=("recipient", "block_number", "log_index")),
         ]
 
     def __str__(self):
         return str(self.block_number)
+
+    # ETH costs are derived from the wei amounts and the USD values from the exchange rate, Instead of being stored
+
+    def to_usd(self, _eth_value: Decimal) -> Decimal | None:
+        if self.usd_exchange_rate is None:
+            return None
+        return _eth_value * self.usd_exchange_rate
+
+    @property
+    def execution_price_usd(self) -> Decimal | None:
+        return self.to_usd(self.execution_price_eth)
+
+    @property
+    def tx_eth_cost(self) -> Decimal:
+        return from_wei(self.gas_used * self.gas_price)
+
+    @property
+    def tx_usd_cost(self) -> Decimal | None:
+        return self.to_usd(self.tx_eth_cost)
+
+    @property
+    def swapped_eth_cost(self) -> Decimal:
+        return from_wei(self.swapped_eth_wei)
+
+    @property
+    def swapped_usd_cost(self) -> Decimal | None:
+        return self.to_usd(self.swapped_eth_cost)
+
+
+class SwapCandle(BaseModel):
+    # OHLCV rollups of the swap events per config and interval, Maintained incrementally by app.rollups
+    class Interval(models.TextChoices):
+        MINUTE = "1m", "1 Minute"
+        HOUR = "1h", "1 Hour"
+        DAY = "1d", "1 Day"
+
+    config = models.ForeignKey(Config, on_delete=models.CASCADE, related_name="config_swap_candles")
+    interval = models.CharField(max_length=2, choices=Interval.choices)
+    bucket = models.DateTimeField(help_text="<b>Start time of the interval</b>")
+
+    # OHLC of the execution price in USD, Same precision as the execution price of the swap events
+    open = models.DecimalField(max_digits=78, decimal_places=36)
+    high = models.DecimalField(max_digits=78, decimal_places=36)
+    low = models.DecimalField(max_digits=78, decimal_places=36)
+    close = models.DecimalField(max_digits=78, decimal_places=36)
+
+    # Chain position (see rollups.get_position) of the open and close swaps, So that the batches can be merged in any order
+    open_position = models.BigIntegerField()
+    close_position = models.BigIntegerField()
+
+    volume_usd = models.DecimalField(max_digits=78, decimal_places=36)
+    tx_usd_cost = models.DecimalField(max_digits=78, decimal_places=36, verbose_name="Transaction USD Cost")
+    trade_count = models.PositiveBigIntegerField()
+
+    class Meta:
+        ordering = ("bucket",)
+        constraints = [
+            models.UniqueConstraint(name="unique_swap_candle", fields=("config", "interval", "bucket"))
+        ]
+
+    def __str__(self):
+        return f"{self.interval} {self.bucket}"
@@ -0,0 +1,141 @@
+import logging
+import re
+from typing import Callable, Iterable
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+from app.models import SwapEvent
+
+logger = logging.getLogger(__name__)
+
+# Number of blocks per swap event partition, Must not be changed once the partitions are created
+PARTITION_SIZE = settings.SWAP_EVENT_PARTITION_SIZE
+
+PARTITION_BOUND_RE = re.compile(r"FROM \('?(\d+)'?\) TO \('?(\d+)'?\)")
+
+# PostgreSQL error code of a row matching no partition ("no partition of relation ... found for row")
+CHECK_VIOLATION = "23514"
+
+# Start blocks of the partitions known to exist, So that the catalog is only queried for new partitions
+# The cache is per process, A partition dropped by another process is only noticed once an insert fails on it
+created_partitions: set[int] = set()
+
+
+def is_partitioned() -> bool:
+    # Swap events are only partitioned on PostgreSQL, See the 0014_swap_event_partitioning migration
+    return connection.vendor == "postgresql"
+
+
+def get_partition_start(_block_number: int) -> int:
+    return _block_number - _block_number % PARTITION_SIZE
+
+
+def get_partition_name(_start_block: int) -> str:
+    return f"{SwapEvent._meta.db_table}_p{_start_block}"
+
+
+def get_partitions() -> dict[str, tuple[int, int]]:
+    # Map the partitions of the swap event table to their block range, Lower bound inclusive and upper bound exclusive
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [SwapEvent._meta.db_table]
+        )
+
+        partitions = {}
+        for name, bound in cursor.fetchall():
+            if match := PARTITION_BOUND_RE.search(bound):
+                partitions[name] = (int(match.group(1)), int(match.group(2)))
+        return partitions
+
+
+def create_partition(_start_block: int) -> None:
+    quote_name = connection.ops.quote_name
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {quote_name(get_partition_name(_start_block))} "
+            f"PARTITION OF {quote_name(SwapEvent._meta.db_table)} "
+            f"FOR VALUES FROM ({int(_start_block)}) TO ({int(_start_block + PARTITION_SIZE)})"
+        )
+
+    logger.info({"msg": "Created swap event partition", "from_block_number": _start_block, "to_block_number": _start_block + PARTITION_SIZE - 1})
+
+
+def ensure_partitions(_block_numbers: Iterable[int]) -> None:
+    """
+    Create the partitions of the given block numbers if they don't exist yet, Along with the next partition,
+    So that the partition is ready before the chain head reaches it. Called before the swap events are inserted.
+    """
+
+    if not is_partitioned():
+        return
+
+    start_blocks = {get_partition_start(block_number) for block_number in _block_numbers}
+    if not start_blocks:
+        return
+    start_blocks.add(max(start_blocks) + PARTITION_SIZE)
+
+    missing_start_blocks = start_blocks - created_partitions
+    if not missing_start_blocks:
+        return
+
+    existing_start_blocks = {from_block for from_block, _ in get_partitions().values()}
+    for start_block in sorted(missing_start_blocks):
+        if start_block not in existing_start_blocks:
+            create_partition(start_block)
+        created_partitions.add(start_block)
+
+
+def is_missing_partition_error(_error: DatabaseError) -> bool:
+    return getattr(_error.__cause__, "pgcode", None) == CHECK_VIOLATION
+
+
+def insert_into_partitions(_block_numbers: list[int], _insert: Callable[[], None]) -> None:
+    """
+    Run the given insert of the swap events of the given block numbers once their partitions exist.
+    If the insert fails because a cached partition was dropped by another process, The cache is cleared
+    and the insert is retried once after the partitions are checked again in the catalog.
+    """
+
+    ensure_partitions(_block_numbers)
+
+    try:
+        _insert()
+    except DatabaseError as e:
+        if not is_partitioned() or not is_missing_partition_error(e):
+            raise
+
+        logger.warning({"msg": "Swap event partition missing, Checking the partitions again", "error": e})
+        created_partitions.clear()
+        ensure_partitions(_block_numbers)
+        _insert()
+
+
+def drop_partitions(_before_block: int) -> list[str]:
+    # Drop the partitions entirely below the given block number, Returns the names of the dropped partitions
+    if not is_partitioned():
+        return []
+
+    quote_name = connection.ops.quote_name
+
+    dropped_partitions = []
+    for name, (from_block, to_block) in sorted(get_partitions().items(), key=lambda item: item[1]):
+        if to_block > _before_block:
+            continue
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {quote_name(name)}")
+
+        created_partitions.discard(from_block)
+        dropped_partitions.append(name)
+        logger.info({"msg": "Dropped swap event partition", "partition": name})
+
+    return dropped_partitions
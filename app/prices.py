@@ -0,0 +1,62 @@
+import logging
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timezone
+from decimal import Decimal
+from time import monotonic
+
+from django.conf import settings
+
+from app.models import EthUsdPrice
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = settings.PRICE_INDEX_REFRESH_INTERVAL
+MAX_PRICE_AGE = settings.PRICE_MAX_AGE
+
+
+class PriceIndex:
+    """
+    In-memory index of the historical ETH to USD prices, Looked up by block timestamp with a binary search.
+    Timestamps and prices (in cents) are kept in compact arrays, So that years of minute candles fit in the worker memory.
+    """
+
+    def __init__(self) -> None:
+        self.timestamps = array("q")
+        self.prices = array("q")
+        self.loaded_at = None
+
+    def load(self) -> None:
+        """
+        Append the prices after the last loaded one to the index, So that a refresh only reads the newly loaded candles.
+        The prices corrected by a reload of already loaded candles are picked up once the worker restarts.
+        """
+
+        queryset = EthUsdPrice.objects.order_by("timestamp")
+        if self.timestamps:
+            queryset = queryset.filter(timestamp__gt=datetime.fromtimestamp(self.timestamps[-1], tz=timezone.utc))
+
+        count = 0
+        for timestamp, price in queryset.values_list("timestamp", "price").iterator(chunk_size=10000):
+            self.timestamps.append(int(timestamp.timestamp()))
+            self.prices.append(int(price * 100))
+            count += 1
+
+        self.loaded_at = monotonic()
+
+        logger.info({"msg": f"Loaded {count} ETH to USD prices", "total": len(self.timestamps)})
+
+    def get_rate(self, _timestamp: int) -> Decimal | None:
+        # Reload the index periodically, So that the newly loaded prices are picked up by the running workers
+        if self.loaded_at is None or monotonic() - self.loaded_at >= REFRESH_INTERVAL:
+            self.load()
+
+        # Price of the latest candle at or before the timestamp
+        idx = bisect_right(self.timestamps, _timestamp) - 1
+        if idx < 0 or _timestamp - self.timestamps[idx] > MAX_PRICE_AGE:
+            return None
+
+        return Decimal(self.prices[idx]) / 100
+
+
+price_index = PriceIndex()
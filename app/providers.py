@@ -0,0 +1,376 @@
+import asyncio
+import json
+import logging
+import random
+from hashlib import sha1
+from time import monotonic
+from typing import Any, Callable
+
+import aiohttp
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from web3.providers import JSONBaseProvider
+from web3.providers.async_base import AsyncJSONBaseProvider
+
+from app.metrics import RETRIES, RPC_CALLS, RPC_ERRORS, RPC_REQUEST_DURATION
+from app.models import Config
+from app.ratelimit import MAX_RETRIES, TokenBucket, get_provider_bucket, is_rate_limit_error, raise_rate_limit_error
+from app.rpc_cache import cache_results, get_cached_results
+
+logger = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = 60
+HEALTH_CHECK_TIMEOUT = 5
+
+# Endpoints are skipped for a cooldown once they fail UNHEALTHY_AFTER_FAILURES times in a row, Doubled on every further failure
+UNHEALTHY_AFTER_FAILURES = settings.RPC_UNHEALTHY_AFTER_FAILURES
+UNHEALTHY_COOLDOWN = settings.RPC_UNHEALTHY_COOLDOWN
+UNHEALTHY_COOLDOWN_MAX = settings.RPC_UNHEALTHY_COOLDOWN_MAX
+
+# Endpoints further than RPC_MAX_BLOCK_LAG blocks behind the highest head of the pool are skipped until the next health check
+HEALTH_CHECK_INTERVAL = settings.RPC_HEALTH_CHECK_INTERVAL
+MAX_BLOCK_LAG = settings.RPC_MAX_BLOCK_LAG
+
+# Blocks this deep can't be reorganised anymore, So their responses can be cached on disk
+FINALITY_DEPTH = settings.REORG_MAX_DEPTH
+
+# Weight of the latest sample in the moving averages of the latency and the error rate
+SMOOTHING = settings.RPC_LATENCY_SMOOTHING
+MIN_LATENCY = 0.01
+
+
+class Endpoint:
+    """
+    A single JSON-RPC endpoint of a pool along with its keep-alive session and the observed latency and error rate.
+    The stats are kept per process, Every worker learns them from its own requests.
+    """
+
+    def __init__(self, _url: str) -> None:
+        self.url = _url
+        self.bucket: TokenBucket = get_provider_bucket(_url)
+
+        # Keep the connections to the endpoint alive across the requests
+        self.session = requests.Session()
+        self.session.mount(_url, HTTPAdapter(pool_connections=1, pool_maxsize=settings.ASYNC_MAX_IN_FLIGHT))
+
+        self.latency: float | None = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.unhealthy_until = 0.0
+
+    @property
+    def name(self) -> str:
+        # Provider URLs usually contain the API key, So only its digest is logged
+        return sha1(self.url.encode()).hexdigest()[:8]
+
+    def is_healthy(self) -> bool:
+        return monotonic() >= self.unhealthy_until
+
+    def get_weight(self, _default_latency: float) -> float:
+        latency = max(self.latency if self.latency is not None else _default_latency, MIN_LATENCY)
+        return (1 - self.error_rate) / latency + 1e-6
+
+    def record_success(self, _latency: float) -> None:
+        RPC_REQUEST_DURATION.labels(endpoint=self.name).observe(_latency)
+        self.latency = _latency if self.latency is None else (1 - SMOOTHING) * self.latency + SMOOTHING * _latency
+        self.error_rate = (1 - SMOOTHING) * self.error_rate
+        self.failures = 0
+        self.unhealthy_until = 0.0
+
+    def record_failure(self, _error: Exception) -> None:
+        self.error_rate = (1 - SMOOTHING) * self.error_rate + SMOOTHING
+        self.failures += 1
+
+        if self.failures >= UNHEALTHY_AFTER_FAILURES:
+            self.mark_unhealthy(
+                min(UNHEALTHY_COOLDOWN * 2 ** (self.failures - UNHEALTHY_AFTER_FAILURES), UNHEALTHY_COOLDOWN_MAX),
+                str(_error)
+            )
+
+    def mark_unhealthy(self, _cooldown: float, _reason: str) -> None:
+        self.unhealthy_until = monotonic() + _cooldown
+        logger.warning({
+            "msg": f"Endpoint marked as unhealthy for {_cooldown} seconds",
+            "endpoint": self.name,
+            "reason": _reason
+        })
+
+
+def is_failover_error(_error: Exception) -> bool:
+    # Only the errors of the endpoint itself are retried on another endpoint, The rest are raised to the caller as is
+    if is_rate_limit_error(_error):
+        return True
+
+    if isinstance(_error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+        return True
+
+    if isinstance(_error, requests.exceptions.HTTPError) and _error.response is not None:
+        return _error.response.status_code >= 500
+
+    if isinstance(_error, aiohttp.ClientResponseError):
+        return _error.status >= 500
+
+    return False
+
+
+class ProviderPool:
+    """
+    Pool of the JSON-RPC endpoints of a config.
+    Requests are routed to a healthy endpoint picked at random, Weighted by the observed latency and error rate,
+    And transparently retried on another endpoint if the endpoint fails or rate limits us.
+    """
+
+    def __init__(self, _urls: list[str]) -> None:
+        self.endpoints = [Endpoint(url) for url in _urls]
+        self.key = sha1("\n".join(_urls).encode()).hexdigest()
+        self.checked_at: float | None = None
+        self.chain_id: int | None = None
+        self.final_block_number: int | None = None
+        self.final_block_checked_at: float | None = None
+
+    def choose_endpoint(self, _excluded: set[Endpoint]) -> Endpoint | None:
+        candidates = [endpoint for endpoint in self.endpoints if endpoint not in _excluded]
+        if not candidates:
+            return None
+
+        healthy_endpoints = [endpoint for endpoint in candidates if endpoint.is_healthy()]
+        if not healthy_endpoints:
+            # Every endpoint is cooling down, So try the one which recovers first instead of failing right away
+            return min(candidates, key=lambda endpoint: endpoint.unhealthy_until)
+
+        # Endpoints without a latency sample yet are weighted with the average latency of the others
+        latencies = [endpoint.latency for endpoint in self.endpoints if endpoint.latency is not None]
+        default_latency = sum(latencies) / len(latencies) if latencies else 1.0
+
+        return random.choices(
+            healthy_endpoints,
+            weights=[endpoint.get_weight(default_latency) for endpoint in healthy_endpoints]
+        )[0]
+
+    def handle_failure(self, _endpoint: Endpoint, _error: Exception, _excluded: set[Endpoint], _rate_limit_retries: int) -> bool:
+        # Returns whether the request should be retried
+        if not is_failover_error(_error):
+            return False
+
+        reason = "rate_limit" if is_rate_limit_error(_error) else "failover"
+        RPC_ERRORS.labels(endpoint=_endpoint.name, reason=reason).inc()
+        _endpoint.record_failure(_error)
+        logger.warning({
+            "msg": "Error caught from the endpoint, Retrying on another endpoint",
+            "endpoint": _endpoint.name,
+            "error": _error
+        })
+
+        if reason == "rate_limit":
+            # The endpoint is only throttled, So it can be retried after the backoff
+            should_retry = _rate_limit_retries < MAX_RETRIES
+        else:
+            _excluded.add(_endpoint)
+            should_retry = len(_excluded) < len(self.endpoints)
+
+        if should_retry:
+            RETRIES.labels(reason=reason).inc()
+        return should_retry
+
+    def request(self, _tokens: int, _make_request: Callable[[Endpoint], Any]) -> Any:
+        """
+        Send a request through the pool, The given function makes the request to the chosen endpoint.
+        Raises the last error if the request failed on every endpoint.
+        """
+
+        self.check_health_if_due()
+
+        excluded = set()
+        rate_limit_retries = 0
+        while True:
+            endpoint = self.choose_endpoint(excluded)
+            endpoint.bucket.acquire(_tokens)
+
+            started_at = monotonic()
+            try:
+                result = _make_request(endpoint)
+            except Exception as e:
+                if not self.handle_failure(endpoint, e, excluded, rate_limit_retries):
+                    raise
+
+                if is_rate_limit_error(e):
+                    rate_limit_retries += 1
+                    endpoint.bucket.backoff()
+                continue
+
+            endpoint.record_success(monotonic() - started_at)
+            return result
+
+    async def async_request(self, _tokens: int, _make_request: Callable[[Endpoint], Any]) -> Any:
+        # Same as request, The blocking redis and health check calls are run in a thread to keep the event loop free
+        await asyncio.to_thread(self.check_health_if_due)
+
+        excluded = set()
+        rate_limit_retries = 0
+        while True:
+            endpoint = self.choose_endpoint(excluded)
+            await asyncio.to_thread(endpoint.bucket.acquire, _tokens)
+
+            started_at = monotonic()
+            try:
+                result = await _make_request(endpoint)
+            except Exception as e:
+                if not self.handle_failure(endpoint, e, excluded, rate_limit_retries):
+                    raise
+
+                if is_rate_limit_error(e):
+                    rate_limit_retries += 1
+                    await asyncio.to_thread(endpoint.bucket.backoff)
+                continue
+
+            endpoint.record_success(monotonic() - started_at)
+            return result
+
+    def call(self, _method: str, _params: list) -> Any:
+        # Single JSON-RPC call through the pool, Raises the JSON-RPC error if any
+        def post_request(endpoint: Endpoint) -> Any:
+            response = endpoint.session.post(
+                url=endpoint.url,
+                json={"jsonrpc": "2.0", "id": 1, "method": _method, "params": _params},
+                timeout=REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            response_data = raise_rate_limit_error(response.json())
+            if "error" in response_data:
+                raise ValueError(response_data["error"])
+            return response_data["result"]
+
+        RPC_CALLS.labels(method=_method).inc()
+        return self.request(1, post_request)
+
+    def get_chain_id(self) -> int:
+        if self.chain_id is None:
+            self.chain_id = int(self.call("eth_chainId", []), 16)
+        return self.chain_id
+
+    def get_final_block_number(self) -> int:
+        # Blocks deeper than REORG_MAX_DEPTH are considered final, Refreshed every HEALTH_CHECK_INTERVAL seconds
+        if self.final_block_checked_at is None or monotonic() - self.final_block_checked_at >= HEALTH_CHECK_INTERVAL:
+            self.final_block_number = int(self.call("eth_blockNumber", []), 16) - FINALITY_DEPTH
+            self.final_block_checked_at = monotonic()
+        return self.final_block_number
+
+    def get_max_block_lag(self) -> int:
+        # Range queries may be routed to any healthy endpoint, Which can be up to MAX_BLOCK_LAG blocks behind the highest head
+        # A single endpoint is only compared to itself
+        return MAX_BLOCK_LAG if len(self.endpoints) > 1 else 0
+
+    def check_health_if_due(self) -> None:
+        # A single endpoint has nothing to fail over to, So it isn't health checked
+        if len(self.endpoints) < 2:
+            return
+
+        if self.checked_at is None or monotonic() - self.checked_at >= HEALTH_CHECK_INTERVAL:
+            self.checked_at = monotonic()
+            self.check_health()
+
+    def check_health(self) -> None:
+        """
+        Ping every endpoint with eth_blockNumber to refresh its latency,
+        And skip the endpoints which are down or lagging behind the others until the next health check.
+        """
+
+        block_numbers = {}
+        for endpoint in self.endpoints:
+            started_at = monotonic()
+            try:
+                endpoint.bucket.acquire(1)
+                RPC_CALLS.labels(method="eth_blockNumber").inc()
+                response = endpoint.session.post(
+                    url=endpoint.url,
+                    json={"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": []},
+                    timeout=HEALTH_CHECK_TIMEOUT
+                )
+                response.raise_for_status()
+                block_numbers[endpoint] = int(response.json()["result"], 16)
+            except Exception as e:
+                endpoint.record_failure(e)
+                endpoint.mark_unhealthy(HEALTH_CHECK_INTERVAL, f"Health check failed: {e}")
+                continue
+
+            endpoint.record_success(monotonic() - started_at)
+
+        if not block_numbers:
+            return
+
+        head_block_number = max(block_numbers.values())
+        for endpoint, block_number in block_numbers.items():
+            if head_block_number - block_number > MAX_BLOCK_LAG:
+                endpoint.mark_unhealthy(HEALTH_CHECK_INTERVAL, f"Lagging {head_block_number - block_number} blocks behind")
+
+
+# Pools are cached per process by their endpoints, So that the sessions and the endpoint stats outlive a single task
+pools: dict[tuple[str, ...], ProviderPool] = {}
+
+
+def get_provider_pool(_config_obj: Config) -> ProviderPool:
+    key = tuple(_config_obj.get_provider_urls())
+    if key not in pools:
+        pools[key] = ProviderPool(list(key))
+    return pools[key]
+
+
+class PooledHTTPProvider(JSONBaseProvider):
+    # web3 provider sending every request through the pool, Rate limited per endpoint
+    def __init__(self, _pool: ProviderPool) -> None:
+        super().__init__()
+        self.pool = _pool
+
+    def make_request(self, method: str, params: Any) -> Any:
+        request_data = self.encode_rpc_request(method, params)
+
+        # Serve the immutable responses from the on-disk cache, The params are keyed as sent on the wire
+        call = (method, json.loads(request_data)["params"])
+        if cached_results := get_cached_results(self.pool, [call]):
+            return {"jsonrpc": "2.0", "id": json.loads(request_data)["id"], "result": cached_results[0]}
+
+        def post_request(endpoint: Endpoint) -> Any:
+            response = endpoint.session.post(
+                url=endpoint.url,
+                data=request_data,
+                headers={"Content-Type": "application/json"},
+                timeout=REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            return raise_rate_limit_error(self.decode_rpc_response(response.content))
+
+        RPC_CALLS.labels(method=method).inc()
+        response = self.pool.request(1, post_request)
+        cache_results(self.pool, [call], [response.get("result")])
+        return response
+
+
+class PooledAsyncHTTPProvider(AsyncJSONBaseProvider):
+    # Async version of PooledHTTPProvider using the given aiohttp session
+    def __init__(self, _pool: ProviderPool, _session: aiohttp.ClientSession) -> None:
+        super().__init__()
+        self.pool = _pool
+        self.session = _session
+
+    async def make_request(self, method: str, params: Any) -> Any:
+        request_data = self.encode_rpc_request(method, params)
+
+        call = (method, json.loads(request_data)["params"])
+        if cached_results := await asyncio.to_thread(get_cached_results, self.pool, [call]):
+            return {"jsonrpc": "2.0", "id": json.loads(request_data)["id"], "result": cached_results[0]}
+
+        async def post_request(endpoint: Endpoint) -> Any:
+            async with self.session.post(
+                endpoint.url,
+                data=request_data,
+                headers={"Content-Type": "application/json"},
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+            ) as response:
+                response.raise_for_status()
+                return raise_rate_limit_error(self.decode_rpc_response(await response.read()))
+
+        RPC_CALLS.labels(method=method).inc()
+        response = await self.pool.async_request(1, post_request)
+        await asyncio.to_thread(cache_results, self.pool, [call], [response.get("result")])
+        return response
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+from functools import cache
+from hashlib import sha1
+from time import sleep
+from typing import Any, Callable
+
+import aiohttp
+import redis
+import requests
+from django.conf import settings
+
+from app.metrics import RETRIES
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 5
+
+# Backoff applied to all the workers once a rate limit error is received, Doubled on every consecutive error
+BACKOFF_BASE = 1
+BACKOFF_MAX = 60
+BACKOFF_RESET_TIMEOUT = 60
+
+RATE_LIMIT_ERROR_MESSAGES = ("rate limit", "too many requests", "exceeded your capacity", "request limit")
+
+# Refill the bucket based on the elapsed time and take the requested tokens.
+# Returns the number of milliseconds to wait before retrying, 0 if the tokens are taken.
+# Redis server time is used, So that the bucket is consistent across the workers.
+TOKEN_BUCKET_SCRIPT = """
+local backoff = redis.call("PTTL", KEYS[2])
+if backoff > 0 then
+    return backoff
+end
+
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local state = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+local tokens = tonumber(state[1]) or burst
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - updated_at) * rate)
+
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = math.ceil((requested - tokens) / rate * 1000)
+end
+
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated_at", tostring(now))
+redis.call("PEXPIRE", KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return wait
+"""
+
+
+@cache
+def get_redis_client() -> redis.Redis:
+    return redis.Redis.from_url(settings.CACHES["default"]["LOCATION"])
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter stored in redis, So that it's shared by all the workers hitting the same endpoint.
+    A rate of 0 disables the limiter.
+    """
+
+    def __init__(self, _name: str, rate: float, burst: int) -> None:
+        self.key = f"rate_limit:{_name}"
+        self.backoff_key = f"{self.key}:backoff"
+        self.backoff_level_key = f"{self.key}:backoff_level"
+        self.rate = rate
+        self.burst = max(int(burst), 1)
+
+    def acquire(self, _tokens: int = 1) -> None:
+        if self.rate <= 0:
+            return
+
+        client = get_redis_client()
+        script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+        # Requests larger than the burst are taken in burst sized parts
+        remaining_tokens = _tokens
+        while remaining_tokens > 0:
+            tokens = min(remaining_tokens, self.burst)
+            wait = script(keys=[self.key, self.backoff_key], args=[self.rate, self.burst, tokens])
+
+            if wait:
+                sleep(int(wait) / 1000)
+                continue
+
+            remaining_tokens -= tokens
+
+    def backoff(self) -> None:
+        if self.rate <= 0:
+            return
+
+        client = get_redis_client()
+        level = client.incr(self.backoff_level_key)
+        client.expire(self.backoff_level_key, BACKOFF_RESET_TIMEOUT)
+
+        delay = min(BACKOFF_BASE * 2 ** (level - 1), BACKOFF_MAX)
+        client.set(self.backoff_key, 1, px=int(delay * 1000))
+
+        logger.warning({
+            "msg": f"Rate limited by the endpoint, Backing off for {delay} seconds",
+            "key": self.key
+        })
+
+
+@cache
+def get_provider_bucket(_provider_url: str) -> TokenBucket:
+    # Provider URLs usually contain the API key, So only its digest is used in the redis key
+    return TokenBucket(
+        sha1(_provider_url.encode()).hexdigest(),
+        rate=settings.RPC_REQUESTS_PER_SECOND,
+        burst=settings.RPC_BURST
+    )
+
+
+@cache
+def get_coinbase_bucket() -> TokenBucket:
+    return TokenBucket("coinbase", rate=settings.COINBASE_REQUESTS_PER_SECOND, burst=settings.COINBASE_BURST)
+
+
+def is_rate_limit_error(_error: Exception) -> bool:
+    if isinstance(_error, requests.exceptions.HTTPError) and _error.response is not None:
+        return _error.response.status_code == 429
+
+    if isinstance(_error, aiohttp.ClientResponseError):
+        return _error.status == 429
+
+    message = str(_error).lower()
+    return any(error_message in message for error_message in RATE_LIMIT_ERROR_MESSAGES)
+
+
+def call_with_rate_limit(_bucket: TokenBucket, _tokens: int, _make_request: Callable[[], Any]) -> Any:
+    # Take the tokens before every attempt and back off all the workers whenever the endpoint rate limits us
+    for attempt in range(MAX_RETRIES + 1):
+        _bucket.acquire(_tokens)
+
+        try:
+            return _make_request()
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt == MAX_RETRIES:
+                raise
+
+            RETRIES.labels(reason="rate_limit").inc()
+            _bucket.backoff()
+
+
+async def async_call_with_rate_limit(_bucket: TokenBucket, _tokens: int, _make_request: Callable[[], Any]) -> Any:
+    # Same as call_with_rate_limit, The blocking redis calls are run in a thread to keep the event loop free
+    for attempt in range(MAX_RETRIES + 1):
+        await asyncio.to_thread(_bucket.acquire, _tokens)
+
+        try:
+            return await _make_request()
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt == MAX_RETRIES:
+                raise
+
+            RETRIES.labels(reason="rate_limit").inc()
+            await asyncio.to_thread(_bucket.backoff)
+
+
+def raise_rate_limit_error(_response: Any) -> Any:
+    # Rate limit errors can also be returned as a JSON-RPC error with a 200 status code
+    if "error" in _response and is_rate_limit_error(Exception(_response["error"])):
+        raise ValueError(_response["error"])
+    return _response
+
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import traceback
+
+import aiohttp
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from app.cache import tiered_cache
+from app.metrics import record_cache_requests
+from app.providers import ProviderPool
+from app.rpc import async_batch_request, batch_request, is_method_supported
+
+logger = logging.getLogger(__name__)
+
+CACHE_TIMEOUT = 3600
+SUPPORT_CACHE_TIMEOUT = 24 * 3600
+
+# Number of blocks (eth_getBlockReceipts) or transactions (eth_getTransactionReceipt) per JSON-RPC batch request
+BLOCK_RECEIPTS_BATCH_SIZE = settings.BLOCK_RECEIPTS_BATCH_SIZE
+TX_BATCH_SIZE = settings.TX_BATCH_SIZE
+
+
+def parse_receipt(_receipt: dict) -> dict:
+    # Only keep the fields needed for the transaction cost, So that the cached blocks stay small
+    # Some clients leave the effective gas price out of the pre-London receipts, The gas price of the transaction is used instead
+    effective_gas_price = _receipt.get("effectiveGasPrice")
+    return {
+        "gas_used": int(_receipt["gasUsed"], 16),
+        "effective_gas_price": int(effective_gas_price, 16) if effective_gas_price is not None else None
+    }
+
+
+def parse_block_receipts(_block_hashes: list[str], _blocks: list) -> dict[str, dict]:
+    # Map cache key -> receipts of the block keyed by tx hash
+    return {
+        f"block_receipts:{block_hash}": {receipt["transactionHash"]: parse_receipt(receipt) for receipt in block_receipts}
+        for block_hash, block_receipts in zip(_block_hashes, _blocks) if block_receipts is not None
+    }
+
+
+def parse_transaction_receipts(_tx_hashes: list[str], _tx_receipts: list) -> dict[str, dict]:
+    return {tx_hash: parse_receipt(receipt) for tx_hash, receipt in zip(_tx_hashes, _tx_receipts) if receipt is not None}
+
+
+def is_block_receipts_supported(_pool: ProviderPool) -> bool:
+    # eth_getBlockReceipts is not a part of the standard API, So probe the endpoints once with the genesis block
+    return tiered_cache.get_or_set(
+        f"block_receipts_supported:{_pool.key}",
+        lambda: is_method_supported(_pool, "eth_getBlockReceipts", ["0x0"]),
+        SUPPORT_CACHE_TIMEOUT
+    )
+
+
+def get_block_receipts(_pool: ProviderPool, _block_hashes: list[str]) -> dict[str, dict]:
+    # Receipts are cached per block hash, So that they are reused across the configs and never survive a reorg
+    cache_keys = {f"block_receipts:{block_hash}": block_hash for block_hash in _block_hashes}
+    cached_blocks = tiered_cache.get_many(list(cache_keys))
+
+    receipts = {}
+    for block_receipts in cached_blocks.values():
+        receipts.update(block_receipts)
+
+    missing_block_hashes = [block_hash for cache_key, block_hash in cache_keys.items() if cache_key not in cached_blocks]
+    record_cache_requests("block_receipts", len(cached_blocks), len(missing_block_hashes))
+    for idx in range(0, len(missing_block_hashes), BLOCK_RECEIPTS_BATCH_SIZE):
+        block_hashes = missing_block_hashes[idx:idx+BLOCK_RECEIPTS_BATCH_SIZE]
+
+        try:
+            blocks = batch_request(
+                _pool,
+                [("eth_getBlockReceipts", [block_hash]) for block_hash in block_hashes]
+            )
+        except Exception as e:
+            logger.error({
+                "msg": "Error caught while fetching block receipts",
+                "error": e,
+                "traceback": traceback.format_exc(),
+                "block_hashes": block_hashes,
+            })
+            continue
+
+        fetched_blocks = parse_block_receipts(block_hashes, blocks)
+        tiered_cache.set_many(fetched_blocks, CACHE_TIMEOUT)
+        for block_receipts in fetched_blocks.values():
+            receipts.update(block_receipts)
+
+    return receipts
+
+
+def get_transaction_receipts(_pool: ProviderPool, _tx_hashes: list[str]) -> dict[str, dict]:
+    receipts = {}
+
+    for idx in range(0, len(_tx_hashes), TX_BATCH_SIZE):
+        tx_hashes = _tx_hashes[idx:idx+TX_BATCH_SIZE]
+
+        try:
+            tx_receipts = batch_request(
+                _pool,
+                [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in tx_hashes]
+            )
+        except Exception as e:
+            logger.error({
+                "msg": "Error caught while fetching transaction receipts",
+                "error": e,
+                "traceback": traceback.format_exc(),
+                "tx_hashes": tx_hashes,
+            })
+            continue
+
+        receipts.update(parse_transaction_receipts(tx_hashes, tx_receipts))
+
+    return receipts
+
+
+def get_receipts(_pool: ProviderPool, _tx_blocks: dict[str, str]) -> dict[str, dict]:
+    """
+    Fetch the receipts (gas used and effective gas price) of the given transactions, Mapped as tx hash -> block hash.
+    Receipts are fetched per block with eth_getBlockReceipts if the endpoints support it, Otherwise per transaction.
+    """
+
+    receipts = {}
+    if _tx_blocks and is_block_receipts_supported(_pool):
+        block_receipts = get_block_receipts(_pool, list(dict.fromkeys(_tx_blocks.values())))
+        receipts = {tx_hash: block_receipts[tx_hash] for tx_hash in _tx_blocks if tx_hash in block_receipts}
+
+    # Fallback to the batched transaction receipts for the rest
+    missing_tx_hashes = [tx_hash for tx_hash in _tx_blocks if tx_hash not in receipts]
+    receipts.update(get_transaction_receipts(_pool, missing_tx_hashes))
+
+    return receipts
+
+
+async def async_get_block_receipts(_session: aiohttp.ClientSession, _semaphore: asyncio.Semaphore, _pool: ProviderPool, _block_hashes: list[str]) -> dict[str, dict]:
+    # Async version of get_block_receipts, The batches are fetched concurrently and the semaphore bounds the number in flight
+    cache_keys = {f"block_receipts:{block_hash}": block_hash for block_hash in _block_hashes}
+    cached_blocks = await sync_to_async(tiered_cache.get_many)(list(cache_keys))
+
+    receipts = {}
+    for block_receipts in cached_blocks.values():
+        receipts.update(block_receipts)
+
+    missing_block_hashes = [block_hash for cache_key, block_hash in cache_keys.items() if cache_key not in cached_blocks]
+    record_cache_requests("block_receipts", len(cached_blocks), len(missing_block_hashes))
+
+    async def fetch_batch(_batch_block_hashes: list[str]) -> dict[str, dict]:
+        try:
+            async with _semaphore:
+                blocks = await async_batch_request(
+                    _session,
+                    _pool,
+                    [("eth_getBlockReceipts", [block_hash]) for block_hash in _batch_block_hashes]
+                )
+        except Exception as e:
+            logger.error({
+                "msg": "Error caught while fetching block receipts",
+                "error": e,
+                "traceback": traceback.format_exc(),
+                "block_hashes": _batch_block_hashes,
+            })
+            return {}
+
+        fetched_blocks = parse_block_receipts(_batch_block_hashes, blocks)
+        await sync_to_async(tiered_cache.set_many)(fetched_blocks, CACHE_TIMEOUT)
+        return fetched_blocks
+
+    for fetched_blocks in await asyncio.gather(*(
+        fetch_batch(missing_block_hashes[idx:idx+BLOCK_RECEIPTS_BATCH_SIZE])
+        for idx in range(0, len(missing_block_hashes), BLOCK_RECEIPTS_BATCH_SIZE)
+    )):
+        for block_receipts in fetched_blocks.values():
+            receipts.update(block_receipts)
+
+    return receipts
+
+
+async def async_get_transaction_receipts(_session: aiohttp.ClientSession, _semaphore: asyncio.Semaphore, _pool: ProviderPool, _tx_hashes: list[str]) -> dict[str, dict]:
+    async def fetch_batch(_batch_tx_hashes: list[str]) -> dict[str, dict]:
+        try:
+            async with _semaphore:
+                tx_receipts = await async_batch_request(
+                    _session,
+                    _pool,
+                    [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in _batch_tx_hashes]
+                )
+        except Exception as e:
+            logger.error({
+                "msg": "Error caught while fetching transaction receipts",
+                "error": e,
+                "traceback": traceback.format_exc(),
+                "tx_hashes": _batch_tx_hashes,
+            })
+            return {}
+
+        return parse_transaction_receipts(_batch_tx_hashes, tx_receipts)
+
+    receipts = {}
+    for batch_receipts in await asyncio.gather(*(
+        fetch_batch(_tx_hashes[idx:idx+TX_BATCH_SIZE]) for idx in range(0, len(_tx_hashes), TX_BATCH_SIZE)
+    )):
+        receipts.update(batch_receipts)
+
+    return receipts
+
+
+async def async_get_receipts(_session: aiohttp.ClientSession, _semaphore: asyncio.Semaphore, _pool: ProviderPool, _tx_blocks: dict[str, str]) -> dict[str, dict]:
+    # Async version of get_receipts
+    receipts = {}
+    if _tx_blocks and await sync_to_async(is_block_receipts_supported)(_pool):
+        block_receipts = await async_get_block_receipts(_session, _semaphore, _pool, list(dict.fromkeys(_tx_blocks.values())))
+        receipts = {tx_hash: block_receipts[tx_hash] for tx_hash in _tx_blocks if tx_hash in block_receipts}
+
+    missing_tx_hashes = [tx_hash for tx_hash in _tx_blocks if tx_hash not in receipts]
+    receipts.update(await async_get_transaction_receipts(_session, _semaphore, _pool, missing_tx_hashes))
+
+    return receipts
@@ -0,0 +1,210 @@
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Iterable
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone as django_timezone
+
+from app.models import Config, SwapCandle, SwapEvent, from_wei
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = settings.DB_BATCH_SIZE
+
+INTERVALS = {
+    SwapCandle.Interval.MINUTE: 60,
+    SwapCandle.Interval.HOUR: 3600,
+    SwapCandle.Interval.DAY: 86400,
+}
+
+# Log index takes the lower bits of the chain position
+LOG_INDEX_BITS = 20
+
+SWAP_EVENT_FIELDS = (
+    "config_id", "block_number", "log_index", "block_timestamp",
+    "usd_exchange_rate", "execution_price_eth", "swapped_eth_wei", "gas_used", "gas_price"
+)
+CANDLE_FIELDS = (
+    "id", "created_at", "modified_at", "config", "interval", "bucket",
+    "open", "high", "low", "close", "open_position", "close_position",
+    "volume_usd", "tx_usd_cost", "trade_count"
+)
+
+
+def get_position(_block_number: int, _log_index: int) -> int:
+    return (_block_number << LOG_INDEX_BITS) | _log_index
+
+
+def get_bucket(_timestamp: datetime, _seconds: int) -> datetime:
+    timestamp = int(_timestamp.timestamp())
+    return datetime.fromtimestamp(timestamp - timestamp % _seconds, tz=timezone.utc)
+
+
+def compute_candles(_swap_events: Iterable[dict], _min_buckets: dict | None = None) -> dict[tuple, dict]:
+    """
+    Aggregate the given swap events (dicts of SWAP_EVENT_FIELDS) into candles keyed by (config_id, interval, bucket).
+    Buckets before the _min_buckets of their interval are skipped, Events without a block timestamp can't be bucketed
+    and the events without an exchange rate have no USD price.
+    """
+
+    candles = {}
+    for swap_event in _swap_events:
+        if swap_event["block_timestamp"] is None or swap_event["usd_exchange_rate"] is None:
+            continue
+
+        position = get_position(swap_event["block_number"], swap_event["log_index"])
+
+        # USD values are derived from the stored ETH values, Same as the SwapEvent properties
+        usd_exchange_rate = swap_event["usd_exchange_rate"]
+        price = swap_event["execution_price_eth"] * usd_exchange_rate
+        volume_usd = from_wei(swap_event["swapped_eth_wei"]) * usd_exchange_rate
+        tx_usd_cost = from_wei(swap_event["gas_used"] * swap_event["gas_price"]) * usd_exchange_rate
+
+        for interval, seconds in INTERVALS.items():
+            bucket = get_bucket(swap_event["block_timestamp"], seconds)
+            if _min_buckets and bucket < _min_buckets[interval]:
+                continue
+
+            candle = candles.get((swap_event["config_id"], interval, bucket))
+            if candle is None:
+                candles[(swap_event["config_id"], interval, bucket)] = {
+                    "open": price, "high": price, "low": price, "close": price,
+                    "open_position": position, "close_position": position,
+                    "volume_usd": volume_usd,
+                    "tx_usd_cost": tx_usd_cost,
+                    "trade_count": 1
+                }
+                continue
+
+            if position < candle["open_position"]:
+                candle["open"], candle["open_position"] = price, position
+            if position > candle["close_position"]:
+                candle["close"], candle["close_position"] = price, position
+            candle["high"] = max(candle["high"], price)
+            candle["low"] = min(candle["low"], price)
+            candle["volume_usd"] += volume_usd
+            candle["tx_usd_cost"] += tx_usd_cost
+            candle["trade_count"] += 1
+
+    return candles
+
+
+def get_upsert_sql() -> str:
+    quote_name = connection.ops.quote_name
+    columns = [SwapCandle._meta.get_field(field).column for field in CANDLE_FIELDS]
+
+    def pick(_column: str, _operator: str, _compare_column: str | None = None) -> str:
+        # Keep the existing value unless the new one is before (open) or after (close) or beyond (high, low) it
+        compare_column = quote_name(_compare_column or _column)
+        return (
+            f"{quote_name(_column)} = CASE WHEN EXCLUDED.{compare_column} {_operator} candle.{compare_column} "
+            f"THEN EXCLUDED.{quote_name(_column)} ELSE candle.{quote_name(_column)} END"
+        )
+
+    def add(_column: str) -> str:
+        return f"{quote_name(_column)} = candle.{quote_name(_column)} + EXCLUDED.{quote_name(_column)}"
+
+    # Open and close are updated before their positions, Every SET expression reads the existing row
+    updates = [
+        pick("open", "<", "open_position"),
+        pick("open_position", "<"),
+        pick("close", ">", "close_position"),
+        pick("close_position", ">"),
+        pick("high", ">"),
+        pick("low", "<"),
+        add("volume_usd"),
+        add("tx_usd_cost"),
+        add("trade_count"),
+        f"{quote_name('modified_at')} = EXCLUDED.{quote_name('modified_at')}",
+    ]
+
+    return (
+        f"INSERT INTO {quote_name(SwapCandle._meta.db_table)} AS candle ({', '.join(map(quote_name, columns))}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({quote_name('config_id')}, {quote_name('interval')}, {quote_name('bucket')}) "
+        f"DO UPDATE SET {', '.join(updates)}"
+    )
+
+
+def upsert_candles(_candles: dict[tuple, dict]) -> None:
+    # Merge the candles into the stored ones within the upsert, So that concurrent writers don't lose updates
+    if not _candles:
+        return
+
+    now = django_timezone.now()
+    fields = [SwapCandle._meta.get_field(field) for field in CANDLE_FIELDS]
+
+    # Upsert in a stable order, So that concurrent batches lock the candle rows in the same order
+    rows = []
+    for (config_id, interval, bucket), candle in sorted(_candles.items(), key=lambda item: (str(item[0][0]), item[0][1], item[0][2])):
+        values = {
+            "id": uuid.uuid4(),
+            "created_at": now,
+            "modified_at": now,
+            "config": config_id,
+            "interval": interval,
+            "bucket": bucket,
+            **candle
+        }
+        rows.append([field.get_db_prep_save(values[field.name], connection) for field in fields])
+
+    with connection.cursor() as cursor:
+        cursor.executemany(get_upsert_sql(), rows)
+
+
+def update_rollups(_swap_event_objs: list[SwapEvent]) -> None:
+    """
+    Add the newly inserted swap events among the given ones to the candles.
+    Only the inserted events are stored with the generated ids, The duplicates skipped by the insert keep their existing ids.
+    Called in the same transaction as the insert, So that the candles never count an event twice or miss one.
+    """
+
+    if not _swap_event_objs:
+        return
+
+    # The block range lets PostgreSQL skip the other partitions
+    block_numbers = [swap_event_obj.block_number for swap_event_obj in _swap_event_objs]
+    swap_events = SwapEvent.objects.filter(
+        id__in=[swap_event_obj.id for swap_event_obj in _swap_event_objs],
+        block_number__gte=min(block_numbers),
+        block_number__lte=max(block_numbers)
+    ).values(*SWAP_EVENT_FIELDS)
+    upsert_candles(compute_candles(swap_events))
+
+
+def rebuild_rollups(_config_obj: Config, _from_timestamp: datetime | None = None) -> None:
+    """
+    Recompute the candles of a config from the stored swap events, From the buckets containing _from_timestamp or from the start.
+    Used after a backfill or a chain reorganisation, When the stored events changed without going through the writer.
+    """
+
+    min_buckets = {
+        interval: get_bucket(_from_timestamp, seconds) if _from_timestamp else datetime.min.replace(tzinfo=timezone.utc)
+        for interval, seconds in INTERVALS.items()
+    }
+
+    swap_events = SwapEvent.objects.filter(config=_config_obj, block_timestamp__isnull=False)
+    if _from_timestamp:
+        swap_events = swap_events.filter(block_timestamp__gte=min(min_buckets.values()))
+
+    with transaction.atomic():
+        for interval, min_bucket in min_buckets.items():
+            SwapCandle.objects.filter(config=_config_obj, interval=interval, bucket__gte=min_bucket).delete()
+
+        batch = []
+        for swap_event in swap_events.order_by("block_number", "log_index").values(*SWAP_EVENT_FIELDS).iterator(chunk_size=BATCH_SIZE):
+            batch.append(swap_event)
+
+            if len(batch) >= BATCH_SIZE:
+                upsert_candles(compute_candles(batch, min_buckets))
+                batch = []
+
+        upsert_candles(compute_candles(batch, min_buckets))
+
+    logger.info({
+        "msg": "Rebuilt the swap candles",
+        "config_id": _config_obj.id,
+        "from_timestamp": _from_timestamp
+    })
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from itertools import count
+from typing import Any
+
+import aiohttp
+from web3 import AsyncWeb3, Web3
+
+from app.metrics import record_rpc_calls
+from app.providers import REQUEST_TIMEOUT, Endpoint, PooledAsyncHTTPProvider, PooledHTTPProvider, ProviderPool, is_failover_error
+from app.ratelimit import call_with_rate_limit
+from app.rpc_cache import cache_results, get_cached_results
+
+logger = logging.getLogger(__name__)
+
+METHOD_NOT_FOUND_CODE = -32601
+METHOD_NOT_FOUND_MESSAGES = ("not found", "not supported", "unsupported", "does not exist", "not available")
+
+request_ids = count(1)
+
+
+def build_batch_payload(_calls: list[tuple[str, list]]) -> list[dict]:
+    return [
+        {"jsonrpc": "2.0", "id": next(request_ids), "method": method, "params": params}
+        for method, params in _calls
+    ]
+
+
+def validate_batch_response(_response_data: list | dict) -> list:
+    # A rejected batch is returned as a single JSON-RPC error instead of a list of responses
+    if isinstance(_response_data, dict):
+        raise ValueError(_response_data.get("error", _response_data))
+    return _response_data
+
+
+def parse_batch_response(_payload: list[dict], _response_data: list) -> list:
+    # Providers are free to return batch responses in any order, So match them back using the request ID
+    responses = {item.get("id"): item for item in _response_data}
+
+    results = []
+    for call in _payload:
+        item = responses.get(call["id"], {})
+
+        if "error" in item or "result" not in item:
+            logger.error({
+                "msg": "Error caught in JSON-RPC batch response",
+                "method": call["method"],
+                "params": call["params"],
+                "error": item.get("error")
+            })
+            results.append(None)
+        else:
+            results.append(item["result"])
+
+    return results
+
+
+def merge_results(_count: int, _cached_results: dict[int, Any], _fetched_results: list) -> list:
+    # Put the cached results back in between the fetched ones, In the order of the calls
+    fetched_results = iter(_fetched_results)
+    return [_cached_results[idx] if idx in _cached_results else next(fetched_results) for idx in range(_count)]
+
+
+def batch_request(_pool: ProviderPool, _calls: list[tuple[str, list]]) -> list:
+    """
+    Send the given (method, params) calls as a single JSON-RPC batch request to an endpoint of the pool.
+    Results are returned in the same order as the calls, failed calls are returned as None.
+    """
+
+    if not _calls:
+        return []
+
+    # Serve the immutable responses from the on-disk cache and only send the rest
+    cached_results = get_cached_results(_pool, _calls)
+    missing_calls = [call for idx, call in enumerate(_calls) if idx not in cached_results]
+    if not missing_calls:
+        return merge_results(len(_calls), cached_results, [])
+
+    payload = build_batch_payload(missing_calls)
+
+    def post_batch(endpoint: Endpoint) -> list:
+        response = endpoint.session.post(url=endpoint.url, json=payload, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return validate_batch_response(response.json())
+
+    # Every call of the batch is counted against the endpoint rate limit
+    record_rpc_calls(missing_calls)
+    response_data = _pool.request(len(payload), post_batch)
+    fetched_results = parse_batch_response(payload, response_data)
+    cache_results(_pool, missing_calls, fetched_results)
+
+    return merge_results(len(_calls), cached_results, fetched_results)
+
+
+def is_method_supported(_pool: ProviderPool, _method: str, _params: list) -> bool:
+    # Requests can be routed to any endpoint of the pool, So the method has to be supported by all the reachable ones
+    payload = {"jsonrpc": "2.0", "id": next(request_ids), "method": _method, "params": _params}
+
+    supported = None
+    for endpoint in _pool.endpoints:
+        def post_request() -> dict:
+            response = endpoint.session.post(url=endpoint.url, json=payload, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            return response.json()
+
+        try:
+            record_rpc_calls([(_method, _params)])
+            error = call_with_rate_limit(endpoint.bucket, 1, post_request).get("error") or {}
+        except Exception as e:
+            # An endpoint which is down can't tell, Unless it's the only one
+            if not is_failover_error(e) or len(_pool.endpoints) == 1:
+                raise
+            continue
+
+        message = str(error.get("message", "")).lower()
+        if error.get("code") == METHOD_NOT_FOUND_CODE or any(
+            error_message in message for error_message in METHOD_NOT_FOUND_MESSAGES
+        ):
+            return False
+        supported = True
+
+    if supported is None:
+        raise ConnectionError(f"None of the endpoints could be reached to check {_method}")
+    return supported
+
+
+async def async_batch_request(_session: aiohttp.ClientSession, _pool: ProviderPool, _calls: list[tuple[str, list]]) -> list:
+    # Async version of batch_request using the given aiohttp session
+    if not _calls:
+        return []
+
+    cached_results = await asyncio.to_thread(get_cached_results, _pool, _calls)
+    missing_calls = [call for idx, call in enumerate(_calls) if idx not in cached_results]
+    if not missing_calls:
+        return merge_results(len(_calls), cached_results, [])
+
+    payload = build_batch_payload(missing_calls)
+
+    async def post_batch(endpoint: Endpoint) -> list:
+        async with _session.post(endpoint.url, json=payload, timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as response:
+            response.raise_for_status()
+            return validate_batch_response(await response.json(content_type=None))
+
+    record_rpc_calls(missing_calls)
+    response_data = await _pool.async_request(len(payload), post_batch)
+    fetched_results = parse_batch_response(payload, response_data)
+    await asyncio.to_thread(cache_results, _pool, missing_calls, fetched_results)
+
+    return merge_results(len(_calls), cached_results, fetched_results)
+
+
+def make_web3(_pool: ProviderPool) -> Web3:
+    # All the requests made through the web3 object are routed through the pool and rate limited per endpoint
+    return Web3(provider=PooledHTTPProvider(_pool))
+
+
+def make_async_web3(_pool: ProviderPool, _session: aiohttp.ClientSession) -> AsyncWeb3:
+    return AsyncWeb3(provider=PooledAsyncHTTPProvider(_pool, _session))
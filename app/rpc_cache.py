@@ -0,0 +1,218 @@
+import json
+import logging
+import sqlite3
+import threading
+import traceback
+import zlib
+from hashlib import sha256
+from time import time
+from typing import Any
+
+from django.conf import settings
+
+from app.metrics import record_cache_requests
+
+logger = logging.getLogger(__name__)
+
+# Path of the SQLite file of the RPC response cache, The cache is disabled if it's empty
+CACHE_PATH = settings.RPC_CACHE_PATH
+CACHE_MAX_SIZE = settings.RPC_CACHE_MAX_SIZE
+
+# The least recently used responses are evicted down to this fraction of the max size, So that the eviction doesn't run on every write
+EVICTION_TARGET = 0.9
+EVICTION_CHECK_INTERVAL = 1000
+
+# Methods whose responses never change once their block is final, Responses are only cached once their block is final
+BLOCK_HASH_METHODS = {"eth_getBlockReceipts", "eth_getBlockByHash"}
+TRANSACTION_METHODS = {"eth_getTransactionByHash", "eth_getTransactionReceipt"}
+CACHED_METHODS = BLOCK_HASH_METHODS | TRANSACTION_METHODS | {"eth_getBlockByNumber", "eth_getLogs"}
+
+
+def get_cache_key(_chain_id: int, _method: str, _params: list) -> bytes:
+    # Content addressed by the chain and the canonical JSON of the request, So that it's shared by all the configs and providers
+    return sha256(json.dumps([_chain_id, _method, _params], sort_keys=True, separators=(",", ":")).encode()).digest()
+
+
+def to_block_number(_block: Any) -> int | None:
+    if isinstance(_block, int):
+        return _block
+    if isinstance(_block, str) and _block.startswith("0x"):
+        return int(_block, 16)
+    # Block tags like "latest" are never final
+    return None
+
+
+def is_final(_method: str, _params: list, _result: Any, _final_block_number: int) -> bool:
+    """
+    Whether the response of the call can be cached, i.e. it can't change anymore.
+    Calls by block hash are immutable, The rest only once their block is at least REORG_MAX_DEPTH blocks deep.
+    """
+
+    if _result is None or _method not in CACHED_METHODS:
+        return False
+
+    if _method in BLOCK_HASH_METHODS:
+        return isinstance(_params[0], str) and len(_params[0]) == 66
+
+    if _method in TRANSACTION_METHODS:
+        # Pending transactions don't have a block yet
+        block_number = to_block_number(_result.get("blockNumber"))
+        return block_number is not None and block_number <= _final_block_number
+
+    if _method == "eth_getBlockByNumber":
+        block_number = to_block_number(_params[0])
+        return block_number is not None and block_number <= _final_block_number
+
+    # eth_getLogs filters by block hash are immutable, Block ranges once their last block is final
+    log_filter = _params[0]
+    if "blockHash" in log_filter:
+        return True
+    to_block = to_block_number(log_filter.get("toBlock", "latest"))
+    return to_block is not None and to_block <= _final_block_number
+
+
+class RPCCache:
+    """
+    Persistent cache of the immutable JSON-RPC responses stored in a SQLite file, Shared by the workers of the host.
+    Responses are stored zlib compressed and evicted least recently used first once the cache grows past the max size.
+    """
+
+    def __init__(self, _path: str, max_size: int) -> None:
+        self.path = _path
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.connection = sqlite3.connect(_path, timeout=30, check_same_thread=False, isolation_level=None)
+
+        # WAL mode lets the workers read while another one writes
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS rpc_cache (key BLOB PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS rpc_cache_accessed_at_idx ON rpc_cache (accessed_at)")
+
+    def get_many(self, _keys: list[bytes]) -> dict[bytes, Any]:
+        if not _keys:
+            return {}
+
+        placeholders = ",".join("?" * len(_keys))
+        with self.lock:
+            rows = self.connection.execute(f"SELECT key, value FROM rpc_cache WHERE key IN ({placeholders})", _keys).fetchall()
+            if rows:
+                self.connection.execute(
+                    f"UPDATE rpc_cache SET accessed_at = ? WHERE key IN ({','.join('?' * len(rows))})",
+                    [time(), *(key for key, _ in rows)]
+                )
+
+        return {key: json.loads(zlib.decompress(value)) for key, value in rows}
+
+    def set_many(self, _items: dict[bytes, Any]) -> None:
+        if not _items:
+            return
+
+        now = time()
+        rows = []
+        for key, result in _items.items():
+            value = zlib.compress(json.dumps(result, separators=(",", ":")).encode())
+            rows.append((key, value, len(value), now))
+
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                self.connection.executemany("INSERT OR REPLACE INTO rpc_cache (key, value, size, accessed_at) VALUES (?, ?, ?, ?)", rows)
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+
+            self.writes += len(rows)
+            if self.writes >= EVICTION_CHECK_INTERVAL:
+                self.writes = 0
+                self.evict()
+
+    def evict(self) -> None:
+        size = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM rpc_cache").fetchone()[0]
+        if size <= self.max_size:
+            return
+
+        # Delete the least recently used responses until the cache is back under the target size
+        target_size = int(self.max_size * EVICTION_TARGET)
+        evicted_count = 0
+        cursor = self.connection.execute("SELECT key, size FROM rpc_cache ORDER BY accessed_at")
+        evicted_keys = []
+        for key, value_size in cursor:
+            if size <= target_size:
+                break
+            evicted_keys.append(key)
+            size -= value_size
+        cursor.close()
+
+        for idx in range(0, len(evicted_keys), 500):
+            keys = evicted_keys[idx:idx+500]
+            self.connection.execute(f"DELETE FROM rpc_cache WHERE key IN ({','.join('?' * len(keys))})", keys)
+            evicted_count += len(keys)
+
+        logger.info({
+            "msg": f"Evicted {evicted_count} responses from the RPC cache",
+            "path": self.path,
+            "size": size
+        })
+
+
+rpc_cache: RPCCache | None = None
+
+
+def get_rpc_cache() -> RPCCache | None:
+    global rpc_cache
+    if CACHE_PATH and rpc_cache is None:
+        rpc_cache = RPCCache(CACHE_PATH, max_size=CACHE_MAX_SIZE)
+    return rpc_cache
+
+
+def get_cached_results(_pool: Any, _calls: list[tuple[str, list]]) -> dict[int, Any]:
+    # Returns the cached results of the calls by their index
+    cache = get_rpc_cache()
+    cached_calls = [idx for idx, (method, _) in enumerate(_calls) if method in CACHED_METHODS]
+    if cache is None or not cached_calls:
+        return {}
+
+    try:
+        chain_id = _pool.get_chain_id()
+        keys = {get_cache_key(chain_id, *_calls[idx]): idx for idx in cached_calls}
+        cached_results = {keys[key]: result for key, result in cache.get_many(list(keys)).items()}
+        record_cache_requests("rpc", len(cached_results), len(cached_calls) - len(cached_results))
+        return cached_results
+    except Exception as e:
+        # The cache is only an optimization, So fallback to the provider
+        logger.error({
+            "msg": "Error caught while reading the RPC cache",
+            "error": e,
+            "traceback": traceback.format_exc()
+        })
+        return {}
+
+
+def cache_results(_pool: Any, _calls: list[tuple[str, list]], _results: list) -> None:
+    cache = get_rpc_cache()
+    cached_calls = [
+        (call, result) for call, result in zip(_calls, _results)
+        if call[0] in CACHED_METHODS and result is not None
+    ]
+    if cache is None or not cached_calls:
+        return
+
+    try:
+        chain_id = _pool.get_chain_id()
+        final_block_number = _pool.get_final_block_number()
+        cache.set_many({
+            get_cache_key(chain_id, method, params): result
+            for (method, params), result in cached_calls
+            if is_final(method, params, result, final_block_number)
+        })
+    except Exception as e:
+        logger.error({
+            "msg": "Error caught while writing the RPC cache",
+            "error": e,
+            "traceback": traceback.format_exc()
+        })
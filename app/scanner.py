@@ -0,0 +1,164 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Iterator
+
+import aiohttp
+import requests
+from django.conf import settings
+from web3 import Web3
+from web3.exceptions import MismatchedABI
+
+from app.decoders import get_event_signature
+from app.metrics import RETRIES, track_stage
+from app.ratelimit import is_rate_limit_error
+
+logger = logging.getLogger(__name__)
+
+MIN_WINDOW_SIZE = 1
+INITIAL_WINDOW_SIZE = settings.LOG_WINDOW_SIZE
+MAX_WINDOW_SIZE = settings.LOG_WINDOW_MAX_SIZE
+
+# Windows returning less than this number of logs are considered sparse and the next window is doubled
+SPARSE_WINDOW_EVENTS = 500
+
+# Error messages returned by the providers when a get_logs query is too large
+RANGE_ERROR_MESSAGES = (
+    "more than",
+    "too many",
+    "too large",
+    "limit exceeded",
+    "response size",
+    "block range",
+    "query timeout",
+)
+
+
+def is_range_error(_error: Exception) -> bool:
+    if is_rate_limit_error(_error):
+        return False
+
+    if isinstance(_error, (requests.exceptions.Timeout, asyncio.TimeoutError)):
+        return True
+
+    if isinstance(_error, requests.exceptions.HTTPError) and _error.response is not None:
+        return _error.response.status_code in (413, 502, 503, 504)
+
+    if isinstance(_error, aiohttp.ClientResponseError):
+        return _error.status in (413, 502, 503, 504)
+
+    message = str(_error).lower()
+    return any(error_message in message for error_message in RANGE_ERROR_MESSAGES)
+
+
+def shrink_window_size(_error: Exception, _window_size: int, _from_block: int, _to_block: int) -> int:
+    # Re-raise the errors which are not caused by the size of the window
+    if not is_range_error(_error) or _window_size == MIN_WINDOW_SIZE:
+        raise _error
+
+    window_size = max(_window_size // 2, MIN_WINDOW_SIZE)
+    RETRIES.labels(reason="log_window").inc()
+    logger.info({
+        "msg": "Block window rejected by the provider, Shrinking the window",
+        "from_block_number": _from_block,
+        "to_block_number": _to_block,
+        "window_size": window_size,
+        "error": str(_error)
+    })
+    return window_size
+
+
+def grow_window_size(_window_size: int, _events_count: int) -> int:
+    if _events_count < SPARSE_WINDOW_EVENTS:
+        return min(_window_size * 2, MAX_WINDOW_SIZE)
+    return _window_size
+
+
+def scan_logs(_get_logs: Callable[[int, int], list], _from_block: int, _to_block: int) -> Iterator[tuple[int, int, list]]:
+    """
+    Walk the given block range (both inclusive) in adaptive block windows and yield (from_block, to_block, logs) per window.
+    The window is halved whenever the provider rejects the query for being too large and doubled when a window is sparse.
+    """
+
+    window_size = INITIAL_WINDOW_SIZE
+    from_block = _from_block
+
+    while from_block <= _to_block:
+        to_block = min(from_block + window_size - 1, _to_block)
+
+        try:
+            with track_stage("fetch_logs"):
+                logs = _get_logs(from_block, to_block)
+        except Exception as e:
+            window_size = shrink_window_size(e, window_size, from_block, to_block)
+            continue
+
+        yield from_block, to_block, logs
+
+        from_block = to_block + 1
+        window_size = grow_window_size(window_size, len(logs))
+
+
+def scan_swap_events(_contract, _from_block: int, _to_block: int) -> Iterator[tuple[int, int, list]]:
+    return scan_logs(
+        lambda from_block, to_block: _contract.events.Swap.get_logs(fromBlock=from_block, toBlock=to_block),
+        _from_block,
+        _to_block
+    )
+
+
+def get_swap_topic(_contract) -> str:
+    return Web3.keccak(text=get_event_signature(_contract.abi)).hex()
+
+
+def scan_contracts_swap_events(_w3: Web3, _contracts: list, _from_block: int, _to_block: int) -> Iterator[tuple[int, int, dict[str, list]]]:
+    """
+    Same as scan_swap_events for several contracts of the same provider, With a single eth_getLogs per window for all of them.
+    The logs are filtered by the addresses and the Swap topics of all the contracts, Then decoded by the ABI of their contract.
+    Yields (from_block, to_block, swap_events by contract address) per window.
+    """
+
+    contracts = {contract.address.lower(): contract for contract in _contracts}
+    log_filter = {
+        "address": [contract.address for contract in _contracts],
+        # The first topic matches any of the Swap event signatures
+        "topics": [sorted({get_swap_topic(contract) for contract in _contracts})],
+    }
+
+    def get_logs(_window_from_block: int, _window_to_block: int) -> list:
+        return _w3.eth.get_logs({**log_filter, "fromBlock": _window_from_block, "toBlock": _window_to_block})
+
+    for from_block, to_block, logs in scan_logs(get_logs, _from_block, _to_block):
+        swap_events = {contract.address: [] for contract in _contracts}
+        for log in logs:
+            contract = contracts.get(log["address"].lower())
+            if contract is None:
+                continue
+
+            # Swap events of another contract ABI share the filter but don't match the ABI of this contract
+            try:
+                swap_events[contract.address].append(contract.events.Swap().process_log(log))
+            except MismatchedABI:
+                continue
+
+        yield from_block, to_block, swap_events
+
+
+async def async_scan_swap_events(_contract, _from_block: int, _to_block: int) -> AsyncIterator[tuple[int, int, list]]:
+    # Same as scan_swap_events, For an AsyncWeb3 contract
+    window_size = INITIAL_WINDOW_SIZE
+    from_block = _from_block
+
+    while from_block <= _to_block:
+        to_block = min(from_block + window_size - 1, _to_block)
+
+        try:
+            with track_stage("fetch_logs"):
+                swap_events = await _contract.events.Swap.get_logs(fromBlock=from_block, toBlock=to_block)
+        except Exception as e:
+            window_size = shrink_window_size(e, window_size, from_block, to_block)
+            continue
+
+        yield from_block, to_block, swap_events
+
+        from_block = to_block + 1
+        window_size = grow_window_size(window_size, len(swap_events))
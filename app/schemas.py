@@ -1,24 +1,164 @@
-from decimal import Decimal
-from pydantic import BaseModel, Field
+import base64
+from datetime import datetime
+from decimal import Decimal, localcontext
+from typing import Annotated, Literal
+from uuid import UUID
+
+from django.conf import settings
+from pydantic import BaseModel, Field, field_serializer, field_validator
+from web3 import Web3
 
 
 class SwapEvent(BaseModel):
     block_number: int
+    block_hash: str = ""
+    block_timestamp: datetime | None = None
     log_index: int
-    event: dict
+
+    # Decoded swap args, Addresses are hex strings
+    sender: str | None = None
+    recipient: str | None = None
+    amount0: int | None = None
+    amount1: int | None = None
+    sqrt_price_x96: int | None = None
+    liquidity: int | None = None
+    tick: int | None = None
+    event: dict | None = None
 
     tx_hash: str
     tx_index: int
     gas_used: int
     gas_price: int
 
-    usd_exchange_rate: Decimal = Field(max_digits=7, decimal_places=2)
+    # Empty when no price is known for the block
+    usd_exchange_rate: Annotated[Decimal, Field(max_digits=12, decimal_places=2)] | None = None
+
+    execution_price_eth: Decimal = Field(max_digits=78, decimal_places=36)
+    swapped_eth_wei: int = Field(ge=0)
+
+    @field_validator("execution_price_eth", mode="before")
+    @classmethod
+    def validate_execution_price_eth(cls, value: Decimal) -> Decimal:
+        # Round to the stored precision, Using a context large enough for the biggest stored price
+        with localcontext(prec=78):
+            return Decimal(value).quantize(Decimal(10) ** -36)
+
+    @field_validator("sender", "recipient", "tx_hash", mode="before")
+    @classmethod
+    def validate_hex(cls, value: str | bytes | None) -> str | None:
+        # Stored as bytes, Read back as 0x prefixed lowercase hex
+        if isinstance(value, bytes):
+            return "0x" + value.hex()
+        return value.lower() if value else value
+
+    def get_model_fields(self) -> dict:
+        model_fields = self.model_dump()
+        for field in ("sender", "recipient", "tx_hash"):
+            if model_fields[field]:
+                model_fields[field] = bytes.fromhex(model_fields[field].removeprefix("0x"))
+        return model_fields
+
+
+class SwapEventResponse(SwapEvent):
+    # Values derived from the stored wei amounts and the exchange rate
+    execution_price_usd: Decimal | None
+    tx_eth_cost: Decimal
+    tx_usd_cost: Decimal | None
+    swapped_eth_cost: Decimal
+    swapped_usd_cost: Decimal | None
+
+    @field_serializer("amount0", "amount1", "sqrt_price_x96", "liquidity", "swapped_eth_wei")
+    def serialize_wei(self, value: int | None) -> str | None:
+        # Wei amounts overflow the JSON numbers of most clients
+        return None if value is None else str(value)
+
+    @field_serializer("execution_price_eth", "execution_price_usd", "tx_eth_cost", "tx_usd_cost", "swapped_eth_cost", "swapped_usd_cost")
+    def serialize_decimal(self, value: Decimal | None) -> str | None:
+        # Fixed point notation, Small values are otherwise serialized in the exponent notation
+        return None if value is None else format(value, "f")
+
+
+class SwapEventExportFilters(BaseModel):
+    config: UUID
+    format: Literal["csv", "parquet"] = "csv"
+    from_block: int | None = Field(default=None, ge=0)
+    to_block: int | None = Field(default=None, ge=0)
+    from_time: datetime | None = None
+    to_time: datetime | None = None
+
+
+class SwapEventFilters(BaseModel):
+    config: UUID | None = None
+    from_block: int | None = Field(default=None, ge=0)
+    to_block: int | None = Field(default=None, ge=0)
+    tx_hash: str | None = None
+    from_time: datetime | None = None
+    to_time: datetime | None = None
+    sender: str | None = None
+    recipient: str | None = None
+
+    # Opaque cursor of the last returned swap event, See encode_cursor
+    cursor: str | None = None
+    limit: int = Field(default=settings.API_PAGE_SIZE, ge=1, le=settings.API_MAX_PAGE_SIZE)
+
+    @field_validator("tx_hash")
+    @classmethod
+    def validate_tx_hash(cls, value: str | None) -> str | None:
+        if not value:
+            return value
+        try:
+            tx_hash = bytes.fromhex(value.removeprefix("0x"))
+        except ValueError:
+            tx_hash = b""
+        if len(tx_hash) != 32:
+            raise ValueError("Invalid transaction hash")
+        return value
+
+    @field_validator("sender", "recipient")
+    @classmethod
+    def validate_address(cls, value: str | None) -> str | None:
+        if value and not Web3.is_address(value):
+            raise ValueError("Invalid address")
+        return value
+
+    def get_bytes(self, _field: str) -> bytes | None:
+        # Hashes and addresses are stored as bytes
+        value = getattr(self, _field)
+        return bytes.fromhex(value.removeprefix("0x")) if value else None
+
+    @field_validator("cursor")
+    @classmethod
+    def validate_cursor(cls, value: str | None) -> str | None:
+        if value:
+            decode_cursor(value)
+        return value
+
+    def get_cursor(self) -> tuple[int, int] | None:
+        return decode_cursor(self.cursor) if self.cursor else None
+
+
+class SwapCandleFilters(BaseModel):
+    config: UUID
+    interval: str = "1h"
+    from_time: datetime | None = None
+    to_time: datetime | None = None
+    limit: int = Field(default=settings.API_PAGE_SIZE, ge=1, le=settings.API_MAX_PAGE_SIZE)
+
+    @field_validator("interval")
+    @classmethod
+    def validate_interval(cls, value: str) -> str:
+        if value not in ("1m", "1h", "1d"):
+            raise ValueError("Interval should be one of 1m, 1h or 1d")
+        return value
+
 
-    execution_price_eth: Decimal = Field(max_digits=200, decimal_places=50)
-    execution_price_usd: Decimal = Field(max_digits=200, decimal_places=50)
+def encode_cursor(_block_number: int, _log_index: int) -> str:
+    return base64.urlsafe_b64encode(f"{_block_number}:{_log_index}".encode()).decode()
 
-    tx_eth_cost: Decimal = Field(max_digits=200, decimal_places=50)
-    tx_usd_cost: Decimal = Field(max_digits=200, decimal_places=50)
 
-    swapped_eth_cost: Decimal = Field(max_digits=200, decimal_places=50)
-    swapped_usd_cost: Decimal = Field(max_digits=200, decimal_places=50)
+def decode_cursor(_cursor: str) -> tuple[int, int]:
+    try:
+        block_number, log_index = base64.urlsafe_b64decode(_cursor.encode()).decode().split(":")
+        return int(block_number), int(log_index)
+    except Exception:
+        raise ValueError("Invalid cursor")
@@ -1,32 +1,75 @@
+import asyncio
 import logging
+from datetime import datetime, timezone
 from decimal import Decimal
-from time import sleep
+from math import ceil
+from time import time
 import traceback
+from typing import Callable
 
 import requests
-from web3 import Web3, HTTPProvider
+from web3 import Web3
+from django.conf import settings
 from django.core.cache import cache
-from django.db import DatabaseError, transaction
+from django.db import transaction
+from django.db.models import F, Min, Q
 from pydantic import ValidationError
+from celery import chord
 
 from eth_swap_indexer.celery import app
-from app.models import Config, SwapEvent
+from app.blocks import get_block_timestamps
+from app.cache import tiered_cache
+from app.decoders import decode_swap_event, get_decoder
+from app.metrics import BLOCKS_BEHIND_HEAD, TRANSACTION_PARSE_FAILURES, VALIDATION_FAILURES, record_cache_requests, track_stage
+from app.models import BackfillPartition, Config, SwapEvent
 from app.schemas import SwapEvent as SwapEventSchema
+from app.prices import price_index
+from app.providers import ProviderPool, get_provider_pool
+from app.ratelimit import call_with_rate_limit, get_coinbase_bucket
+from app.receipts import get_receipts
+from app.rollups import rebuild_rollups
+from app.rpc import batch_request, make_web3
+from app.scanner import scan_contracts_swap_events, scan_swap_events
+from app.writer import CopySwapEventWriter, SwapEventWriter
 
 logger = logging.getLogger(__name__)
 
-CHUNK_SIZE = 50
 CACHE_TIMEOUT = 3600
+TX_BATCH_SIZE = settings.TX_BATCH_SIZE
+RECEIPT_DETAILS_KEYS = {"gas_used", "gas_price"}
+TRANSACTION_DETAILS_KEYS = {"execution_price_eth", "swapped_eth_wei"}
+
+# Set on the details of a fetched transaction whose input can't be parsed, Parsing it again would fail the same way
+INVALID_TRANSACTION_KEY = "invalid_transaction"
+BACKFILL_PARTITIONS = settings.BACKFILL_PARTITIONS
+BACKFILL_MAX_ATTEMPTS = settings.BACKFILL_MAX_ATTEMPTS
+REORG_MAX_DEPTH = settings.REORG_MAX_DEPTH
+SHARED_SCAN_MAX_CONTRACTS = settings.SHARED_SCAN_MAX_CONTRACTS
+EXCHANGE_RATES_URL = settings.COINBASE_EXCHANGE_RATES_URL
+PRICE_MAX_AGE = settings.PRICE_MAX_AGE
+
+# Only a single task indexes a config at a time, The lock is refreshed after every indexed window
+CONFIG_LOCK_TIMEOUT = 3600
+BACKFILL_LOCK_TIMEOUT = 24 * 3600
+
+
+class IncompleteWindowError(Exception):
+    # Raised when the details of some swap events of a window couldn't be fetched, So that the cursor isn't moved past the window
+    pass
+
 
 def get_eth_to_usd_rate() -> float:
-    response = requests.get(url="https://api.coinbase.com/v2/exchange-rates?currency=ETH").json()
+    response = call_with_rate_limit(
+        get_coinbase_bucket(), 1,
+        lambda: requests.get(url=EXCHANGE_RATES_URL).json()
+    )
     rate = response.get("data", {}).get("rates", {}).get("USD", 0)
     return rate
 
 
 def get_conversion_rate() -> Decimal:
     # Retrived cached conversion rate
-    cached_conversion_rate = cache.get("conversion_rate")
+    cached_conversion_rate = tiered_cache.get("conversion_rate")
     if cached_conversion_rate:
         return cached_conversion_rate
 
@@ -37,138 +80,685 @@ def get_conversion_rate() -> Decimal:
     conversion_rate = round(Decimal(conversion_rate), 2)
 
     # Save conversion rate in cache
-    cache.set("conversion_rate", conversion_rate, CACHE_TIMEOUT)
+    tiered_cache.set("conversion_rate", conversion_rate, CACHE_TIMEOUT)
 
     return conversion_rate
 
 
+class ConversionRateSnapshot:
+    """
+    Spot ETH to USD rate looked up at most once per indexing run, So that the swap events don't hit the cache one by one.
+    The rate is only fetched once a recent swap event isn't covered by the price index yet.
+    """
+
+    def __init__(self) -> None:
+        self.rate: Decimal | None = None
+
+    def get(self) -> Decimal:
+        if self.rate is None:
+            self.rate = get_conversion_rate()
+        return self.rate
+
+
+def get_usd_exchange_rate(_block_timestamp: int | None, _spot_rate: ConversionRateSnapshot) -> Decimal | None:
+    """
+    Historical rate at the time of the block from the price index.
+    The spot rate is only used for the blocks within PRICE_MAX_AGE seconds of now, Whose price may not be loaded yet.
+    The rate of the older blocks not covered by the index is left empty, Rather than stamping them with today's rate.
+    """
+
+    if _block_timestamp is None:
+        return None
+
+    if (rate := price_index.get_rate(_block_timestamp)) is not None:
+        return rate
+
+    if time() - _block_timestamp <= PRICE_MAX_AGE:
+        return _spot_rate.get()
+
+    return None
+
+
 def to_eth_wei(amount: Decimal) -> Decimal:
     wei = Decimal(1e18)
     return amount / wei
 
 
-def get_transaction_details(_w3: Web3, _tx_hash: str) -> dict:
-    try:
-        # Fetch transaction details
-        tx_data = _w3.eth.get_transaction(_tx_hash)
+def get_receipt_details(_receipt: dict) -> dict:
+    # Transaction cost is based on the gas actually used and the effective gas price from the receipt
+    # The gas price is left out when the receipt has no effective gas price, It is then taken from the transaction
+    receipt_details = {"gas_used": _receipt["gas_used"]}
+    if _receipt.get("effective_gas_price") is not None:
+        receipt_details["gas_price"] = _receipt["effective_gas_price"]
+    return receipt_details
+
+
+def add_transaction_gas_price(_tx_details: dict, _tx_data: dict) -> None:
+    # Fallback for the receipts without an effective gas price, The gas price of a legacy transaction is the price it paid
+    if "gas_price" not in _tx_details and _tx_data.get("gasPrice") is not None:
+        _tx_details["gas_price"] = int(_tx_data["gasPrice"], 16)
 
-        execution_price_hex = tx_data.input.hex()[10+64:10+64+64]
+
+def get_transaction_details(_tx_data: dict) -> dict:
+    try:
+        # Transaction data is the raw JSON-RPC response, So all the quantities are hex encoded
+        execution_price_hex = _tx_data["input"][10+64:10+64+64]
         execution_price = Decimal(int(execution_price_hex, 16))
-        swapped_amount = Decimal(tx_data.value)
-        tx_cost = Decimal(tx_data.gas * tx_data.gasPrice)
 
         return {
-            "gas_used": tx_data.gas,
-            "gas_price": tx_data.gasPrice,
             "execution_price_eth": to_eth_wei(execution_price),
-            "swapped_eth_cost": to_eth_wei(swapped_amount),
-            "tx_eth_cost": to_eth_wei(tx_cost)
+            "swapped_eth_wei": int(_tx_data["value"], 16)
         }
 
     except Exception as e:
         logging.error({
-            "msg": "Error caugh while fetching transaction details",
+            "msg": "Error caught while parsing transaction details",
             "error": e,
             "traceback": traceback.format_exc(),
-            "tx_hash": _tx_hash,
+            "tx_hash": _tx_data.get("hash"),
         })
         return {}
 
-def create_swap_event(_w3: Web3, _config_obj: Config, _swap_event) -> None:
-    event_data = _swap_event.args.__dict__
+
+def get_required_details_keys(_fetch_transactions: bool) -> set[str]:
+    if _fetch_transactions:
+        return RECEIPT_DETAILS_KEYS | TRANSACTION_DETAILS_KEYS
+    return RECEIPT_DETAILS_KEYS
+
+
+def is_details_complete(_tx_details: dict, _required_keys: set[str]) -> bool:
+    # The details of an invalid transaction are complete as well, Its swap events are skipped instead of being fetched again
+    return _required_keys <= _tx_details.keys() or _tx_details.get(INVALID_TRANSACTION_KEY, False)
+
+
+def add_transaction_details(_tx_details: dict, _tx_data: dict) -> None:
+    _tx_details.update(get_transaction_details(_tx_data) or {INVALID_TRANSACTION_KEY: True})
+
+
+def get_transactions_details(_pool: ProviderPool, _tx_blocks: dict[str, str], _fetch_transactions: bool = True) -> dict[str, dict]:
+    """
+    Fetch the details of the given transactions, Mapped as tx hash -> block hash.
+    The transactions themselves are only fetched if required, Otherwise the details only contain the receipt costs.
+    """
+
+    # Check cache for transaction data
+    tx_hashes = list(_tx_blocks)
+    required_keys = get_required_details_keys(_fetch_transactions)
+    transactions_details = tiered_cache.get_many(tx_hashes)
+    missing_tx_hashes = [
+        tx_hash for tx_hash in tx_hashes
+        if not is_details_complete(transactions_details.get(tx_hash, {}), required_keys)
+    ]
+    record_cache_requests("transactions", len(tx_hashes) - len(missing_tx_hashes), len(missing_tx_hashes))
+    if not missing_tx_hashes:
+        return transactions_details
+
+    # Fetch the receipts of the remaining transactions, Per block where the provider supports it
+    receipts = get_receipts(_pool, {tx_hash: _tx_blocks[tx_hash] for tx_hash in missing_tx_hashes})
+    fetched_details = {
+        tx_hash: get_receipt_details(receipts[tx_hash])
+        for tx_hash in missing_tx_hashes if tx_hash in receipts
+    }
+
+    # Fetch the remaining transactions from the provider, TX_BATCH_SIZE transactions per JSON-RPC batch request
+    # Otherwise only the transactions of the receipts without an effective gas price are fetched
+    receipt_tx_hashes = list(fetched_details) if _fetch_transactions else [
+        tx_hash for tx_hash, tx_details in fetched_details.items() if "gas_price" not in tx_details
+    ]
+    for idx in range(0, len(receipt_tx_hashes), TX_BATCH_SIZE):
+        tx_hashes = receipt_tx_hashes[idx:idx+TX_BATCH_SIZE]
+
+        try:
+            transactions = batch_request(
+                _pool,
+                [("eth_getTransactionByHash", [tx_hash]) for tx_hash in tx_hashes]
+            )
+        except Exception as e:
+            logger.error({
+                "msg": "Error caugh while fetching transaction details",
+                "error": e,
+                "traceback": traceback.format_exc(),
+                "tx_hashes": tx_hashes,
+            })
+            continue
+
+        for tx_hash, tx_data in zip(tx_hashes, transactions):
+            if tx_data:
+                if _fetch_transactions:
+                    add_transaction_details(fetched_details[tx_hash], tx_data)
+                add_transaction_gas_price(fetched_details[tx_hash], tx_data)
+
+    # Partial details are cached as well, The receipt costs are still reused by the configs which decode the price from the log
+    tiered_cache.set_many(fetched_details, CACHE_TIMEOUT)
+    transactions_details.update(fetched_details)
+
+    return {
+        tx_hash: tx_details for tx_hash, tx_details in transactions_details.items()
+        if is_details_complete(tx_details, required_keys)
+    }
+
+
+def create_swap_event(_config_obj: Config, _swap_event, _tx_data: dict, _block_timestamp: int | None, _spot_rate: ConversionRateSnapshot, _writer: SwapEventWriter) -> None:
     tx_hash = _swap_event.transactionHash.hex()
     tx_index = _swap_event.transactionIndex
     block_number = _swap_event.blockNumber
+    block_hash = _swap_event.blockHash.hex()
     log_index = _swap_event.logIndex
 
-    # Check cache for transaction data
-    cached_tx_data = cache.get(tx_hash)
-    if cached_tx_data:
-        tx_data = cached_tx_data
-    else:
-        # Fetch the transasction details from the provider
-        tx_data = get_transaction_details(_w3, tx_hash)
-        cache.set(tx_hash, tx_data, CACHE_TIMEOUT)
-
-    if not tx_data:
-        logger.error({"msg": "No transaction data found", "config_id": _config_obj.id})
+    if not _tx_data:
+        raise IncompleteWindowError(f"No transaction data found for {tx_hash}")
+
+    # Prefer the execution price and swapped amount decoded from the log over the ones parsed from the transaction
+    # The raw event is only stored when the swap args can't be decoded into their typed columns
+    decoded_swap = decode_swap_event(_config_obj, _swap_event)
+    if decoded_swap is None and not TRANSACTION_DETAILS_KEYS <= _tx_data.keys():
+        TRANSACTION_PARSE_FAILURES.labels(config_id=str(_config_obj.id)).inc()
+        logger.error({"msg": "Transaction input can't be parsed, Skipping the swap event", "config_id": _config_obj.id, "tx_hash": tx_hash})
         return
 
+    swap_details = {**_tx_data, **(decoded_swap or {"event": _swap_event.args.__dict__})}
+
     # Get ETH to USD converions rate
-    usd_exchange_rate = get_conversion_rate()
+    with track_stage("rate_lookup"):
+        usd_exchange_rate = get_usd_exchange_rate(_block_timestamp, _spot_rate)
 
     # Validate data format using pydantic schema
     # Continue with other swap events if any validation error is caught
     try:
-        swap_event_obj = SwapEventSchema(
-            block_number=block_number,
-            log_index=log_index,
-            event=event_data,
-            tx_hash=tx_hash,
-            tx_index=tx_index,
-            gas_used=tx_data["gas_used"],
-            gas_price=tx_data["gas_price"],
-            usd_exchange_rate=usd_exchange_rate,
-            execution_price_eth=tx_data["execution_price_eth"],
-            execution_price_usd=tx_data["execution_price_eth"] * usd_exchange_rate,
-            tx_eth_cost=tx_data["tx_eth_cost"],
-            tx_usd_cost=tx_data["tx_eth_cost"] * usd_exchange_rate,
-            swapped_eth_cost=tx_data["swapped_eth_cost"],
-            swapped_usd_cost=tx_data["swapped_eth_cost"] * usd_exchange_rate
-        )
+        with track_stage("validation"):
+            swap_event_obj = SwapEventSchema(
+                block_number=block_number,
+                block_hash=block_hash,
+                block_timestamp=datetime.fromtimestamp(_block_timestamp, tz=timezone.utc) if _block_timestamp is not None else None,
+                log_index=log_index,
+                sender=swap_details.get("sender"),
+                recipient=swap_details.get("recipient"),
+                amount0=swap_details.get("amount0"),
+                amount1=swap_details.get("amount1"),
+                sqrt_price_x96=swap_details.get("sqrt_price_x96"),
+                liquidity=swap_details.get("liquidity"),
+                tick=swap_details.get("tick"),
+                event=swap_details.get("event"),
+                tx_hash=tx_hash,
+                tx_index=tx_index,
+                gas_used=swap_details["gas_used"],
+                gas_price=swap_details["gas_price"],
+                usd_exchange_rate=usd_exchange_rate,
+                execution_price_eth=swap_details["execution_price_eth"],
+                swapped_eth_wei=swap_details["swapped_eth_wei"]
+            )
     except ValidationError as e:
+        VALIDATION_FAILURES.labels(config_id=str(_config_obj.id)).inc()
         logger.error({
             "msg": "Error while validating swap event data",
             "error": e.errors()
         })
         return
 
-    # Insert the swap event record in DB
-    try:
-        with transaction.atomic():
-            SwapEvent.objects.create(config=_config_obj, **swap_event_obj.model_dump())
-    except DatabaseError as e:
-        logger.error({
-            "msg": "Error while creating swap event record in DB",
-            "error": e
+    # Buffer the swap event, The writer inserts it in DB along with the rest of the batch
+    _writer.add(swap_event_obj)
+
+
+def check_swap_events_details(_swap_events: list, _transactions_details: dict, _block_timestamps: dict) -> None:
+    # A window is only indexed once the details of all its swap events are fetched, Otherwise the failed fetches are retried by the next run
+    missing_tx_hashes = {swap_event.transactionHash.hex() for swap_event in _swap_events} - _transactions_details.keys()
+    missing_block_numbers = {swap_event.blockNumber for swap_event in _swap_events} - _block_timestamps.keys()
+    if missing_tx_hashes or missing_block_numbers:
+        raise IncompleteWindowError(
+            f"Missing the details of {len(missing_tx_hashes)} transactions and {len(missing_block_numbers)} blocks"
+        )
+
+
+def get_writer_class(_use_copy: bool) -> type[SwapEventWriter]:
+    return CopySwapEventWriter if _use_copy else SwapEventWriter
+
+
+def index_swap_events(_config_obj: Config, _swap_events: list, _spot_rate: ConversionRateSnapshot, _writer: SwapEventWriter) -> None:
+    # Fetch the details of all the unique transactions in batches
+    # Transactions are only fetched when the price can't be decoded from the log
+    tx_blocks = {swap_event.transactionHash.hex(): swap_event.blockHash.hex() for swap_event in _swap_events}
+    pool = get_provider_pool(_config_obj)
+    with track_stage("fetch_transactions"):
+        transactions_details = get_transactions_details(pool, tx_blocks, get_decoder(_config_obj) is None)
+
+    # Block timestamps are used to look up the historical ETH to USD rate
+    with track_stage("fetch_blocks"):
+        block_timestamps = get_block_timestamps(pool, {swap_event.blockNumber: swap_event.blockHash.hex() for swap_event in _swap_events})
+
+    check_swap_events_details(_swap_events, transactions_details, block_timestamps)
+
+    # Iterate and create the swap events, The caller flushes the writer before persisting the cursor
+    for swap_event in _swap_events:
+        tx_data = transactions_details.get(swap_event.transactionHash.hex(), {})
+        create_swap_event(_config_obj, swap_event, tx_data, block_timestamps.get(swap_event.blockNumber), _spot_rate, _writer)
+
+
+def get_contract(_config_obj: Config):
+    # Initialize web3 object
+    w3 = make_web3(get_provider_pool(_config_obj))
+    contract = w3.eth.contract(address=_config_obj.contract_address, abi=_config_obj.abi.get("ABI"))
+    return w3, contract
+
+
+def get_from_block(_config_obj: Config, _curr_block_number: int) -> int:
+    # Resume from the persisted cursor if the config was already (partially) indexed
+    if _config_obj.last_indexed_block is not None:
+        return _config_obj.last_indexed_block + 1
+    return max(_curr_block_number - _config_obj.block_number, 0)
+
+
+def get_head_block(_w3: Web3, _pool: ProviderPool):
+    """
+    Last block to index, Capped to the blocks every healthy endpoint of the pool already has.
+    The eth_getLogs of a window may be routed to a lagging endpoint, Which would return no logs for the blocks past its head.
+    """
+
+    head_block_number = _w3.eth.block_number - _pool.get_max_block_lag()
+    return _w3.eth.get_block(max(head_block_number, 0))
+
+
+def get_config_lock_key(_config_id: str) -> str:
+    return f"config_lock:{_config_id}"
+
+
+def acquire_config_lock(_config_id: str, _timeout: int = CONFIG_LOCK_TIMEOUT) -> bool:
+    # cache.add is atomic, So only one of the concurrent tasks gets the lock
+    return cache.add(get_config_lock_key(_config_id), True, _timeout)
+
+
+def refresh_config_lock(_config_id: str, _timeout: int = CONFIG_LOCK_TIMEOUT) -> None:
+    cache.touch(get_config_lock_key(_config_id), _timeout)
+
+
+def release_config_lock(_config_id: str) -> None:
+    cache.delete(get_config_lock_key(_config_id))
+
+
+def rollback_reorged_blocks(_config_obj: Config, _w3: Web3) -> None:
+    """
+    Compare the stored hash of the cursor block with the canonical chain.
+    On a chain reorganisation, Rewind the cursor to the latest stored block that is still canonical and delete the swap events after it.
+    """
+
+    cursor = _config_obj.last_indexed_block
+    if cursor is None or not _config_obj.last_indexed_block_hash:
+        return
+
+    if _w3.eth.get_block(cursor).hash.hex() == _config_obj.last_indexed_block_hash:
+        return
+
+    # Find the common ancestor among the blocks of the stored swap events, Newest first
+    min_block_number = max(cursor - REORG_MAX_DEPTH, 0)
+    stored_block_hashes = dict(
+        SwapEvent.objects.filter(config=_config_obj, block_number__gte=min_block_number, block_number__lte=cursor)
+        .exclude(block_hash="")
+        .values_list("block_number", "block_hash")
+        .distinct()
+    )
+    block_numbers = sorted(stored_block_hashes, reverse=True)
+    blocks = batch_request(
+        get_provider_pool(_config_obj),
+        [("eth_getBlockByNumber", [hex(block_number), False]) for block_number in block_numbers]
+    )
+
+    ancestor_block_number = max(min_block_number - 1, 0)
+    for block_number, block in zip(block_numbers, blocks):
+        if block and block["hash"] == stored_block_hashes[block_number]:
+            ancestor_block_number = block_number
+            break
+
+    reorged_swap_events = SwapEvent.objects.filter(config=_config_obj, block_number__gt=ancestor_block_number)
+    reorged_from_timestamp = reorged_swap_events.aggregate(Min("block_timestamp"))["block_timestamp__min"]
+
+    with transaction.atomic():
+        deleted_count, _ = reorged_swap_events.delete()
+
+        # Recompute the candles which counted the deleted swap events
+        if reorged_from_timestamp:
+            rebuild_rollups(_config_obj, reorged_from_timestamp)
+
+    _config_obj.last_indexed_block = ancestor_block_number
+    _config_obj.last_indexed_block_hash = stored_block_hashes.get(ancestor_block_number, "")
+    Config.objects.filter(id=_config_obj.id).update(
+        last_indexed_block=_config_obj.last_indexed_block,
+        last_indexed_block_hash=_config_obj.last_indexed_block_hash
+    )
+
+    logger.warning({
+        "msg": "Chain reorganisation detected, Rolled back the swap events",
+        "config_id": _config_obj.id,
+        "reorged_block_number": cursor,
+        "ancestor_block_number": ancestor_block_number,
+        "deleted_swap_events": deleted_count
+    })
+
+
+def index_block_range(_config_obj: Config, _contract, _from_block: int, _to_block: int, _on_window: Callable[[int], None], _writer_class: type[SwapEventWriter] = SwapEventWriter) -> None:
+    if _config_obj.get_ingestion_mode() == Config.IngestionMode.ASYNC:
+        # Imported here to avoid a circular import, The async engine reuses the helpers of this module
+        from app.async_ingestion import async_index_block_range
+
+        asyncio.run(async_index_block_range(_config_obj, _from_block, _to_block, _on_window, _writer_class))
+        return
+
+    # Fetch and create the swap events window by window, All the windows of the run share the same spot rate and writer
+    spot_rate = ConversionRateSnapshot()
+    writer = _writer_class(_config_obj)
+    for window_from_block, window_to_block, swap_events in scan_swap_events(_contract, _from_block, _to_block):
+        logger.info({
+            "msg": f"Found {len(swap_events)} Swap Events",
+            "config_id": _config_obj.id,
+            "from_block_number": window_from_block,
+            "to_block_number": window_to_block
         })
 
+        index_swap_events(_config_obj, swap_events, spot_rate, writer)
+
+        # Persist the cursor once the window is saved, So that a restarted task resumes from the next window
+        writer.flush()
+        _on_window(window_to_block)
+
 
 @app.task
-def process_swap_events(config_id: str) -> None:
+def process_swap_events(config_id: str, use_copy: bool = False) -> bool:
+    # Returns whether the pending blocks were indexed, False if the config is already being indexed or the run failed
+    if not acquire_config_lock(config_id):
+        logger.info({"msg": "Config is already being indexed, Skipping", "config_id": config_id})
+        return False
+
     try:
         config = Config.objects.get(id=config_id)
+        w3, contract = get_contract(config)
 
-        # Initialize web3 object
-        w3 = Web3(provider=HTTPProvider(endpoint_uri=config.http_provider))
-        contract = w3.eth.contract(address=config.contract_address, abi=config.abi.get("ABI"))
+        # Rollback the tail of the indexed swap events if the chain was reorganised since the last run
+        rollback_reorged_blocks(config, w3)
 
         # Calculate the block number from where to pull the swap events
-        curr_block_number = w3.eth.block_number
-        from_block = curr_block_number - config.block_number
+        # The head block hash is fetched before the logs, So that a reorg in between is caught in the next run
+        head_block = get_head_block(w3, get_provider_pool(config))
+        from_block = get_from_block(config, head_block.number)
+        BLOCKS_BEHIND_HEAD.labels(config_id=config_id).set(head_block.number - from_block + 1)
+
+        def update_cursor(_block_number: int) -> None:
+            block_hash = head_block.hash if _block_number == head_block.number else w3.eth.get_block(_block_number).hash
+            Config.objects.filter(id=config.id).update(last_indexed_block=_block_number, last_indexed_block_hash=block_hash.hex())
+            refresh_config_lock(config_id)
+            BLOCKS_BEHIND_HEAD.labels(config_id=config_id).set(head_block.number - _block_number)
+
+        index_block_range(config, contract, from_block, head_block.number, update_cursor, get_writer_class(use_copy))
+
+    except Exception as e:
+        logger.error({
+            "msg": "Error caught while processing swap events",
+            "error": e,
+            "traceback": traceback.format_exc()
+        })
+        return False
+
+    finally:
+        release_config_lock(config_id)
 
-        # Fetch swap events
-        swap_events = contract.events.Swap.get_logs(fromBlock=from_block)
+    return True
+
+
+@app.task
+def process_shared_swap_events(config_ids: list[str], use_copy: bool = False) -> None:
+    """
+    Index the new blocks of several configs sharing the same providers, With a single eth_getLogs per block window for all of them.
+    The window starts from the config furthest behind, The logs are demultiplexed to their config by contract address
+    and every config only indexes the blocks after its own cursor.
+    """
+
+    # Configs already being indexed by another task are left out
+    locked_config_ids = [config_id for config_id in config_ids if acquire_config_lock(config_id)]
+    if not locked_config_ids:
+        logger.info({"msg": "Configs are already being indexed, Skipping", "config_ids": config_ids})
+        return
+
+    try:
+        configs = {}
+        for config in Config.objects.filter(id__in=locked_config_ids):
+            w3, contract = get_contract(config)
+
+            try:
+                # Rollback the tail of the indexed swap events if the chain was reorganised since the last run
+                rollback_reorged_blocks(config, w3)
+            except Exception as e:
+                logger.error({
+                    "msg": "Error caught while rolling back reorged swap events, Skipping the config",
+                    "error": e,
+                    "traceback": traceback.format_exc(),
+                    "config_id": config.id
+                })
+                continue
+
+            configs[contract.address] = (config, contract)
+
+        if not configs:
+            return
+
+        # All the configs share the same providers, So any of the web3 objects will do
+        head_block = get_head_block(w3, get_provider_pool(config))
+        from_blocks = {address: get_from_block(config, head_block.number) for address, (config, _) in configs.items()}
+        for address, (config, _) in configs.items():
+            BLOCKS_BEHIND_HEAD.labels(config_id=str(config.id)).set(head_block.number - from_blocks[address] + 1)
+
+        spot_rate = ConversionRateSnapshot()
+        writer_class = get_writer_class(use_copy)
+        writers = {address: writer_class(config) for address, (config, _) in configs.items()}
+        contracts = [contract for _, contract in configs.values()]
+        for window_from_block, window_to_block, swap_events in scan_contracts_swap_events(w3, contracts, min(from_blocks.values()), head_block.number):
+            block_hash = head_block.hash if window_to_block == head_block.number else w3.eth.get_block(window_to_block).hash
+
+            for address, (config, _) in list(configs.items()):
+                # The config is ahead of the window, Its blocks were already indexed
+                if from_blocks[address] > window_to_block:
+                    continue
+
+                config_swap_events = [swap_event for swap_event in swap_events[address] if swap_event.blockNumber >= from_blocks[address]]
+                logger.info({
+                    "msg": f"Found {len(config_swap_events)} Swap Events",
+                    "config_id": config.id,
+                    "from_block_number": max(window_from_block, from_blocks[address]),
+                    "to_block_number": window_to_block
+                })
+
+                # A failing config is dropped from the run, So that it doesn't hold back the others
+                # Its cursor stays at its last indexed window and the next run resumes from there
+                try:
+                    index_swap_events(config, config_swap_events, spot_rate, writers[address])
+                    writers[address].flush()
+                except Exception as e:
+                    logger.error({
+                        "msg": "Error caught while processing swap events, Skipping the config",
+                        "error": e,
+                        "traceback": traceback.format_exc(),
+                        "config_id": config.id
+                    })
+                    del configs[address]
+                    continue
+
+                # Persist the cursor once the window is saved, So that a restarted task resumes from the next window
+                Config.objects.filter(id=config.id).update(last_indexed_block=window_to_block, last_indexed_block_hash=block_hash.hex())
+                refresh_config_lock(str(config.id))
+                BLOCKS_BEHIND_HEAD.labels(config_id=str(config.id)).set(head_block.number - window_to_block)
+
+            if not configs:
+                break
+
+    except Exception as e:
+        logger.error({
+            "msg": "Error caught while processing shared swap events",
+            "error": e,
+            "traceback": traceback.format_exc(),
+            "config_ids": locked_config_ids
+        })
+
+    finally:
+        for config_id in locked_config_ids:
+            release_config_lock(config_id)
+
+
+@app.task
+def follow_chain_head() -> None:
+    # Periodically triggered by celery beat, Index the new blocks of every active config
+    # Sync configs sharing the same providers are indexed together, So that their logs are fetched once per block window
+    provider_configs = {}
+    for config in Config.objects.filter(is_active=True):
+        if config.get_ingestion_mode() == Config.IngestionMode.ASYNC or SHARED_SCAN_MAX_CONTRACTS <= 1:
+            process_swap_events.apply_async(kwargs={"config_id": str(config.id)})
+            continue
+
+        provider_configs.setdefault(tuple(config.get_provider_urls()), []).append(str(config.id))
+
+    for config_ids in provider_configs.values():
+        for idx in range(0, len(config_ids), SHARED_SCAN_MAX_CONTRACTS):
+            group_config_ids = config_ids[idx:idx+SHARED_SCAN_MAX_CONTRACTS]
+            if len(group_config_ids) == 1:
+                process_swap_events.apply_async(kwargs={"config_id": group_config_ids[0]})
+            else:
+                process_shared_swap_events.apply_async(kwargs={"config_ids": group_config_ids})
+
+
+@app.task
+def backfill_swap_events(config_id: str, partitions: int = BACKFILL_PARTITIONS, use_copy: bool = False) -> None:
+    """
+    Split the pending block range of a config into partitions and index them in parallel across the celery workers.
+    The config cursor is advanced by finalize_backfill once all the partitions are completed.
+    With use_copy, The partitions are loaded with COPY instead of the ORM bulk inserts.
+    """
+
+    # The config stays locked until the backfill is finalized, So that the follow mode doesn't index the same range
+    if not acquire_config_lock(config_id, BACKFILL_LOCK_TIMEOUT):
+        logger.info({"msg": "Config is already being indexed, Skipping", "config_id": config_id})
+        return
+
+    try:
+        config = Config.objects.get(id=config_id)
+        w3, _ = get_contract(config)
+
+        rollback_reorged_blocks(config, w3)
+
+        head_block = get_head_block(w3, get_provider_pool(config))
+        curr_block_number = head_block.number
+        from_block = get_from_block(config, curr_block_number)
+        if from_block > curr_block_number:
+            release_config_lock(config_id)
+            return
+
+        # Don't create partitions smaller than a single block
+        partitions = max(min(partitions, curr_block_number - from_block + 1), 1)
+        partition_size = ceil((curr_block_number - from_block + 1) / partitions)
+
+        backfill_partitions = BackfillPartition.objects.bulk_create([
+            BackfillPartition(
+                config=config,
+                from_block=block_number,
+                to_block=min(block_number + partition_size - 1, curr_block_number)
+            )
+            for block_number in range(from_block, curr_block_number + 1, partition_size)
+        ])
 
         logger.info({
-            "msg": f"Found {len(swap_events)} Swap Events",
+            "msg": f"Dispatching {len(backfill_partitions)} backfill partitions",
+            "config_id": config_id,
             "from_block_number": from_block,
             "to_block_number": curr_block_number
         })
 
-        # Iterate and create the swap events
-        for idx, swap_event in enumerate(swap_events):
-            create_swap_event(w3, config, swap_event)
+        partition_ids = [str(partition.id) for partition in backfill_partitions]
+        dispatch_backfill_partitions(config_id, partition_ids, partition_ids, curr_block_number, head_block.hash.hex(), use_copy)
+
+    except Exception as e:
+        release_config_lock(config_id)
+        logger.error({
+            "msg": "Error caught while dispatching backfill partitions",
+            "error": e,
+            "traceback": traceback.format_exc()
+        })
+
+
+def dispatch_backfill_partitions(_config_id: str, _partition_ids: list[str], _pending_partition_ids: list[str], _to_block: int, _to_block_hash: str, _use_copy: bool = False) -> None:
+    chord(
+        index_backfill_partition.s(partition_id, use_copy=_use_copy) for partition_id in _pending_partition_ids
+    )(finalize_backfill.s(config_id=_config_id, partition_ids=_partition_ids, to_block=_to_block, to_block_hash=_to_block_hash, use_copy=_use_copy))
+
+
+@app.task
+def index_backfill_partition(partition_id: str, use_copy: bool = False) -> bool:
+    # Failures are recorded on the partition instead of being raised, So that the chord callback always runs
+    # The attempt is counted before anything else, So that a partition failing early still runs out of attempts
+    try:
+        BackfillPartition.objects.filter(id=partition_id).update(
+            status=BackfillPartition.Status.RUNNING,
+            attempts=F("attempts") + 1
+        )
+        partition = BackfillPartition.objects.select_related("config").get(id=partition_id)
+
+        _, contract = get_contract(partition.config)
 
-            # Once we reach the threshold chunk size, Pause the execution
-            # So that we don't get the rate limit error from the HTTP Provider
-            if idx % CHUNK_SIZE == 0:
-                sleep(5)
-                logger.info(f"{CHUNK_SIZE} swap events are processed successfully, Pausing the execution for 5 seconds!")
+        from_block = partition.from_block
+        if partition.last_indexed_block is not None:
+            from_block = partition.last_indexed_block + 1
+
+        index_block_range(
+            partition.config, contract, from_block, partition.to_block,
+            lambda block_number: BackfillPartition.objects.filter(id=partition.id).update(last_indexed_block=block_number),
+            get_writer_class(use_copy)
+        )
 
     except Exception as e:
         logger.error({
-            "msg": "Error caught while processing swap events",
+            "msg": "Error caught while indexing backfill partition",
+            "partition_id": partition_id,
             "error": e,
             "traceback": traceback.format_exc()
         })
+        BackfillPartition.objects.filter(id=partition_id).update(status=BackfillPartition.Status.FAILED)
+        return False
+
+    BackfillPartition.objects.filter(id=partition.id).update(status=BackfillPartition.Status.COMPLETED)
+    return True
+
+
+@app.task
+def finalize_backfill(results: list[bool], config_id: str, partition_ids: list[str], to_block: int, to_block_hash: str, use_copy: bool = False) -> None:
+    partitions = BackfillPartition.objects.filter(id__in=partition_ids)
+    failed_partitions = partitions.exclude(status=BackfillPartition.Status.COMPLETED)
+
+    if not failed_partitions.exists():
+        # All the partitions are indexed, Advance the config cursor and cleanup the partitions
+        Config.objects.filter(
+            Q(last_indexed_block__isnull=True) | Q(last_indexed_block__lt=to_block), id=config_id
+        ).update(last_indexed_block=to_block, last_indexed_block_hash=to_block_hash)
+        partitions.delete()
+        release_config_lock(config_id)
+
+        logger.info({
+            "msg": "Backfill completed successfully",
+            "config_id": config_id,
+            "to_block_number": to_block
+        })
+        return
+
+    retry_partition_ids = [
+        str(partition_id) for partition_id in
+        failed_partitions.filter(attempts__lt=BACKFILL_MAX_ATTEMPTS).values_list("id", flat=True)
+    ]
+
+    # Re-dispatch the failed partitions until they succeed or run out of attempts
+    if len(retry_partition_ids) != failed_partitions.count():
+        logger.error({
+            "msg": "Backfill partitions failed after the maximum attempts, Config cursor is not advanced",
+            "config_id": config_id,
+            "partition_ids": [str(partition_id) for partition_id in failed_partitions.values_list("id", flat=True)]
+        })
+        release_config_lock(config_id)
+        return
+
+    logger.info({
+        "msg": f"Re-dispatching {len(retry_partition_ids)} failed backfill partitions",
+        "config_id": config_id
+    })
+    refresh_config_lock(config_id, BACKFILL_LOCK_TIMEOUT)
+    dispatch_backfill_partitions(config_id, partition_ids, retry_partition_ids, to_block, to_block_hash, use_copy)
@@ -0,0 +1,611 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from decimal import Decimal
+from time import monotonic, time
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import SimpleTestCase, TestCase
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from eth_abi import encode
+from eth_utils import keccak
+from hexbytes import HexBytes
+from web3 import Web3
+from web3._utils.events import get_event_data
+from web3.datastructures import AttributeDict
+
+from app.decoders import decode_swap_event, get_event_abi
+from app.models import Config, EthUsdPrice, ExportWatermark, SwapCandle, SwapEvent
+from app.partitions import PARTITION_SIZE, created_partitions, ensure_partitions, get_partition_name, get_partitions, insert_into_partitions
+from app.prices import PriceIndex
+from app.providers import ProviderPool
+from app.rollups import update_rollups
+from app.schemas import SwapEvent as SwapEventSchema
+from app.schemas import decode_cursor, encode_cursor
+from app.tasks import (
+    PRICE_MAX_AGE, ConversionRateSnapshot, IncompleteWindowError, check_swap_events_details, get_usd_exchange_rate, index_swap_events, rollback_reorged_blocks
+)
+from app.writer import CopySwapEventWriter, SwapEventWriteError, SwapEventWriter
+
+SENDER = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
+RECIPIENT = "0x3fC91A3afd70395Cd496C647d5a6CC9D4B2b7FAD"
+
+UNISWAP_V2_SWAP_ABI = [{
+    "anonymous": False,
+    "inputs": [
+        {"indexed": True, "name": "sender", "type": "address"},
+        {"indexed": False, "name": "amount0In", "type": "uint256"},
+        {"indexed": False, "name": "amount1In", "type": "uint256"},
+        {"indexed": False, "name": "amount0Out", "type": "uint256"},
+        {"indexed": False, "name": "amount1Out", "type": "uint256"},
+        {"indexed": True, "name": "to", "type": "address"},
+    ],
+    "name": "Swap",
+    "type": "event"
+}]
+
+UNISWAP_V3_SWAP_ABI = [{
+    "anonymous": False,
+    "inputs": [
+        {"indexed": True, "name": "sender", "type": "address"},
+        {"indexed": True, "name": "recipient", "type": "address"},
+        {"indexed": False, "name": "amount0", "type": "int256"},
+        {"indexed": False, "name": "amount1", "type": "int256"},
+        {"indexed": False, "name": "sqrtPriceX96", "type": "uint160"},
+        {"indexed": False, "name": "liquidity", "type": "uint128"},
+        {"indexed": False, "name": "tick", "type": "int24"},
+    ],
+    "name": "Swap",
+    "type": "event"
+}]
+
+
+def to_topic(_address: str) -> HexBytes:
+    return HexBytes("0x" + "00" * 12 + _address[2:].lower())
+
+
+def make_swap_event(_abi: list, _args: dict):
+    # Encode the log the way the pool emits it and decode it with web3, Like contract.events.Swap.get_logs does
+    event_abi = get_event_abi(_abi)
+    signature = f"Swap({','.join(_input['type'] for _input in event_abi['inputs'])})"
+    data_inputs = [_input for _input in event_abi["inputs"] if not _input["indexed"]]
+    log = {
+        "address": Web3.to_checksum_address("0x" + "11" * 20),
+        "topics": [HexBytes(keccak(text=signature))] + [
+            to_topic(_args[_input["name"]]) for _input in event_abi["inputs"] if _input["indexed"]
+        ],
+        "data": HexBytes(encode([_input["type"] for _input in data_inputs], [_args[_input["name"]] for _input in data_inputs])),
+        "blockNumber": 19000000,
+        "blockHash": HexBytes("0x" + "ab" * 32),
+        "transactionHash": HexBytes("0x" + "cd" * 32),
+        "transactionIndex": 3,
+        "logIndex": 7,
+    }
+    return AttributeDict.recursive(get_event_data(Web3().codec, event_abi, log))
+
+
+class DecodeSwapEventTests(SimpleTestCase):
+    def test_uniswap_v2_swap(self):
+        # 1.5 WETH (token1) paid in for 3000 USDC (token0, 6 decimals)
+        config = Config(abi={"ABI": UNISWAP_V2_SWAP_ABI}, eth_token_index=1, token_decimals=6)
+        swap_event = make_swap_event(UNISWAP_V2_SWAP_ABI, {
+            "sender": SENDER,
+            "amount0In": 0,
+            "amount1In": 15 * 10 ** 17,
+            "amount0Out": 3000 * 10 ** 6,
+            "amount1Out": 0,
+            "to": RECIPIENT,
+        })
+
+        swap = decode_swap_event(config, swap_event)
+
+        self.assertEqual(swap["sender"], SENDER)
+        self.assertEqual(swap["recipient"], RECIPIENT)
+        self.assertEqual(swap["amount0"], -3000 * 10 ** 6)
+        self.assertEqual(swap["amount1"], 15 * 10 ** 17)
+        self.assertIsNone(swap["sqrt_price_x96"])
+        self.assertEqual(swap["swapped_eth_wei"], 15 * 10 ** 17)
+        self.assertEqual(swap["execution_price_eth"], Decimal("0.0005"))
+
+    def test_uniswap_v3_swap(self):
+        # 0.1 WETH (token0) received for 300 USDC (token1, 6 decimals)
+        config = Config(abi={"ABI": UNISWAP_V3_SWAP_ABI}, eth_token_index=0, token_decimals=6)
+        swap_event = make_swap_event(UNISWAP_V3_SWAP_ABI, {
+            "sender": SENDER,
+            "recipient": RECIPIENT,
+            "amount0": -10 ** 17,
+            "amount1": 300 * 10 ** 6,
+            "sqrtPriceX96": 2 ** 96 * 2,
+            "liquidity": 10 ** 20,
+            "tick": -5,
+        })
+
+        swap = decode_swap_event(config, swap_event)
+
+        self.assertEqual(swap["sender"], SENDER)
+        self.assertEqual(swap["recipient"], RECIPIENT)
+        self.assertEqual(swap["amount0"], -10 ** 17)
+        self.assertEqual(swap["amount1"], 300 * 10 ** 6)
+        self.assertEqual(swap["sqrt_price_x96"], 2 ** 96 * 2)
+        self.assertEqual(swap["liquidity"], 10 ** 20)
+        self.assertEqual(swap["tick"], -5)
+        self.assertEqual(swap["swapped_eth_wei"], 10 ** 17)
+        self.assertEqual(swap["execution_price_eth"], Decimal("0.1") / Decimal(300))
+
+
+class CheckSwapEventsDetailsTests(SimpleTestCase):
+    def setUp(self):
+        self.swap_event = make_swap_event(UNISWAP_V3_SWAP_ABI, {
+            "sender": SENDER,
+            "recipient": RECIPIENT,
+            "amount0": -10 ** 17,
+            "amount1": 300 * 10 ** 6,
+            "sqrtPriceX96": 2 ** 96,
+            "liquidity": 10 ** 20,
+            "tick": 0,
+        })
+        self.tx_hash = self.swap_event.transactionHash.hex()
+
+    def test_complete_window(self):
+        check_swap_events_details([self.swap_event], {self.tx_hash: {"gas_used": 1}}, {self.swap_event.blockNumber: 1700000000})
+
+    def test_missing_transaction(self):
+        with self.assertRaises(IncompleteWindowError):
+            check_swap_events_details([self.swap_event], {}, {self.swap_event.blockNumber: 1700000000})
+
+    def test_missing_block(self):
+        with self.assertRaises(IncompleteWindowError):
+            check_swap_events_details([self.swap_event], {self.tx_hash: {"gas_used": 1}}, {})
+
+
+class SpotRate:
+    def get(self) -> Decimal:
+        return Decimal("2000.00")
+
+
+@patch("app.tasks.price_index.get_rate", return_value=None)
+class GetUsdExchangeRateTests(SimpleTestCase):
+    def test_indexed_price(self, get_rate):
+        get_rate.return_value = Decimal("1500.00")
+        self.assertEqual(get_usd_exchange_rate(1600000000, SpotRate()), Decimal("1500.00"))
+
+    def test_recent_block_uses_spot_rate(self, get_rate):
+        self.assertEqual(get_usd_exchange_rate(int(time()) - 60, SpotRate()), Decimal("2000.00"))
+
+    def test_old_block_without_price(self, get_rate):
+        self.assertIsNone(get_usd_exchange_rate(int(time()) - PRICE_MAX_AGE - 60, SpotRate()))
+
+
+class PriceIndexTests(TestCase):
+    def add_price(self, _timestamp: int, _price: str) -> None:
+        EthUsdPrice.objects.create(timestamp=datetime.fromtimestamp(_timestamp, tz=timezone.utc), price=Decimal(_price))
+
+    def test_incremental_load(self):
+        self.add_price(1700000000, "2000.00")
+        self.add_price(1700000060, "2001.50")
+
+        index = PriceIndex()
+        self.assertEqual(index.get_rate(1700000070), Decimal("2001.50"))
+
+        # Only the prices after the last loaded one are read on the next refresh
+        self.add_price(1700000120, "123456.78")
+        index.loaded_at = None
+        with self.assertNumQueries(1):
+            self.assertEqual(index.get_rate(1700000130), Decimal("123456.78"))
+        self.assertEqual(list(index.timestamps), [1700000000, 1700000060, 1700000120])
+        self.assertEqual(index.get_rate(1700000010), Decimal("2000.00"))
+
+
+class LoadEthPricesTests(TestCase):
+    def load(self, _rows: list) -> None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        path = os.path.join(tmp_dir.name, "prices.json")
+        with open(path, "w") as prices_file:
+            json.dump(_rows, prices_file)
+
+        call_command("load_eth_prices", path, stdout=io.StringIO())
+
+    def test_coinbase_candles(self):
+        self.load([[1700000000, 1990, 2010, 1995, "2000.5", 12.3], [1700000060000, 1990, 2010, 1995, 2001, 4.5]])
+        self.assertEqual(list(EthUsdPrice.objects.values_list("price", flat=True)), [Decimal("2000.50"), Decimal("2001.00")])
+
+    def test_short_row(self):
+        with self.assertRaisesMessage(CommandError, "Invalid row 2"):
+            self.load([[1700000000, "2000.5"], [1700000060]])
+
+
+class IndexSwapEventsTests(SimpleTestCase):
+    # Swap(uint256) has no decoder, So the price is parsed from the transaction input
+    CUSTOM_SWAP_ABI = [{"anonymous": False, "inputs": [{"indexed": False, "name": "amount", "type": "uint256"}], "name": "Swap", "type": "event"}]
+
+    def setUp(self):
+        self.config = Config(abi={"ABI": self.CUSTOM_SWAP_ABI}, http_provider="http://localhost:8545")
+        self.swap_event = make_swap_event(UNISWAP_V3_SWAP_ABI, {
+            "sender": SENDER,
+            "recipient": RECIPIENT,
+            "amount0": -10 ** 17,
+            "amount1": 300 * 10 ** 6,
+            "sqrtPriceX96": 2 ** 96,
+            "liquidity": 10 ** 20,
+            "tick": 0,
+        })
+        self.tx_hash = self.swap_event.transactionHash.hex()
+
+        cache = MagicMock()
+        cache.get_many.return_value = {}
+        for target, value in (
+            ("app.tasks.tiered_cache", cache),
+            ("app.tasks.get_receipts", MagicMock(return_value={self.tx_hash: {"gas_used": 100000, "effective_gas_price": 10 ** 9}})),
+            ("app.tasks.get_block_timestamps", MagicMock(return_value={self.swap_event.blockNumber: 1700000000})),
+        ):
+            patcher = patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def index(self, _transactions: list) -> MagicMock:
+        writer = MagicMock()
+        with patch("app.tasks.batch_request", return_value=_transactions):
+            index_swap_events(self.config, [self.swap_event], ConversionRateSnapshot(), writer)
+        return writer
+
+    def test_short_calldata_is_skipped(self):
+        # The input is too short to hold the execution price, The window completes without the swap event
+        writer = self.index([{"hash": self.tx_hash, "input": "0x12345678", "value": "0x0", "gasPrice": "0x1"}])
+        writer.add.assert_not_called()
+
+    def test_missing_transaction(self):
+        # A transaction missing from the RPC response is retried by the next run
+        with self.assertRaises(IncompleteWindowError):
+            self.index([None])
+
+
+def make_swap_event_obj(_config_obj: Config, _block_number: int, _log_index: int = 0, **_fields) -> SwapEvent:
+    return SwapEvent(**{
+        "config": _config_obj,
+        "block_number": _block_number,
+        "block_timestamp": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        "log_index": _log_index,
+        "tx_hash": _block_number.to_bytes(32, "big"),
+        "tx_index": 0,
+        "gas_used": 100000,
+        "gas_price": 10 ** 9,
+        "execution_price_eth": Decimal("0.0005"),
+        "swapped_eth_wei": 10 ** 17,
+        **_fields
+    })
+
+
+class SwapEventsTestCase(TestCase):
+    # Partitions are rolled back along with the test on PostgreSQL, So they must not stay in the cache
+    def setUp(self):
+        created_partitions.clear()
+        self.addCleanup(created_partitions.clear)
+
+        self.config = Config.objects.create(contract_address="0x" + "11" * 20, http_provider="http://localhost:8545")
+
+    def save_swap_events(self, _swap_event_objs: list[SwapEvent]) -> None:
+        ensure_partitions([swap_event_obj.block_number for swap_event_obj in _swap_event_objs])
+        SwapEvent.objects.bulk_create(_swap_event_objs)
+
+
+class ExportWatermarkTests(SwapEventsTestCase):
+    def setUp(self):
+        super().setUp()
+
+        Config.objects.filter(id=self.config.id).update(last_indexed_block=200 + settings.REORG_MAX_DEPTH)
+        self.save_swap_events([make_swap_event_obj(self.config, block_number) for block_number in (100, 200, 300)])
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, "swap_events.csv.gz")
+
+    def export(self, **_options) -> list[str]:
+        call_command("export_swap_events", str(self.config.id), self.path, stdout=io.StringIO(), **_options)
+        with gzip.open(self.path, "rt") as export_file:
+            return [row[0] for row in list(csv.reader(export_file))[1:]]
+
+    def test_watermark_advance(self):
+        self.assertEqual(self.export(watermark="daily"), ["100", "200"])
+        self.assertEqual(ExportWatermark.objects.get(name="daily", config=self.config).last_exported_block, 200)
+
+        # Nothing new is final yet, The watermark stays
+        self.assertEqual(self.export(watermark="daily"), [])
+        self.assertEqual(ExportWatermark.objects.get(name="daily", config=self.config).last_exported_block, 200)
+
+        Config.objects.filter(id=self.config.id).update(last_indexed_block=300 + settings.REORG_MAX_DEPTH)
+        self.assertEqual(self.export(watermark="daily"), ["300"])
+        self.assertEqual(ExportWatermark.objects.get(name="daily", config=self.config).last_exported_block, 300)
+
+    def test_watermark_with_time_filter(self):
+        with self.assertRaises(CommandError):
+            self.export(watermark="daily", to_time=datetime(2024, 1, 1, tzinfo=timezone.utc))
+        self.assertFalse(ExportWatermark.objects.exists())
+
+
+@skipUnless(connection.vendor == "postgresql", "Swap events are only partitioned on PostgreSQL")
+class PartitionTests(SwapEventsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.block_number = 1000 * PARTITION_SIZE + 5
+
+    def insert(self, _log_index: int) -> None:
+        def insert() -> None:
+            with transaction.atomic():
+                SwapEvent.objects.bulk_create([make_swap_event_obj(self.config, self.block_number, _log_index)])
+
+        insert_into_partitions([self.block_number], insert)
+
+    def test_partitioned_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [SwapEvent._meta.db_table])
+            self.assertIsNotNone(cursor.fetchone())
+
+            # The check constraints of the plain table are copied to the partitioned table
+            cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'c'", [SwapEvent._meta.db_table])
+            self.assertIn("app_swapevent_block_number_check", {row[0] for row in cursor.fetchall()})
+
+        self.insert(0)
+
+        # The partition of the block and the next one
+        partitions = get_partitions()
+        self.assertEqual(partitions[get_partition_name(1000 * PARTITION_SIZE)], (1000 * PARTITION_SIZE, 1001 * PARTITION_SIZE))
+        self.assertEqual(partitions[get_partition_name(1001 * PARTITION_SIZE)], (1001 * PARTITION_SIZE, 1002 * PARTITION_SIZE))
+
+    def test_insert_retried_after_dropped_partition(self):
+        self.insert(0)
+
+        # Dropped by another process, The partition is still in the cache of this one
+        # The deferred foreign key checks of the inserted rows must run before their partition can be dropped
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            cursor.execute(f'DROP TABLE "{get_partition_name(1000 * PARTITION_SIZE)}"')
+
+        self.insert(1)
+        self.assertEqual(list(SwapEvent.objects.filter(config=self.config).values_list("log_index", flat=True)), [1])
+
+
+class SwapEventWriterTests(SimpleTestCase):
+    def test_failed_rows_are_raised(self):
+        written = []
+
+        def write_batch(_swap_events: list) -> None:
+            if any(swap_event.log_index == 1 for swap_event in _swap_events):
+                raise DatabaseError("value out of range")
+            written.extend(swap_event.log_index for swap_event in _swap_events)
+
+        writer = SwapEventWriter(Config(), batch_size=10)
+        writer.write_batch = write_batch
+        for log_index in range(3):
+            writer.add(MagicMock(log_index=log_index))
+
+        # The other rows are saved row by row, The failed one fails the flush so that its window is retried
+        with self.assertRaises(SwapEventWriteError):
+            writer.flush()
+        self.assertEqual(written, [0, 2])
+
+
+@skipUnless(connection.vendor == "postgresql", "COPY is only used on PostgreSQL")
+class CopySwapEventWriterTests(SwapEventsTestCase):
+    def make_swap_event(self, _log_index: int, **_fields) -> SwapEventSchema:
+        return SwapEventSchema(**{
+            "block_number": 19000000,
+            "block_hash": "0x" + "ab" * 32,
+            "block_timestamp": datetime(2024, 1, 1, 0, 0, _log_index, tzinfo=timezone.utc),
+            "log_index": _log_index,
+            "sender": SENDER,
+            "recipient": RECIPIENT,
+            "amount0": -10 ** 17,
+            "amount1": 300 * 10 ** 6,
+            "tx_hash": "0x" + "cd" * 32,
+            "tx_index": 3,
+            "gas_used": 100000,
+            "gas_price": 10 ** 9,
+            "usd_exchange_rate": Decimal("2000.50"),
+            "execution_price_eth": Decimal("0.000333333333333333333333333333333333"),
+            "swapped_eth_wei": 10 ** 17,
+            **_fields
+        })
+
+    def test_round_trip(self):
+        # Backslashes, Tabs and newlines must be escaped in the COPY text format
+        event = {"args": {"note": "tab\there\nnew line \\ backslash"}, "event": "Swap"}
+        CopySwapEventWriter(self.config).write_batch([self.make_swap_event(0, event=event), self.make_swap_event(1)])
+
+        swap_event_obj = SwapEvent.objects.get(config=self.config, log_index=0)
+        self.assertEqual(bytes(swap_event_obj.sender), bytes.fromhex(SENDER[2:]))
+        self.assertEqual(bytes(swap_event_obj.tx_hash), b"\xcd" * 32)
+        self.assertEqual(swap_event_obj.event, event)
+        self.assertEqual(swap_event_obj.amount0, -10 ** 17)
+        self.assertEqual(swap_event_obj.usd_exchange_rate, Decimal("2000.50"))
+        self.assertEqual(swap_event_obj.execution_price_eth, Decimal("0.000333333333333333333333333333333333"))
+        self.assertEqual(swap_event_obj.block_timestamp, datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+        candle = SwapCandle.objects.get(config=self.config, interval=SwapCandle.Interval.MINUTE)
+        self.assertEqual(candle.trade_count, 2)
+
+    def test_duplicates_are_skipped(self):
+        writer = CopySwapEventWriter(self.config)
+        writer.write_batch([self.make_swap_event(0), self.make_swap_event(1)])
+        writer.write_batch([self.make_swap_event(1), self.make_swap_event(2, execution_price_eth=Decimal("0.0004"))])
+
+        self.assertEqual(SwapEvent.objects.filter(config=self.config).count(), 3)
+
+        # The duplicate isn't counted again, The last swap event closes the candle
+        candle = SwapCandle.objects.get(config=self.config, interval=SwapCandle.Interval.MINUTE)
+        self.assertEqual(candle.trade_count, 3)
+        self.assertEqual(candle.volume_usd, Decimal("0.3") * Decimal("2000.50"))
+        self.assertEqual(candle.close, Decimal("0.0004") * Decimal("2000.50"))
+        self.assertEqual(candle.high, Decimal("0.0004") * Decimal("2000.50"))
+
+
+class RollbackReorgedBlocksTests(SwapEventsTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # A swap event per block, Along with their minute candles
+        self.save_swap_events([
+            make_swap_event_obj(
+                self.config,
+                block_number,
+                block_hash=f"0x{block_number}",
+                block_timestamp=datetime(2024, 1, 1, 0, minute, tzinfo=timezone.utc),
+                usd_exchange_rate=Decimal("2000.00")
+            )
+            for minute, block_number in enumerate((100, 105, 110))
+        ])
+        update_rollups(list(SwapEvent.objects.all()))
+
+        self.config.last_indexed_block = 110
+        self.config.last_indexed_block_hash = "0x110"
+        self.config.save()
+
+    def rollback(self, _cursor_hash: str, _canonical_hashes: dict) -> None:
+        w3 = MagicMock()
+        w3.eth.get_block.return_value.hash.hex.return_value = _cursor_hash
+
+        def batch_request(_pool, _requests: list) -> list:
+            return [{"hash": _canonical_hashes[int(params[0], 16)]} for _, params in _requests]
+
+        with patch("app.tasks.get_provider_pool"), patch("app.tasks.batch_request", side_effect=batch_request):
+            rollback_reorged_blocks(self.config, w3)
+
+    def test_canonical_cursor(self):
+        self.rollback("0x110", {})
+        self.assertEqual(SwapEvent.objects.count(), 3)
+
+    def test_rollback_to_common_ancestor(self):
+        # Blocks 105 and 110 were reorganised, Block 100 is still canonical
+        self.rollback("0x110b", {110: "0x110b", 105: "0x105b", 100: "0x100"})
+
+        self.assertEqual(list(SwapEvent.objects.values_list("block_number", flat=True)), [100])
+
+        self.config.refresh_from_db()
+        self.assertEqual((self.config.last_indexed_block, self.config.last_indexed_block_hash), (100, "0x100"))
+
+        # The candles of the deleted swap events are rebuilt
+        candles = SwapCandle.objects.filter(config=self.config, interval=SwapCandle.Interval.MINUTE)
+        self.assertEqual([(candle.bucket.minute, candle.trade_count) for candle in candles], [(0, 1)])
+
+
+class UpdateRollupsTests(SwapEventsTestCase):
+    def add_swap_events(self, *_swap_events: tuple[int, str]) -> None:
+        swap_event_objs = [
+            make_swap_event_obj(
+                self.config,
+                block_number,
+                execution_price_eth=Decimal(price),
+                block_timestamp=datetime(2024, 1, 1, 0, 0, block_number % 60, tzinfo=timezone.utc),
+                usd_exchange_rate=Decimal("2000.00")
+            )
+            for block_number, price in _swap_events
+        ]
+        self.save_swap_events(swap_event_objs)
+        update_rollups(swap_event_objs)
+
+    def test_candle_merge(self):
+        self.add_swap_events((110, "0.0005"), (120, "0.0007"))
+
+        # A batch of older and newer swap events is merged into the candle in chain order
+        self.add_swap_events((130, "0.0004"), (105, "0.0006"))
+
+        candle = SwapCandle.objects.get(config=self.config, interval=SwapCandle.Interval.MINUTE)
+        self.assertEqual(candle.open, Decimal("1.2"))
+        self.assertEqual(candle.close, Decimal("0.8"))
+        self.assertEqual(candle.high, Decimal("1.4"))
+        self.assertEqual(candle.low, Decimal("0.8"))
+        self.assertEqual(candle.volume_usd, Decimal("800"))
+        self.assertEqual(candle.trade_count, 4)
+
+    def test_duplicates_are_not_counted(self):
+        self.add_swap_events((110, "0.0005"))
+
+        # The duplicate isn't inserted, So it keeps the id of the stored swap event and isn't counted again
+        update_rollups([make_swap_event_obj(self.config, 110, execution_price_eth=Decimal("0.0005"))])
+        self.assertEqual(SwapCandle.objects.get(config=self.config, interval=SwapCandle.Interval.MINUTE).trade_count, 1)
+
+
+class SwapEventsPaginationTests(SwapEventsTestCase):
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(19000000, 7)), (19000000, 7))
+        with self.assertRaises(ValueError):
+            decode_cursor("not a cursor")
+
+    def test_pages(self):
+        positions = [(100, 0), (100, 1), (100, 2), (101, 0), (103, 5)]
+        self.save_swap_events([make_swap_event_obj(self.config, block_number, log_index) for block_number, log_index in reversed(positions)])
+
+        pages = []
+        params = {"config": str(self.config.id), "limit": 2}
+        while True:
+            response = self.client.get("/api/swap-events/", params)
+            self.assertEqual(response.status_code, 200)
+            pages.append([(swap_event["block_number"], swap_event["log_index"]) for swap_event in response.json()["results"]])
+
+            if not response.json()["next_cursor"]:
+                break
+            params["cursor"] = response.json()["next_cursor"]
+
+        self.assertEqual(pages, [positions[:2], positions[2:4], positions[4:]])
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/swap-events/", {"cursor": "not a cursor"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ProviderPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.pool = ProviderPool(["http://node-a:8545", "http://node-b:8545"])
+        self.pool.checked_at = monotonic()
+        for endpoint in self.pool.endpoints:
+            endpoint.bucket = MagicMock()
+
+        # The first healthy endpoint is chosen instead of a weighted random one
+        patcher = patch("app.providers.random.choices", side_effect=lambda _endpoints, weights: _endpoints[:1])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_failover(self):
+        node_a, node_b = self.pool.endpoints
+
+        def make_request(_endpoint) -> str:
+            if _endpoint is node_a:
+                raise RequestsConnectionError("Connection refused")
+            return _endpoint.url
+
+        # Node A is retried on node B until it is skipped as unhealthy
+        for _ in range(10):
+            self.assertEqual(self.pool.request(1, make_request), node_b.url)
+        self.assertEqual(node_a.failures, settings.RPC_UNHEALTHY_AFTER_FAILURES)
+        self.assertFalse(node_a.is_healthy())
+        self.assertEqual(node_b.failures, 0)
+
+    def test_every_endpoint_failing(self):
+        calls = []
+
+        def make_request(_endpoint) -> None:
+            calls.append(_endpoint)
+            raise RequestsConnectionError("Connection refused")
+
+        with self.assertRaises(RequestsConnectionError):
+            self.pool.request(1, make_request)
+        self.assertCountEqual(calls, self.pool.endpoints)
+
+    def test_request_error_is_not_retried(self):
+        calls = []
+
+        def make_request(_endpoint) -> None:
+            calls.append(_endpoint)
+            raise ValueError("execution reverted")
+
+        with self.assertRaises(ValueError):
+            self.pool.request(1, make_request)
+        self.assertEqual(len(calls), 1)
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from app import views
+
+urlpatterns = [
+    path('swap-events/', views.list_swap_events, name='swap-events'),
+    path('swap-events/export/', views.export_swap_events_view, name='swap-events-export'),
+    path('swap-candles/', views.list_swap_candles, name='swap-candles'),
+]
@@ -0,0 +1,138 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from pydantic import ValidationError
+
+from app.exports import CONTENT_TYPES, FILE_EXTENSIONS, export_swap_events, get_export_queryset, pyarrow
+from app.metrics import get_registry
+from app.models import Config, SwapCandle, SwapEvent
+from app.schemas import SwapCandleFilters, SwapEventExportFilters, SwapEventFilters, SwapEventResponse, encode_cursor
+
+
+def filter_swap_events(_filters: SwapEventFilters):
+    queryset = SwapEvent.objects.all()
+
+    if _filters.config:
+        queryset = queryset.filter(config_id=_filters.config)
+    if _filters.from_block is not None:
+        queryset = queryset.filter(block_number__gte=_filters.from_block)
+    if _filters.to_block is not None:
+        queryset = queryset.filter(block_number__lte=_filters.to_block)
+    if _filters.tx_hash:
+        queryset = queryset.filter(tx_hash=_filters.get_bytes("tx_hash"))
+    if _filters.from_time:
+        queryset = queryset.filter(block_timestamp__gte=_filters.from_time)
+    if _filters.to_time:
+        queryset = queryset.filter(block_timestamp__lte=_filters.to_time)
+    if _filters.sender:
+        queryset = queryset.filter(sender=_filters.get_bytes("sender"))
+    if _filters.recipient:
+        queryset = queryset.filter(recipient=_filters.get_bytes("recipient"))
+
+    if cursor := _filters.get_cursor():
+        block_number, log_index = cursor
+
+        # Keyset pagination, The block_number >= condition lets the DB seek straight to the cursor in the index
+        queryset = queryset.filter(
+            Q(block_number__gte=block_number) & (Q(block_number__gt=block_number) | Q(log_index__gt=log_index))
+        )
+
+    return queryset.order_by("block_number", "log_index")
+
+
+@require_GET
+async def list_swap_events(request: HttpRequest) -> JsonResponse:
+    """
+    List the swap events ordered by (block_number, log_index).
+    Pass the next_cursor of the response as the cursor query param to fetch the next page.
+    """
+
+    try:
+        filters = SwapEventFilters.model_validate(request.GET.dict())
+    except ValidationError as e:
+        return JsonResponse({"errors": e.errors(include_url=False, include_context=False)}, status=400)
+
+    # Fetch one extra row to know if there is a next page
+    swap_events = [swap_event async for swap_event in filter_swap_events(filters)[:filters.limit + 1]]
+    has_next = len(swap_events) > filters.limit
+    swap_events = swap_events[:filters.limit]
+
+    return JsonResponse({
+        "results": [
+            {
+                "id": str(swap_event.id),
+                "config_id": str(swap_event.config_id),
+                **SwapEventResponse.model_validate(swap_event, from_attributes=True).model_dump(mode="json")
+            }
+            for swap_event in swap_events
+        ],
+        "next_cursor": encode_cursor(swap_events[-1].block_number, swap_events[-1].log_index) if has_next else None
+    })
+
+
+async def stream_export(_queryset, _format: str):
+    # The export is read in the sync thread chunk by chunk, Instead of letting Django consume the whole sync iterator into memory first
+    chunks = await sync_to_async(export_swap_events)(_queryset, _format)
+    while (chunk := await sync_to_async(next)(chunks, None)) is not None:
+        yield chunk
+
+
+@require_GET
+async def export_swap_events_view(request: HttpRequest) -> HttpResponse:
+    """
+    Stream the final swap events of a config as gzipped CSV or Parquet.
+    The last exported block is returned in the X-Export-To-Block header, Pass it + 1 as the from_block of the next incremental export.
+    """
+
+    try:
+        filters = SwapEventExportFilters.model_validate(request.GET.dict())
+    except ValidationError as e:
+        return JsonResponse({"errors": e.errors(include_url=False, include_context=False)}, status=400)
+
+    if filters.format == "parquet" and pyarrow is None:
+        return JsonResponse({"errors": [{"msg": "Parquet exports are not available"}]}, status=400)
+
+    config = await Config.objects.filter(id=filters.config).afirst()
+    if config is None:
+        return JsonResponse({"errors": [{"msg": "Config not found"}]}, status=404)
+
+    queryset, to_block = get_export_queryset(config, filters.from_block, filters.to_block, filters.from_time, filters.to_time)
+
+    response = StreamingHttpResponse(stream_export(queryset, filters.format), content_type=CONTENT_TYPES[filters.format])
+    response["Content-Disposition"] = f'attachment; filename="swap_events_{config.id}{FILE_EXTENSIONS[filters.format]}"'
+    if to_block is not None:
+        response["X-Export-To-Block"] = str(to_block)
+    return response
+
+
+@require_GET
+async def list_swap_candles(request: HttpRequest) -> JsonResponse:
+    # OHLCV candles of a config read from the precomputed rollups, Latest first
+    try:
+        filters = SwapCandleFilters.model_validate(request.GET.dict())
+    except ValidationError as e:
+        return JsonResponse({"errors": e.errors(include_url=False, include_context=False)}, status=400)
+
+    queryset = SwapCandle.objects.filter(config_id=filters.config, interval=filters.interval)
+    if filters.from_time:
+        queryset = queryset.filter(bucket__gte=filters.from_time)
+    if filters.to_time:
+        queryset = queryset.filter(bucket__lte=filters.to_time)
+
+    candles = queryset.order_by("-bucket").values(
+        "bucket", "open", "high", "low", "close", "volume_usd", "tx_usd_cost", "trade_count"
+    )[:filters.limit]
+
+    return JsonResponse({
+        "results": [
+            {**candle, "bucket": candle["bucket"].isoformat()} async for candle in candles
+        ]
+    })
+
+
+@require_GET
+def metrics(request: HttpRequest) -> HttpResponse:
+    # Prometheus metrics of all the worker processes, Aggregated from PROMETHEUS_MULTIPROC_DIR if set
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
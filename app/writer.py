@@ -0,0 +1,175 @@
+import io
+import json
+import logging
+from datetime import datetime
+from decimal import Decimal
+from time import monotonic
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+
+from app.metrics import DB_WRITE_FAILURES, RETRIES, SWAP_EVENTS_WRITTEN, track_stage
+from app.models import Config, SwapEvent
+from app.partitions import insert_into_partitions
+from app.rollups import SWAP_EVENT_FIELDS, compute_candles, update_rollups, upsert_candles
+from app.schemas import SwapEvent as SwapEventSchema
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = settings.DB_BATCH_SIZE
+FLUSH_INTERVAL = settings.DB_FLUSH_INTERVAL
+COPY_BATCH_SIZE = settings.DB_COPY_BATCH_SIZE
+
+STAGING_TABLE = "swap_event_staging"
+
+
+class SwapEventWriteError(Exception):
+    # Raised when some swap events of a batch couldn't be saved even row by row, So that the cursor isn't moved past their window
+    pass
+
+
+class SwapEventWriter:
+    """
+    Buffer validated swap events and insert them with a single bulk insert per batch.
+    The buffer is flushed once it reaches the batch size or when the flush interval has elapsed,
+    Duplicate events are skipped by the unique_tx_event constraint. A flush raises SwapEventWriteError if some rows still fail row by row.
+    """
+
+    def __init__(self, _config_obj: Config, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL) -> None:
+        self.config = _config_obj
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.buffer: list[SwapEventSchema] = []
+        self.last_flushed_at = monotonic()
+
+    def __enter__(self) -> "SwapEventWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.flush()
+
+    def add(self, _swap_event: SwapEventSchema) -> None:
+        self.buffer.append(_swap_event)
+
+        if len(self.buffer) >= self.batch_size or monotonic() - self.last_flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        swap_events, self.buffer = self.buffer, []
+        self.last_flushed_at = monotonic()
+
+        if not swap_events:
+            return
+
+        try:
+            with track_stage("db_write"):
+                self.write_batch(swap_events)
+            SWAP_EVENTS_WRITTEN.labels(config_id=str(self.config.id)).inc(len(swap_events))
+        except DatabaseError as e:
+            RETRIES.labels(reason="row_by_row").inc()
+            logger.error({
+                "msg": "Error while bulk creating swap event records in DB, Retrying row by row",
+                "config_id": self.config.id,
+                "batch_size": len(swap_events),
+                "error": e
+            })
+
+            # Isolate the bad rows, So that the rest of the batch is still saved
+            failed_count = 0
+            for swap_event in swap_events:
+                try:
+                    self.write_batch([swap_event])
+                    SWAP_EVENTS_WRITTEN.labels(config_id=str(self.config.id)).inc()
+                except DatabaseError as e:
+                    failed_count += 1
+                    DB_WRITE_FAILURES.labels(config_id=str(self.config.id)).inc()
+                    logger.error({
+                        "msg": "Error while creating swap event record in DB",
+                        "config_id": self.config.id,
+                        "tx_hash": swap_event.tx_hash,
+                        "log_index": swap_event.log_index,
+                        "error": e
+                    })
+
+            # The saved rows are skipped as duplicates when the window is retried
+            if failed_count:
+                raise SwapEventWriteError(f"{failed_count} of {len(swap_events)} swap events couldn't be saved")
+
+    def write_batch(self, _swap_events: list[SwapEventSchema]) -> None:
+        swap_event_objs = [SwapEvent(config=self.config, **swap_event.get_model_fields()) for swap_event in _swap_events]
+
+        def insert() -> None:
+            with transaction.atomic():
+                SwapEvent.objects.bulk_create(swap_event_objs, ignore_conflicts=True)
+                with track_stage("rollups"):
+                    update_rollups(swap_event_objs)
+
+        # Partitions are created outside of the insert transaction, So that their lock isn't held until the commit
+        insert_into_partitions([swap_event_obj.block_number for swap_event_obj in swap_event_objs], insert)
+
+
+def to_copy_value(_value) -> str:
+    # Encode a value in the text format of COPY, Backslashes, Tabs and newlines are escaped
+    if _value is None:
+        return "\\N"
+    if isinstance(_value, bytes):
+        return "\\\\x" + _value.hex()
+    if isinstance(_value, dict):
+        _value = json.dumps(_value)
+    elif isinstance(_value, datetime):
+        _value = _value.isoformat()
+    elif isinstance(_value, Decimal):
+        _value = format(_value, "f")
+
+    return str(_value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+class CopySwapEventWriter(SwapEventWriter):
+    """
+    Swap event writer for the backfills, Streams every batch into a temporary staging table with COPY FROM STDIN
+    and merges it into the swap events table with a single INSERT ... SELECT, Skipping the duplicates.
+    Falls back to the bulk insert of SwapEventWriter on the databases other than PostgreSQL.
+    """
+
+    def __init__(self, _config_obj: Config, batch_size: int = COPY_BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL) -> None:
+        super().__init__(_config_obj, batch_size, flush_interval)
+
+    def write_batch(self, _swap_events: list[SwapEventSchema]) -> None:
+        if connection.vendor != "postgresql":
+            super().write_batch(_swap_events)
+            return
+
+        swap_event_objs = [SwapEvent(config=self.config, **swap_event.get_model_fields()) for swap_event in _swap_events]
+
+        fields = SwapEvent._meta.concrete_fields
+        rows = io.StringIO()
+        for swap_event_obj in swap_event_objs:
+            # pre_save sets the auto_now timestamps, Same as the ORM insert
+            rows.write("\t".join(to_copy_value(field.pre_save(swap_event_obj, True)) for field in fields) + "\n")
+
+        quote_name = connection.ops.quote_name
+        columns = ", ".join(quote_name(field.column) for field in fields)
+        conflict_columns = ", ".join(quote_name(SwapEvent._meta.get_field(field).column) for field in ("tx_hash", "log_index", "block_number"))
+        returning_columns = ", ".join(quote_name(SwapEvent._meta.get_field(field.removesuffix("_id")).column) for field in SWAP_EVENT_FIELDS)
+
+        def insert() -> None:
+            # Rewound on every attempt, So that a retried insert streams all the rows again
+            rows.seek(0)
+            with transaction.atomic(), connection.cursor() as cursor:
+                # The staging table lives as long as the DB connection and is emptied on every commit
+                cursor.execute(
+                    f"CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} "
+                    f"(LIKE {quote_name(SwapEvent._meta.db_table)} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+                )
+                cursor.copy_expert(f"COPY {STAGING_TABLE} ({columns}) FROM STDIN", rows)
+
+                # Duplicates are skipped by the unique_tx_event constraint, The inserted rows are returned for the rollups
+                cursor.execute(
+                    f"INSERT INTO {quote_name(SwapEvent._meta.db_table)} ({columns}) SELECT {columns} FROM {STAGING_TABLE} "
+                    f"ON CONFLICT ({conflict_columns}) DO NOTHING RETURNING {returning_columns}"
+                )
+                with track_stage("rollups"):
+                    upsert_candles(compute_candles(dict(zip(SWAP_EVENT_FIELDS, row)) for row in cursor.fetchall()))
+
+        insert_into_partitions([swap_event_obj.block_number for swap_event_obj in swap_event_objs], insert)
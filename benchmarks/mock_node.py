@@ -0,0 +1,299 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep
+
+from eth_abi import encode
+from eth_utils import keccak, to_checksum_address
+
+CONTRACT_ADDRESS = to_checksum_address("0x" + "11" * 20)
+MAX_CONTRACTS = 50
+SENDER = "0x" + "22" * 20
+RECIPIENT = "0x" + "33" * 20
+
+FIRST_BLOCK_TIMESTAMP = 1700000000
+BLOCK_TIME = 12
+ETH_USD_RATE = "2000.00"
+
+# Uniswap V3 swaps are decoded from the log, PancakeSwap V3 swaps (with the protocol fees) have no decoder,
+# So their transactions are fetched as well
+SWAP_INPUTS = {
+    "uniswap-v3": [
+        ("sender", "address", True), ("recipient", "address", True), ("amount0", "int256", False), ("amount1", "int256", False),
+        ("sqrtPriceX96", "uint160", False), ("liquidity", "uint128", False), ("tick", "int24", False)
+    ],
+    "pancakeswap-v3": [
+        ("sender", "address", True), ("recipient", "address", True), ("amount0", "int256", False), ("amount1", "int256", False),
+        ("sqrtPriceX96", "uint160", False), ("liquidity", "uint128", False), ("tick", "int24", False),
+        ("protocolFeesToken0", "uint128", False), ("protocolFeesToken1", "uint128", False)
+    ],
+}
+
+
+def get_swap_abi(_event_kind: str) -> list[dict]:
+    return [{
+        "anonymous": False,
+        "inputs": [{"indexed": indexed, "name": name, "type": _type} for name, _type, indexed in SWAP_INPUTS[_event_kind]],
+        "name": "Swap",
+        "type": "event"
+    }]
+
+
+def get_contract_address(_idx: int) -> str:
+    return to_checksum_address("0x" + f"{0x11 + _idx:02x}" * 20)
+
+
+def to_hash(_number: int) -> str:
+    return "0x" + _number.to_bytes(32, "big").hex()
+
+
+class MockNode:
+    """
+    Local fake Ethereum JSON-RPC node serving synthetic swap logs along with their transactions, receipts and blocks.
+    Every block with swaps has swaps_per_block logs per contract, The contract addresses are given by get_contract_address.
+    Every request is delayed by the given latency, Requests over the rate limit (per second) are rejected with a 429.
+    Also serves a Coinbase style exchange rates endpoint.
+    """
+
+    def __init__(
+        self,
+        head_block: int = 10000,
+        swaps_per_block: int = 4,
+        block_step: int = 1,
+        event_kind: str = "uniswap-v3",
+        latency: float = 0.0,
+        rate_limit: float = 0.0,
+        max_logs: int = 10000,
+        contracts: int = 1,
+    ) -> None:
+        if not 1 <= contracts <= MAX_CONTRACTS:
+            raise ValueError(f"contracts must be between 1 and {MAX_CONTRACTS}")
+
+        self.head_block = head_block
+        self.swaps_per_block = swaps_per_block
+        self.block_step = block_step
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.max_logs = max_logs
+        self.contract_addresses = [get_contract_address(idx) for idx in range(contracts)]
+
+        self.topic = "0x" + keccak(text=f"Swap({','.join(_type for _, _type, _ in SWAP_INPUTS[event_kind])})").hex()
+        self.event_kind = event_kind
+        self.abi = get_swap_abi(event_kind)
+
+        self.lock = threading.Lock()
+        self.http_requests = 0
+        self.rpc_calls: dict[str, int] = {}
+        self.rate_limited_requests = 0
+        self.tokens = max(rate_limit, 1)
+        self.tokens_updated_at = monotonic()
+
+        self.server: ThreadingHTTPServer | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    @property
+    def exchange_rates_url(self) -> str:
+        return f"{self.url}/v2/exchange-rates?currency=ETH"
+
+    def get_swap_count(self, _from_block: int, _to_block: int, _contracts: int = 1) -> int:
+        return sum(self.swaps_per_block * _contracts for block_number in range(_from_block, _to_block + 1) if self.has_swaps(block_number))
+
+    def has_swaps(self, _block_number: int) -> bool:
+        return _block_number % self.block_step == 0
+
+    def reset_counters(self) -> None:
+        with self.lock:
+            self.http_requests = 0
+            self.rpc_calls = {}
+            self.rate_limited_requests = 0
+
+    def take_token(self) -> bool:
+        if self.rate_limit <= 0:
+            return True
+
+        with self.lock:
+            now = monotonic()
+            self.tokens = min(self.rate_limit, self.tokens + (now - self.tokens_updated_at) * self.rate_limit)
+            self.tokens_updated_at = now
+
+            if self.tokens < 1:
+                self.rate_limited_requests += 1
+                return False
+
+            self.tokens -= 1
+            return True
+
+    # Synthetic chain, The logs of the contracts follow each other in the block, Two logs per transaction
+    def get_block_hash(self, _block_number: int) -> str:
+        return to_hash(10 ** 12 + _block_number)
+
+    def get_tx_hash(self, _block_number: int, _log_index: int) -> str:
+        return to_hash(_block_number * 10000 + _log_index // 2)
+
+    def get_log(self, _block_number: int, _contract_idx: int, _log_index: int) -> dict:
+        args = [-10 ** 17 - _log_index, 300 * 10 ** 6, 2 ** 96 * 2, 10 ** 20, -5, 0, 0][:len(SWAP_INPUTS[self.event_kind]) - 2]
+        return {
+            "address": self.contract_addresses[_contract_idx],
+            "topics": [self.topic, "0x" + "00" * 12 + SENDER[2:], "0x" + "00" * 12 + RECIPIENT[2:]],
+            "data": "0x" + encode([_type for _, _type, indexed in SWAP_INPUTS[self.event_kind] if not indexed], args).hex(),
+            "blockNumber": hex(_block_number),
+            "blockHash": self.get_block_hash(_block_number),
+            "transactionHash": self.get_tx_hash(_block_number, _log_index),
+            "transactionIndex": hex(_log_index // 2),
+            "logIndex": hex(_log_index),
+            "removed": False
+        }
+
+    def get_logs(self, _filter: dict) -> list[dict]:
+        to_block = self.head_block if _filter.get("toBlock", "latest") == "latest" else int(_filter["toBlock"], 16)
+        from_block = int(_filter.get("fromBlock", hex(to_block)), 16)
+
+        # A single address or a list of addresses, All the contracts if there is no address filter
+        addresses = _filter.get("address") or self.contract_addresses
+        addresses = {address.lower() for address in ([addresses] if isinstance(addresses, str) else addresses)}
+        contract_idxs = [idx for idx, address in enumerate(self.contract_addresses) if address.lower() in addresses]
+
+        if self.get_swap_count(from_block, to_block, len(contract_idxs)) > self.max_logs:
+            raise ValueError(f"query returned more than {self.max_logs} results")
+
+        return [
+            self.get_log(block_number, contract_idx, contract_idx * self.swaps_per_block + log_index)
+            for block_number in range(from_block, min(to_block, self.head_block) + 1) if self.has_swaps(block_number)
+            for contract_idx in contract_idxs
+            for log_index in range(self.swaps_per_block)
+        ]
+
+    def get_block(self, _block_number: int) -> dict | None:
+        if _block_number > self.head_block:
+            return None
+
+        return {
+            "number": hex(_block_number),
+            "hash": self.get_block_hash(_block_number),
+            "parentHash": self.get_block_hash(_block_number - 1),
+            "timestamp": hex(FIRST_BLOCK_TIMESTAMP + BLOCK_TIME * _block_number),
+            "baseFeePerGas": hex(10 ** 9),
+            "gasLimit": hex(30_000_000),
+            "gasUsed": hex(15_000_000),
+            "miner": "0x" + "00" * 20,
+            "transactions": []
+        }
+
+    def get_transaction(self, _tx_hash: str) -> dict:
+        # The execution price is read from the second word of the input by the indexer
+        number = int(_tx_hash, 16)
+        return {
+            "hash": _tx_hash,
+            "blockNumber": hex(number // 10000),
+            "blockHash": self.get_block_hash(number // 10000),
+            "from": SENDER,
+            "to": CONTRACT_ADDRESS,
+            "gas": hex(200000),
+            "gasPrice": hex(30 * 10 ** 9),
+            "value": hex(10 ** 17),
+            "input": "0x12345678" + "00" * 32 + (2000 * 10 ** 18).to_bytes(32, "big").hex()
+        }
+
+    def get_receipt(self, _tx_hash: str) -> dict:
+        number = int(_tx_hash, 16)
+        return {
+            "transactionHash": _tx_hash,
+            "blockNumber": hex(number // 10000),
+            "blockHash": self.get_block_hash(number // 10000),
+            "gasUsed": hex(150000),
+            "effectiveGasPrice": hex(25 * 10 ** 9),
+            "status": "0x1"
+        }
+
+    def get_block_receipts(self, _block: str) -> list[dict] | None:
+        # Blocks are accepted by hash or by number
+        block_number = int(_block, 16) - 10 ** 12 if len(_block) == 66 else int(_block, 16)
+        if block_number > self.head_block:
+            return None
+        if not self.has_swaps(block_number):
+            return []
+        return [
+            self.get_receipt(self.get_tx_hash(block_number, log_index))
+            for log_index in range(0, self.swaps_per_block * len(self.contract_addresses), 2)
+        ]
+
+    def call(self, _method: str, _params: list) -> dict:
+        with self.lock:
+            self.rpc_calls[_method] = self.rpc_calls.get(_method, 0) + 1
+
+        if _method == "eth_chainId":
+            return {"result": "0x1"}
+        if _method == "eth_blockNumber":
+            return {"result": hex(self.head_block)}
+        if _method == "eth_getBlockByNumber":
+            return {"result": self.get_block(self.head_block if _params[0] in ("latest", "finalized", "safe") else int(_params[0], 16))}
+        if _method == "eth_getBlockByHash":
+            return {"result": self.get_block(int(_params[0], 16) - 10 ** 12)}
+        if _method == "eth_getLogs":
+            try:
+                return {"result": self.get_logs(_params[0])}
+            except ValueError as e:
+                return {"error": {"code": -32005, "message": str(e)}}
+        if _method == "eth_getTransactionByHash":
+            return {"result": self.get_transaction(_params[0])}
+        if _method == "eth_getTransactionReceipt":
+            return {"result": self.get_receipt(_params[0])}
+        if _method == "eth_getBlockReceipts":
+            return {"result": self.get_block_receipts(_params[0])}
+
+        return {"error": {"code": -32601, "message": f"the method {_method} does not exist/is not available"}}
+
+    def start(self) -> "MockNode":
+        node = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def send_json(self, _status: int, _data: object) -> None:
+                body = json.dumps(_data).encode()
+                self.send_response(_status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                # Coinbase exchange rates
+                self.send_json(200, {"data": {"currency": "ETH", "rates": {"USD": ETH_USD_RATE}}})
+
+            def do_POST(self) -> None:
+                request_data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+                with node.lock:
+                    node.http_requests += 1
+
+                if node.latency:
+                    sleep(node.latency)
+
+                if not node.take_token():
+                    self.send_json(429, {"error": "Too Many Requests"})
+                    return
+
+                def respond(request: dict) -> dict:
+                    return {"jsonrpc": "2.0", "id": request.get("id"), **node.call(request["method"], request.get("params", []))}
+
+                if isinstance(request_data, list):
+                    self.send_json(200, [respond(request) for request in request_data])
+                else:
+                    self.send_json(200, respond(request_data))
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), RequestHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
@@ -0,0 +1,315 @@
+"""
+End-to-end ingestion benchmark, Runs process_swap_events against a local mock JSON-RPC node.
+
+    python -m benchmarks.run --events 20000 --latency 20 --mode async
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline results.json --tolerance 0.1
+
+Reports the events per second, The RPC calls, HTTP requests and DB round-trips per event and the p50/p99 latency of every stage.
+Exits with 1 if a metric regressed by more than the tolerance compared to the baseline results.
+"""
+
+import argparse
+import functools
+import importlib
+import inspect
+import json
+import logging
+import os
+import sys
+import threading
+from math import ceil
+from time import perf_counter
+from types import ModuleType
+from typing import Any, Callable
+
+from benchmarks.mock_node import MAX_CONTRACTS, MockNode
+
+# Module, Class (or None for a function) and attribute of the instrumented stages
+STAGES = [
+    ("web3_request", "app.providers", "PooledHTTPProvider", "make_request"),
+    ("web3_request", "app.providers", "PooledAsyncHTTPProvider", "make_request"),
+    ("rpc_batch", "app.rpc", None, "batch_request"),
+    ("rpc_batch", "app.rpc", None, "async_batch_request"),
+    ("transactions_details", "app.tasks", None, "get_transactions_details"),
+    ("block_timestamps", "app.blocks", None, "get_block_timestamps"),
+    ("create_swap_event", "app.tasks", None, "create_swap_event"),
+    ("db_write", "app.writer", "SwapEventWriter", "write_batch"),
+    ("rollups", "app.rollups", None, "update_rollups"),
+]
+
+# Metrics compared with the baseline, True if higher is better
+REGRESSION_METRICS = {
+    "events_per_second": True,
+    "rpc_calls_per_event": False,
+    "http_requests_per_event": False,
+    "db_round_trips_per_event": False,
+}
+
+HEAD_BLOCK = 19_000_000
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.durations: dict[str, list[float]] = {}
+
+    def record(self, _stage: str, _duration: float) -> None:
+        with self.lock:
+            self.durations.setdefault(_stage, []).append(_duration)
+
+    def wrap(self, _stage: str, _func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(_func):
+            @functools.wraps(_func)
+            async def timed_coroutine(*args, **kwargs) -> Any:
+                started_at = perf_counter()
+                try:
+                    return await _func(*args, **kwargs)
+                finally:
+                    self.record(_stage, perf_counter() - started_at)
+
+            return timed_coroutine
+
+        @functools.wraps(_func)
+        def timed(*args, **kwargs) -> Any:
+            started_at = perf_counter()
+            try:
+                return _func(*args, **kwargs)
+            finally:
+                self.record(_stage, perf_counter() - started_at)
+
+        return timed
+
+    def get_summary(self) -> dict[str, dict]:
+        return {
+            stage: {
+                "count": len(durations),
+                "p50_ms": round(get_percentile(durations, 0.5) * 1000, 3),
+                "p99_ms": round(get_percentile(durations, 0.99) * 1000, 3),
+            }
+            for stage, durations in sorted(self.durations.items())
+        }
+
+
+class QueryCounter:
+    # Counts every statement sent to the DB, By all the threads (the async engine writes from a thread)
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def __call__(self, execute: Callable, sql: str, params: Any, many: bool, context: dict) -> Any:
+        with self.lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self, sender: Any = None, connection: Any = None, **kwargs) -> None:
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+def get_percentile(_values: list[float], _percentile: float) -> float:
+    values = sorted(_values)
+    return values[max(ceil(_percentile * len(values)) - 1, 0)]
+
+
+def instrument(_timer: StageTimer) -> None:
+    # Make sure the modules which import the stage functions by name are loaded, So that their references are replaced too
+    importlib.import_module("app.async_ingestion")
+
+    for stage, module_name, class_name, attr in STAGES:
+        module = importlib.import_module(module_name)
+
+        if class_name is not None:
+            owner = getattr(module, class_name)
+            setattr(owner, attr, _timer.wrap(stage, getattr(owner, attr)))
+            continue
+
+        original = getattr(module, attr)
+        timed = _timer.wrap(stage, original)
+        for loaded_module in list(sys.modules.values()):
+            if isinstance(loaded_module, ModuleType) and loaded_module.__name__.startswith("app"):
+                for name, value in list(vars(loaded_module).items()):
+                    if value is original:
+                        setattr(loaded_module, name, timed)
+
+
+def reset_state() -> None:
+    from django.core.cache import cache
+
+    from app import providers
+    from app.blocks import block_cache
+    from app.cache import tiered_cache
+    from app.models import Block, Config, SwapCandle, SwapEvent
+
+    SwapEvent.objects.all().delete()
+    SwapCandle.objects.all().delete()
+    Config.objects.all().delete()
+    Block.objects.all().delete()
+    cache.clear()
+    tiered_cache.local.clear()
+    block_cache.clear()
+    providers.pools.clear()
+
+
+def run_once(_node: MockNode, _args: argparse.Namespace, _timer: StageTimer, _query_counter: QueryCounter) -> dict:
+    from django.db import connections
+
+    from app.models import Config, SwapEvent
+    from app.tasks import process_shared_swap_events, process_swap_events
+
+    reset_state()
+    config_ids = [
+        str(Config.objects.create(
+            contract_address=contract_address,
+            http_provider=_node.url,
+            abi={"ABI": _node.abi},
+            block_number=_node.head_block - _args.first_block,
+            eth_token_index=0,
+            token_decimals=6,
+            ingestion_mode=_args.mode,
+        ).id)
+        for contract_address in _node.contract_addresses
+    ]
+
+    # Start every run with cold connections and counters
+    connections.close_all()
+    _node.reset_counters()
+    _timer.durations.clear()
+    _query_counter.count = 0
+
+    # Several contracts are indexed together, The way follow_chain_head indexes the configs sharing the same providers
+    started_at = perf_counter()
+    if len(config_ids) > 1:
+        process_shared_swap_events(config_ids)
+    else:
+        process_swap_events(config_ids[0])
+    elapsed = perf_counter() - started_at
+
+    db_round_trips = _query_counter.count
+    events = SwapEvent.objects.count()
+    rpc_calls = sum(_node.rpc_calls.values())
+
+    return {
+        "events": events,
+        "seconds": round(elapsed, 3),
+        "events_per_second": round(events / elapsed, 1),
+        "rpc_calls_per_event": round(rpc_calls / max(events, 1), 4),
+        "http_requests_per_event": round(_node.http_requests / max(events, 1), 4),
+        "db_round_trips_per_event": round(db_round_trips / max(events, 1), 4),
+        "rate_limited_requests": _node.rate_limited_requests,
+        "rpc_calls": dict(sorted(_node.rpc_calls.items())),
+        "stages": _timer.get_summary(),
+    }
+
+
+def compare(_results: dict, _baseline: dict, _tolerance: float) -> list[str]:
+    regressions = []
+    for metric, higher_is_better in REGRESSION_METRICS.items():
+        if metric not in _baseline or not _baseline[metric]:
+            continue
+
+        change = (_results[metric] - _baseline[metric]) / _baseline[metric]
+        if (-change if higher_is_better else change) > _tolerance:
+            regressions.append(f"{metric}: {_baseline[metric]} -> {_results[metric]} ({change:+.1%})")
+
+    return regressions
+
+
+def print_results(_results: dict) -> None:
+    print(f"events:                   {_results['events']} in {_results['seconds']}s ({_results['mode']} mode, {_results['event_kind']}, {_results['contracts']} contracts)")
+    print(f"events/sec:               {_results['events_per_second']} (runs: {_results['runs_events_per_second']})")
+    print(f"RPC calls/event:          {_results['rpc_calls_per_event']} {_results['rpc_calls']}")
+    print(f"HTTP requests/event:      {_results['http_requests_per_event']} ({_results['rate_limited_requests']} rate limited)")
+    print(f"DB round-trips/event:     {_results['db_round_trips_per_event']}")
+    print(f"{'stage':<25} {'count':>8} {'p50 ms':>10} {'p99 ms':>10}")
+    for stage, summary in _results["stages"].items():
+        print(f"{stage:<25} {summary['count']:>8} {summary['p50_ms']:>10} {summary['p99_ms']:>10}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the swap event ingestion against a local mock JSON-RPC node")
+    parser.add_argument("--events", type=int, default=10000, help="Approximate number of swap events to index")
+    parser.add_argument("--swaps-per-block", type=int, default=4)
+    parser.add_argument("--contracts", type=int, default=1, help=f"Number of pools (up to {MAX_CONTRACTS}) indexed together with a single eth_getLogs per window, Sync mode only")
+    parser.add_argument("--event-kind", choices=("uniswap-v3", "pancakeswap-v3"), default="uniswap-v3", help="pancakeswap-v3 swaps have no decoder, So their transactions are fetched as well")
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync")
+    parser.add_argument("--latency", type=float, default=0, help="Latency of the mock node per HTTP request in milliseconds")
+    parser.add_argument("--rate-limit", type=float, default=0, help="HTTP requests per second accepted by the mock node, 0 for unlimited")
+    parser.add_argument("--max-logs", type=int, default=10000, help="Maximum number of logs returned by a single eth_getLogs call")
+    parser.add_argument("--runs", type=int, default=3, help="The median run by events/sec is reported")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    parser.add_argument("--baseline", help="Compare the results with the JSON results of a previous run")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression compared to the baseline")
+    args = parser.parse_args()
+    if args.contracts > 1 and args.mode == "async":
+        parser.error("--contracts is only supported in sync mode, Async configs are indexed one by one")
+
+    blocks = ceil(args.events / (args.swaps_per_block * args.contracts))
+    node = MockNode(
+        head_block=HEAD_BLOCK,
+        swaps_per_block=args.swaps_per_block,
+        event_kind=args.event_kind,
+        latency=args.latency / 1000,
+        rate_limit=args.rate_limit,
+        max_logs=args.max_logs,
+        contracts=args.contracts,
+    ).start()
+    args.first_block = HEAD_BLOCK - blocks + 1
+
+    # The settings are read on setup, So the exchange rates have to point to the mock node before
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    os.environ["COINBASE_EXCHANGE_RATES_URL"] = node.exchange_rates_url
+
+    import django
+    django.setup()
+    logging.disable(logging.INFO)
+
+    from django.db import connection, connections
+    from django.db.backends.signals import connection_created
+
+    timer = StageTimer()
+    query_counter = QueryCounter()
+    instrument(timer)
+    connection_created.connect(query_counter.install)
+
+    old_database_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        runs = [run_once(node, args, timer, query_counter) for _ in range(args.runs)]
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_database_name, verbosity=0)
+        node.stop()
+
+    results = sorted(runs, key=lambda run: run["events_per_second"])[len(runs) // 2]
+    results = {
+        "mode": args.mode,
+        "contracts": args.contracts,
+        "event_kind": args.event_kind,
+        **results,
+        "runs_events_per_second": [run["events_per_second"] for run in runs],
+    }
+    print_results(results)
+
+    if not all(run["events"] for run in runs):
+        print("No swap events were indexed in some of the runs, Check the logged errors")
+        return 1
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+
+        if regressions:
+            print("Regressions compared to the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
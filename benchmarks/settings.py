@@ -0,0 +1,29 @@
+import os
+import tempfile
+
+from eth_swap_indexer.settings import *  # noqa: F401,F403
+
+# Metrics are kept in the process memory, A PROMETHEUS_MULTIPROC_DIR exported by the environment is ignored
+# app.metrics is only imported after the settings, So the metrics are created in single process mode
+os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+# Benchmarks run against a throwaway SQLite file by default, Set BENCHMARK_DB=postgres to use the DB_* database instead.
+# The swap events are written to a test database created next to it and dropped afterwards.
+if os.getenv("BENCHMARK_DB", "sqlite") == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.path.join(tempfile.gettempdir(), "eth_swap_indexer_benchmark.sqlite3"),
+            "TEST": {"NAME": os.path.join(tempfile.gettempdir(), "eth_swap_indexer_benchmark_test.sqlite3")},
+        }
+    }
+
+# No Redis needed, The client side rate limiters are disabled and the mock node enforces its own rate limit
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+RPC_REQUESTS_PER_SECOND = 0
+COINBASE_REQUESTS_PER_SECOND = 0
+RPC_CACHE_PATH = ""
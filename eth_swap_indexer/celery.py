@@ -1,9 +1,17 @@
 import os
 
 from celery import Celery
+from celery.signals import worker_process_shutdown
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eth_swap_indexer.settings')
 
 app = Celery('eth_swap_indexer')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks(["app"])
+
+
+@worker_process_shutdown.connect
+def mark_worker_process_dead(pid: int, **kwargs) -> None:
+    # Drop the live metrics of the exited worker process, See app/metrics.py
+    from app.metrics import mark_process_dead
+    mark_process_dead(pid)
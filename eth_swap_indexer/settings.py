@@ -65,12 +65,12 @@ WSGI_APPLICATION = 'eth_swap_indexer.wsgi.application'
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.postgresql'),
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': '5432'
+        'PORT': os.getenv('DB_PORT', '5432')
     }
 }
 
@@ -118,6 +118,15 @@ STORAGES = {
 # Load celery credentials
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL')
 CELERY_TASK_DEFAULT_QUEUE = os.getenv('CELERY_TASK_DEFAULT_QUEUE')
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND')
+
+# Follow the chain head, Index the new blocks of every active config periodically
+CELERY_BEAT_SCHEDULE = {
+    "follow-chain-head": {
+        "task": "app.tasks.follow_chain_head",
+        "schedule": float(os.getenv("FOLLOW_INTERVAL", 12)),
+    },
+}
 
 
 # Logger Config
@@ -164,3 +173,91 @@ CACHES = {
         "LOCATION": f"redis://{os.getenv("REDIS_HOST")}:6379",
     }
 }
+
+
+# Indexer Config
+# Number of transactions to fetch in a single JSON-RPC batch request
+TX_BATCH_SIZE = int(os.getenv("TX_BATCH_SIZE", 100))
+
+# Number of blocks to fetch the receipts of in a single JSON-RPC batch request
+BLOCK_RECEIPTS_BATCH_SIZE = int(os.getenv("BLOCK_RECEIPTS_BATCH_SIZE", 10))
+
+# Number of block headers to fetch in a single JSON-RPC batch request
+BLOCK_BATCH_SIZE = int(os.getenv("BLOCK_BATCH_SIZE", 100))
+
+# Maximum number of contracts whose logs are fetched by a single eth_getLogs call when following the chain head
+# Sync configs sharing the same providers are indexed together, Set it to 1 to index every config on its own
+SHARED_SCAN_MAX_CONTRACTS = int(os.getenv("SHARED_SCAN_MAX_CONTRACTS", 50))
+
+# Maximum number of block headers kept in memory per worker process, In front of the blocks table
+BLOCK_CACHE_MAX_ENTRIES = int(os.getenv("BLOCK_CACHE_MAX_ENTRIES", 100000))
+
+# Initial and maximum number of blocks scanned by a single get_logs call
+LOG_WINDOW_SIZE = int(os.getenv("LOG_WINDOW_SIZE", 2000))
+LOG_WINDOW_MAX_SIZE = int(os.getenv("LOG_WINDOW_MAX_SIZE", 100000))
+
+# Swap events are bulk inserted once DB_BATCH_SIZE events are buffered or DB_FLUSH_INTERVAL seconds have elapsed
+DB_BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE", 1000))
+DB_FLUSH_INTERVAL = float(os.getenv("DB_FLUSH_INTERVAL", 5))
+
+# Maximum number of swap events per COPY batch of the COPY backfills (PostgreSQL only)
+DB_COPY_BATCH_SIZE = int(os.getenv("DB_COPY_BATCH_SIZE", 50000))
+
+# Number of partitions a backfill is split into and maximum attempts to index each partition
+BACKFILL_PARTITIONS = int(os.getenv("BACKFILL_PARTITIONS", 8))
+BACKFILL_MAX_ATTEMPTS = int(os.getenv("BACKFILL_MAX_ATTEMPTS", 3))
+
+# Number of blocks per swap event table partition (PostgreSQL only), Must not be changed once the partitions are created
+SWAP_EVENT_PARTITION_SIZE = int(os.getenv("SWAP_EVENT_PARTITION_SIZE", 1_000_000))
+
+# Maximum number of blocks rolled back on a chain reorganisation, Deeper blocks are considered final
+REORG_MAX_DEPTH = int(os.getenv("REORG_MAX_DEPTH", 64))
+
+# On-disk cache of the final JSON-RPC responses (logs, transactions, receipts and block headers), Shared by the workers of a host
+# Set RPC_CACHE_PATH to a SQLite file path to enable it, The least recently used responses are evicted past RPC_CACHE_MAX_SIZE bytes
+RPC_CACHE_PATH = os.getenv("RPC_CACHE_PATH", "")
+RPC_CACHE_MAX_SIZE = int(os.getenv("RPC_CACHE_MAX_SIZE", 1024 ** 3))
+
+# In-process LRU cache in front of the Redis cache (transaction details, block receipts and the spot rate), Per worker process
+# Entries expire after LOCAL_CACHE_TIMEOUT seconds, So that a worker doesn't keep serving stale values for long
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", 100000))
+LOCAL_CACHE_TIMEOUT = float(os.getenv("LOCAL_CACHE_TIMEOUT", 300))
+
+# Exchange rates endpoint of the spot ETH to USD rate
+COINBASE_EXCHANGE_RATES_URL = os.getenv("COINBASE_EXCHANGE_RATES_URL", "https://api.coinbase.com/v2/exchange-rates?currency=ETH")
+
+# Token bucket rate limits shared by all the workers, Requests per second and burst size per HTTP provider
+# Set the requests per second to 0 to disable the rate limiter
+RPC_REQUESTS_PER_SECOND = float(os.getenv("RPC_REQUESTS_PER_SECOND", 25))
+RPC_BURST = int(os.getenv("RPC_BURST", 50))
+COINBASE_REQUESTS_PER_SECOND = float(os.getenv("COINBASE_REQUESTS_PER_SECOND", 5))
+COINBASE_BURST = int(os.getenv("COINBASE_BURST", 5))
+
+# Provider pool of the configs with extra HTTP providers
+# A provider is skipped for RPC_UNHEALTHY_COOLDOWN seconds (doubled up to RPC_UNHEALTHY_COOLDOWN_MAX) after RPC_UNHEALTHY_AFTER_FAILURES failures in a row
+# Every RPC_HEALTH_CHECK_INTERVAL seconds, The providers more than RPC_MAX_BLOCK_LAG blocks behind the others are skipped until the next check
+RPC_UNHEALTHY_AFTER_FAILURES = int(os.getenv("RPC_UNHEALTHY_AFTER_FAILURES", 3))
+RPC_UNHEALTHY_COOLDOWN = float(os.getenv("RPC_UNHEALTHY_COOLDOWN", 10))
+RPC_UNHEALTHY_COOLDOWN_MAX = float(os.getenv("RPC_UNHEALTHY_COOLDOWN_MAX", 300))
+RPC_HEALTH_CHECK_INTERVAL = float(os.getenv("RPC_HEALTH_CHECK_INTERVAL", 60))
+RPC_MAX_BLOCK_LAG = int(os.getenv("RPC_MAX_BLOCK_LAG", 5))
+# Weight of the latest request in the moving averages of the latency and error rate used to route the requests
+RPC_LATENCY_SMOOTHING = float(os.getenv("RPC_LATENCY_SMOOTHING", 0.2))
+
+# Default ingestion mode of the configs: sync or async
+# In async mode, Up to ASYNC_MAX_IN_FLIGHT JSON-RPC batch requests are kept in flight per provider
+INGESTION_MODE = os.getenv("INGESTION_MODE", "sync")
+ASYNC_MAX_IN_FLIGHT = int(os.getenv("ASYNC_MAX_IN_FLIGHT", 8))
+
+# The prices loaded after the last one known to a worker are picked up every PRICE_INDEX_REFRESH_INTERVAL seconds, Corrected prices on a restart
+# A price is only used for the blocks within PRICE_MAX_AGE seconds of it, Otherwise the spot rate is used for the blocks
+# Within PRICE_MAX_AGE seconds of now and the exchange rate of the older blocks is left empty
+PRICE_INDEX_REFRESH_INTERVAL = int(os.getenv("PRICE_INDEX_REFRESH_INTERVAL", 3600))
+PRICE_MAX_AGE = int(os.getenv("PRICE_MAX_AGE", 3600))
+
+# Number of swap events read from the DB at a time by the exports, Each chunk is a row group of the Parquet exports
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 50000))
+
+# Default and maximum number of swap events per page of the API
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", 100))
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", 1000))
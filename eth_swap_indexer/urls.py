@@ -1,8 +1,12 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
+
+from app.views import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/', include('app.urls')),
+    path('metrics', metrics, name='metrics'),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -6,4 +6,10 @@ PORT = os.getenv("PORT", "8000")
 bind = f"0.0.0.0:{PORT}"
 worker_class = "eth_swap_indexer.workers.UvicornWorker"
 workers = multiprocessing.cpu_count() * 2
-accesslog = "-"
\ No newline at end of file
+accesslog = "-"
+
+
+def child_exit(server, worker):
+    # Drop the live metrics of the exited worker, See app/metrics.py
+    from app.metrics import mark_process_dead
+    mark_process_dead(worker.pid)